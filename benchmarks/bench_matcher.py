@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+""" bench_matcher.py - scan throughput of the filter matchers as the number of filters grows
+
+Useage:
+    python benchmarks/bench_matcher.py [--lines N] [--counts 1,10,50,100,200]
+
+For each filter count, a plan of red filters that never match is compiled (so every filter has to be checked against
+every line) and timed once with plain substring tests and once with the Aho-Corasick automaton.  The substring tests
+slow down linearly with the number of filters while the automaton stays roughly flat.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from logparser_core import LogParser_FilterPlan
+
+
+def makeLines(numLines, seed=0):
+    rng = random.Random(seed)
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(2000)]
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(5, 25))) for _ in range(numLines)]
+
+
+def makeFilters(count, seed=1):
+    # Upper case filters never occur in the lower case lines
+    rng = random.Random(seed)
+    return [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(4, 12))) for _ in range(count)]
+
+
+def timeScan(plan, lines):
+    start = time.time()
+    for _ in plan.iterMatches(lines):
+        pass
+    return len(lines) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=20000, help='number of synthetic lines to scan')
+    parser.add_argument('--counts', default='1,10,50,100,200', help='comma separated filter counts')
+    args = parser.parse_args()
+
+    lines = makeLines(args.lines)
+    print('{:>8} {:>16} {:>16}'.format('filters', 'substring l/s', 'aho-corasick l/s'))
+    for count in [int(count) for count in args.counts.split(',')]:
+        groups = [(text, False, []) for text in makeFilters(count)]
+        literalRate = timeScan(LogParser_FilterPlan(groups, useAhoCorasick=False), lines)
+        automatonRate = timeScan(LogParser_FilterPlan(groups, useAhoCorasick=True), lines)
+        print('{:>8} {:>16,.0f} {:>16,.0f}'.format(count, literalRate, automatonRate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+""" bench_suite.py - load, filter and render benchmarks on synthetic logs, written as JSON
+
+Useage:
+    python benchmarks/bench_suite.py [--lines N] [--line-length N] [--selectivity F] [--empty-ratio F] [--seed N]
+                                     [--counts 1,10,100] [--depths 0,1,4] [--repeat N] [--output FILE]
+    python benchmarks/bench_suite.py --compare OLD.json NEW.json
+
+A log is generated with loggen.py (the same arguments always give the same file) and the following is measured on it:
+
+    load            time to open and index the file, with and without a sidecar index, and the peak memory doing so
+    filter_count    filter throughput with a green MATCH_TOKEN filter plus a growing number of red filters
+    filter_depth    filter throughput with red filters ANDed under the green MATCH_TOKEN filter
+    first_result    time from opening the file to the first match and to the GUI's first page of matches
+    render          cost of growing the GUI's match model as results stream in and of reading a screen of rows from
+                    it, skipped when PyQt4 isn't installed
+
+The filter benchmarks run with the plain text matcher and, when numpy is installed, with the numpy scanner.  Every
+result is a {"benchmark", "params", "metrics"} object so runs on different commits or machines can be compared with
+--compare, which prints the relative change of every metric.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from logparser_core import LogParser_FilterPlan
+from logparser_core import OFFSET_TYPECODE
+from logparser_core import numpy
+from logparser_core import openLineStore
+from logparser_core import peakRssBytes
+
+import loggen
+
+# Rows of the GUI's match model read per simulated screen
+SCREEN_ROWS = 50
+
+# Number of screens read at evenly spaced scroll positions
+SCREENS = 100
+
+
+def engines():
+    """
+    :return: list - (name, useNumpy) for every filter engine that can run here
+    """
+    result = [('text', False)]
+    if numpy is not None:
+        result.append(('numpy', True))
+    return result
+
+
+def countGroups(count):
+    """
+    :param count: int - total number of filters
+    :return: list - filter groups with a green MATCH_TOKEN filter and count - 1 red filters that never match
+    """
+    return [(loggen.MATCH_TOKEN, True, [])] + [(text, False, []) for text in loggen.missFilters(count - 1)]
+
+
+def depthGroups(depth):
+    """
+    :param depth: int - number of ANDed filters
+    :return: list - a green MATCH_TOKEN filter with depth red filters that never match ANDed under it
+    """
+    return [(loggen.MATCH_TOKEN, True, [(text, False) for text in loggen.missFilters(depth)])]
+
+
+def benchLoad(path, repeat):
+    """
+    :param path: str - log file
+    :param repeat: int - number of runs, the fastest is reported
+    :return: list - results
+    """
+    results = []
+    indexDir = tempfile.mkdtemp(prefix='logparser-bench-')
+    try:
+        # The first sidecar run builds and saves the index, the timed runs after it load it
+        openLineStore(path, indexDir=indexDir).close()
+        for name, storeIndexDir in (('scan', None), ('sidecar', indexDir)):
+            seconds = None
+            for _ in range(repeat):
+                start = time.time()
+                store = openLineStore(path, indexDir=storeIndexDir)
+                elapsed = time.time() - start
+                numLines = len(store)
+                store.close()
+                seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+            # Measured in a separate run, tracing allocations slows the load down
+            peakTraced = None
+            if tracemalloc is not None:
+                tracemalloc.start()
+                store = openLineStore(path, indexDir=storeIndexDir)
+                peakTraced = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                store.close()
+
+            results.append({
+                'benchmark': 'load',
+                'params': {'index': name},
+                'metrics': {'seconds': seconds, 'linesPerSecond': numLines / seconds, 'peakTracedBytes': peakTraced,
+                            'peakRssBytes': peakRssBytes()}})
+    finally:
+        shutil.rmtree(indexDir, ignore_errors=True)
+    return results
+
+
+def timeFilter(store, groups, useNumpy, repeat):
+    """
+    :return: tuple - (seconds of the fastest of repeat full scans, number of matches)
+    """
+    plan = LogParser_FilterPlan(groups, useNumpy=useNumpy)
+    seconds = None
+    numMatches = 0
+    for _ in range(repeat):
+        numMatches = 0
+        start = time.time()
+        for _ in plan.iterMatches(store):
+            numMatches += 1
+        elapsed = time.time() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return seconds, numMatches
+
+
+def benchFilters(path, counts, depths, repeat):
+    """
+    :param path: str - log file
+    :param counts: list - filter counts of the filter_count benchmark
+    :param depths: list - AND depths of the filter_depth benchmark
+    :param repeat: int - number of runs, the fastest is reported
+    :return: list - results
+    """
+    results = []
+    store = openLineStore(path)
+    try:
+        scenarios = [('filter_count', 'filters', count, countGroups(count)) for count in counts]
+        scenarios += [('filter_depth', 'depth', depth, depthGroups(depth)) for depth in depths]
+        for benchmark, paramName, value, groups in scenarios:
+            for engine, useNumpy in engines():
+                seconds, numMatches = timeFilter(store, groups, useNumpy, repeat)
+                results.append({
+                    'benchmark': benchmark,
+                    'params': {paramName: value, 'engine': engine},
+                    'metrics': {'seconds': seconds, 'linesPerSecond': len(store) / seconds,
+                                'megabytesPerSecond': store.size / seconds / 1e6, 'matches': numMatches}})
+    finally:
+        store.close()
+    return results
+
+
+def benchFirstResult(path, pageSize, repeat):
+    """
+    :param path: str - log file
+    :param pageSize: int - number of matches the GUI asks for before showing the first page
+    :param repeat: int - number of runs, the fastest is reported
+    :return: list - results
+    """
+    results = []
+    for engine, useNumpy in engines():
+        best = None
+        for _ in range(repeat):
+            start = time.time()
+            store = openLineStore(path)
+            plan = LogParser_FilterPlan(countGroups(1), useNumpy=useNumpy)
+            firstMatch = None
+            numMatches = 0
+            for _ in plan.iterMatches(store):
+                numMatches += 1
+                if firstMatch is None:
+                    firstMatch = time.time() - start
+                if numMatches >= pageSize:
+                    break
+            firstPage = time.time() - start
+            store.close()
+            if best is None or firstPage < best[1]:
+                best = (firstMatch, firstPage, numMatches)
+        results.append({
+            'benchmark': 'first_result',
+            'params': {'engine': engine, 'pageSize': pageSize},
+            'metrics': {'firstMatchSeconds': best[0], 'firstPageSeconds': best[1], 'matches': best[2]}})
+    return results
+
+
+def benchRender(path):
+    """
+    :param path: str - log file
+    :return: list - results, a single skipped result when the GUI can't be imported
+    """
+    try:
+        from logparser_gui import LogParser_ApplyFilterThread
+        from logparser_gui import LogParser_MatchModel
+    except ImportError as e:
+        return [{'benchmark': 'render', 'params': {}, 'metrics': {}, 'skipped': str(e)}]
+
+    from array import array
+
+    store = openLineStore(path)
+    try:
+        indexes = [index for index, _ in LogParser_FilterPlan(countGroups(1)).iterMatches(store)]
+        batch = LogParser_ApplyFilterThread.BATCH_MATCHES
+
+        # Results arrive in batches and only the new rows are inserted, like the filter thread does
+        model = LogParser_MatchModel()
+        model.setLines(store)
+        matches = array(OFFSET_TYPECODE)
+        start = time.time()
+        numUpdates = 0
+        for batchStart in range(0, len(indexes), batch):
+            matches.extend(indexes[batchStart:batchStart + batch])
+            model.setMatches(matches, len(matches))
+            numUpdates += 1
+        updateSeconds = time.time() - start
+
+        # Screens at evenly spaced scroll positions, each one reads pages the model hasn't cached yet
+        numScreens = 0
+        start = time.time()
+        if model.numRows:
+            for screen in range(SCREENS):
+                firstRow = max(0, model.numRows - SCREEN_ROWS) * screen // max(1, SCREENS - 1)
+                for row in range(firstRow, min(firstRow + SCREEN_ROWS, model.numRows)):
+                    model.data(model.index(row))
+                numScreens += 1
+        screenSeconds = time.time() - start
+    finally:
+        store.close()
+
+    return [{
+        'benchmark': 'render',
+        'params': {'batchMatches': batch, 'screenRows': SCREEN_ROWS},
+        'metrics': {'rows': len(indexes), 'updates': numUpdates,
+                    'secondsPerUpdate': updateSeconds / numUpdates if numUpdates else None,
+                    'secondsPerScreen': screenSeconds / numScreens if numScreens else None}}]
+
+
+def resultKey(result):
+    return '{} {}'.format(result['benchmark'], json.dumps(result['params'], sort_keys=True))
+
+
+def compareRuns(oldPath, newPath):
+    """
+    Print the relative change of every metric that is in both runs.
+
+    :param oldPath: str - JSON output of the baseline run
+    :param newPath: str - JSON output of the run to compare with it
+    """
+    with open(oldPath) as f:
+        old = dict((resultKey(result), result) for result in json.load(f)['results'])
+    with open(newPath) as f:
+        new = json.load(f)['results']
+
+    for result in new:
+        baseline = old.get(resultKey(result))
+        if baseline is None:
+            continue
+        for metric, value in sorted(result['metrics'].items()):
+            oldValue = baseline['metrics'].get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(oldValue, (int, float)) or not oldValue:
+                continue
+            print('{:60} {:22} {:14.6g} {:14.6g} {:+8.1%}'.format(
+                resultKey(result), metric, oldValue, value, (value - oldValue) / float(oldValue)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=1000000, help='number of lines in the generated log')
+    parser.add_argument('--line-length', type=int, default=120, help='approximate length of a line')
+    parser.add_argument('--selectivity', type=float, default=0.01,
+                        help='fraction of lines the green filter matches')
+    parser.add_argument('--empty-ratio', type=float, default=0.0, help='fraction of empty lines')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the log generator')
+    parser.add_argument('--counts', default='1,10,100', help='comma separated filter counts')
+    parser.add_argument('--depths', default='0,1,4', help='comma separated AND depths')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the fastest is reported')
+    parser.add_argument('--page-size', type=int, default=1000, help='matches on the first page of results')
+    parser.add_argument('--output', help='file to write the JSON results to instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compareRuns(*args.compare)
+        return
+
+    counts = [int(count) for count in args.counts.split(',')]
+    depths = [int(depth) for depth in args.depths.split(',')]
+
+    tempDir = tempfile.mkdtemp(prefix='logparser-bench-')
+    try:
+        path = os.path.join(tempDir, 'synthetic.log')
+        size = loggen.generateLog(path, args.lines, args.line_length, args.selectivity, args.empty_ratio, args.seed)
+
+        results = benchLoad(path, args.repeat)
+        results += benchFilters(path, counts, depths, args.repeat)
+        results += benchFirstResult(path, args.page_size, args.repeat)
+        results += benchRender(path)
+    finally:
+        shutil.rmtree(tempDir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': numpy.__version__ if numpy is not None else None,
+            'log': {'lines': args.lines, 'bytes': size, 'lineLength': args.line_length,
+                    'selectivity': args.selectivity, 'emptyRatio': args.empty_ratio, 'seed': args.seed}},
+        'results': results}
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
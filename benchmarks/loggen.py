@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+""" loggen.py - deterministic synthetic log files for the benchmarks
+
+Useage:
+    python benchmarks/loggen.py OUTPUT [--lines N] [--line-length N] [--selectivity F] [--empty-ratio F] [--seed N]
+
+Every non-empty line starts with a timestamp, a level and a worker name, followed by lower case words up to roughly
+the requested length.  A fraction of the non-empty lines (the selectivity) also contains MATCH_TOKEN, so a green
+MATCH_TOKEN filter matches a known share of the file.  The same arguments always produce the same file.
+"""
+import argparse
+import random
+import string
+import time
+
+# Token that occurs in the fraction of lines given by the selectivity, upper case so no random word contains it
+MATCH_TOKEN = 'NEEDLE'
+
+# First timestamp of a generated file, one line per 10 milliseconds after it
+START_TIME = 1704067200
+
+LEVELS = ('DEBUG', 'INFO', 'INFO', 'INFO', 'WARN', 'ERROR')
+
+
+def makeWords(rng, count=2000):
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(count)]
+
+
+def missFilters(count, seed=1):
+    """
+    :param count: int - number of filter strings
+    :return: list - upper case strings that never occur in a generated file, so every filter is tested on every line
+    """
+    rng = random.Random(seed)
+    filters = []
+    while len(filters) < count:
+        text = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(5, 12)))
+        # The generated lines contain the levels and the match token in upper case
+        if not any(text in word or word in text for word in LEVELS + (MATCH_TOKEN,)):
+            filters.append(text)
+    return filters
+
+
+def iterLines(numLines, lineLength=120, selectivity=0.01, emptyRatio=0.0, seed=0):
+    """
+    Yield the lines of a synthetic log, without newlines.
+
+    :param numLines: int - number of lines
+    :param lineLength: int - approximate length of the non-empty lines
+    :param selectivity: float - fraction of the non-empty lines that contain MATCH_TOKEN
+    :param emptyRatio: float - fraction of the lines that are empty
+    :param seed: int - seed of the random generator
+    """
+    rng = random.Random(seed)
+    words = makeWords(rng)
+    for index in range(numLines):
+        if rng.random() < emptyRatio:
+            yield ''
+            continue
+
+        timestamp = START_TIME + index // 100
+        parts = ['{}.{:03d}'.format(time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp)), index % 100 * 10),
+                 rng.choice(LEVELS), 'worker-{}'.format(rng.randint(0, 15))]
+        if rng.random() < selectivity:
+            parts.append(MATCH_TOKEN)
+        length = sum(len(part) + 1 for part in parts)
+        while length < lineLength:
+            word = rng.choice(words)
+            parts.append(word)
+            length += len(word) + 1
+        yield ' '.join(parts)
+
+
+def generateLog(path, numLines, lineLength=120, selectivity=0.01, emptyRatio=0.0, seed=0):
+    """
+    Write a synthetic log, see iterLines() for the parameters.
+
+    :param path: str - file to write
+    :return: int - size of the file in bytes
+    """
+    size = 0
+    block = []
+    with open(path, 'wb') as f:
+        for line in iterLines(numLines, lineLength, selectivity, emptyRatio, seed):
+            block.append(line)
+            if len(block) >= 10000:
+                data = ('\n'.join(block) + '\n').encode('utf-8')
+                f.write(data)
+                size += len(data)
+                block = []
+        if block:
+            data = ('\n'.join(block) + '\n').encode('utf-8')
+            f.write(data)
+            size += len(data)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('output', help='file to write')
+    parser.add_argument('--lines', type=int, default=1000000, help='number of lines')
+    parser.add_argument('--line-length', type=int, default=120, help='approximate length of a line')
+    parser.add_argument('--selectivity', type=float, default=0.01, help='fraction of lines containing ' + MATCH_TOKEN)
+    parser.add_argument('--empty-ratio', type=float, default=0.0, help='fraction of empty lines')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+    args = parser.parse_args()
+
+    size = generateLog(args.output, args.lines, args.line_length, args.selectivity, args.empty_ratio, args.seed)
+    print('Wrote {:,} lines, {:,} bytes to {}'.format(args.lines, size, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+""" logparser_cli.py - headless log filtering from the command line
+
+Filters files (or stdin) with the same red/green/AND logic as the GUI and writes the matching lines to stdout, without
+importing Qt.
+
+Useage:
+    python logparser.py [--include TEXT] [--exclude TEXT] [--and TEXT] [--and-not TEXT] [options] [file ...]
+
+    Filters are given in the same order they would be added in the GUI.  --include and --exclude add a green or red
+    filter, --and and --and-not add a green or red filter ANDed with (i.e. indented under) the previous --include or
+    --exclude.  With no files, or a file named -, lines are read from stdin.  Compressed files are decompressed on the
+    fly.
+
+    A filter written as /regex/ is a regular expression, /regex/i one that ignores case and ~text a string that ignores
+    case.  A backslash in front of a filter starting with /, ~ or @ (e.g. \\/usr/) searches for the rest as a plain
+    string.
+
+    A filter written as @START..END (e.g. @14:02..14:07 or @2024-01-31 23:50..2024-02-01 00:10) is a time range that is
+    matched against the timestamp at the start of each line instead of the line's text, see the GUI's help.
+
+    With --fields describing the fields of the lines, a filter written as FIELD=VALUE or FIELD!=VALUE compares that
+    field of each line instead of searching the whole line, see LOGPARSER_FIELDS in the GUI's help for the formats.
+
+    --filter-set NAME starts with the filters of a filter set saved in the GUI (see LOGPARSER_FILTER_SETS in the GUI's
+    help), the filter options add to them.
+
+    With --merge the matching lines of all files are printed in the order of the timestamps at the start of the lines,
+    instead of one file after the other.
+
+    The exit status is 0 if any line matched, 1 if none did and 2 if a file couldn't be read, like grep.
+
+Examples:
+    python logparser.py --include ERROR --and worker-3 --exclude heartbeat app.log
+    python logparser.py --include @14:02..14:07 --and ERROR app.log
+    zcat app.log.gz | python logparser.py -i timeout -i refused -
+    python logparser.py -i '/took [0-9]{4,} ms/' -e ~debug app.log
+    python logparser.py --fields 'split::date,time,level,host,message' -i level=ERROR --and host!=db7 app.log
+    python logparser.py --filter-set daily -e heartbeat app.log
+"""
+import argparse
+import errno
+import os
+import sys
+
+from logparser_core import LogParser_FieldFormat
+from logparser_core import LogParser_FilterPlan
+from logparser_core import LogParser_FilterSets
+from logparser_core import LogParser_LineStore
+from logparser_core import LogParser_ParallelFilter
+from logparser_core import LogParser_Session
+from logparser_core import LogParser_TimestampLookup
+from logparser_core import LogParser_TimestampParser
+from logparser_core import iterRangeSegments
+from logparser_core import DEFAULT_FILTER_SETS_FILE
+from logparser_core import openLineStore
+
+# Lines read from stdin, and matching lines written to stdout, are handled this many at a time
+BLOCK_LINES = LogParser_LineStore.BLOCK_LINES
+
+# Amount of stdin read at a time
+READ_BYTES = 1024 * 1024
+
+
+class LogParser_AddFilter(argparse.Action):
+    """
+    Records every filter option, in command line order, as a (kind, text) pair in one list.
+    """
+    def __call__(self, parser, namespace, values, option_string=None):
+        filters = getattr(namespace, self.dest, None) or []
+        filters.append((self.const, values))
+        setattr(namespace, self.dest, filters)
+
+
+# Kinds of filter options
+FILTER_INCLUDE, FILTER_EXCLUDE, FILTER_AND, FILTER_AND_NOT = range(4)
+
+
+def isCommandLine(argv):
+    """
+    :param argv: list - command line arguments, without the program name
+    :return: bool - True if the arguments ask for headless filtering rather than the GUI
+    """
+    # The GUI only takes a file name, any option (or - for stdin) means headless mode
+    return any(arg.startswith('-') for arg in argv)
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(
+        prog='logparser.py',
+        description='Filter log files with red/green/AND filters and print the matching lines.  '
+                    'Run without options to open the GUI.')
+    parser.add_argument('files', nargs='*', metavar='file',
+                        help='files to filter, - or nothing for stdin')
+    parser.add_argument('-i', '--include', dest='filters', action=LogParser_AddFilter, const=FILTER_INCLUDE,
+                        metavar='TEXT', help='add a green filter, lines containing TEXT are shown')
+    parser.add_argument('-e', '--exclude', dest='filters', action=LogParser_AddFilter, const=FILTER_EXCLUDE,
+                        metavar='TEXT', help='add a red filter, lines containing TEXT are hidden')
+    parser.add_argument('-a', '--and', dest='filters', action=LogParser_AddFilter, const=FILTER_AND,
+                        metavar='TEXT', help='add a green filter ANDed with the previous --include/--exclude')
+    parser.add_argument('--and-not', dest='filters', action=LogParser_AddFilter, const=FILTER_AND_NOT,
+                        metavar='TEXT', help='add a red filter ANDed with the previous --include/--exclude')
+    parser.add_argument('--filter-set', metavar='NAME',
+                        help='start with the filters of a filter set saved in the GUI')
+    parser.add_argument('-s', '--skip-empty', action='store_true',
+                        help='hide empty lines')
+    parser.add_argument('-n', '--line-number', action='store_true',
+                        help='prefix each line with its line number, starting at 1')
+    parser.add_argument('-c', '--count', action='store_true',
+                        help='only print the number of matching lines')
+    parser.add_argument('-m', '--merge', action='store_true',
+                        help='merge the matches of all files in timestamp order')
+    parser.add_argument('-p', '--parallel', action='store_true',
+                        help='filter uncompressed files with one process per CPU')
+    parser.add_argument('--time-format', dest='time_formats', action='append', metavar='FORMAT',
+                        help='strptime style format of the timestamps at the start of lines, can be repeated '
+                             '(default: ISO 8601 and syslog)')
+    parser.add_argument('--fields', metavar='FORMAT',
+                        help='fields of the lines for FIELD=VALUE and FIELD!=VALUE filters: split:SEP:NAME,..., '
+                             'regex:PATTERN with named groups or json:NAME,...')
+    parser.add_argument('--encoding', default='utf-8',
+                        help='encoding of the input and output (default utf-8)')
+    return parser
+
+
+def compileFilterPlan(parser, filters, skipEmptyLines, timestampParser=None, fieldFormat=None, baseGroups=None):
+    """
+    Turn the filter options into the filter groups the GUI would have built for them.
+
+    :param parser: argparse.ArgumentParser - used to report misplaced options
+    :param filters: list - (kind, text) pairs in command line order
+    :param skipEmptyLines: bool - hide empty lines
+    :param timestampParser: LogParser_TimestampParser - finds the timestamps of time range filters
+    :param fieldFormat: LogParser_FieldFormat - splits lines into the fields of field filters
+    :param baseGroups: list - filter groups of a saved filter set that the filter options add to
+    :return: LogParser_FilterPlan - the compiled filters
+    """
+    groups = [(parentText, parentIncludes, list(children)) for parentText, parentIncludes, children in baseGroups or []]
+    for kind, text in filters:
+        if kind in (FILTER_INCLUDE, FILTER_EXCLUDE):
+            groups.append((text, kind == FILTER_INCLUDE, []))
+        elif not groups:
+            parser.error('--and and --and-not need a preceding --include or --exclude')
+        else:
+            groups[-1][2].append((text, kind == FILTER_AND))
+    try:
+        return LogParser_FilterPlan(groups, skipEmptyLines=skipEmptyLines, timestampParser=timestampParser,
+                                    fieldFormat=fieldFormat)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def iterStdinBlocks(stream, encoding):
+    """
+    Yield the lines of a binary stream a block at a time, split like LogParser_LineStore splits a file.
+
+    :param stream: file - binary stream to read
+    :param encoding: str - encoding used to decode lines, undecodable bytes are replaced
+    """
+    pending = b''
+    while True:
+        data = stream.read(READ_BYTES)
+        if not data:
+            break
+        lines = (pending + data).split(b'\n')
+        # The last piece may continue in the next read
+        pending = lines.pop()
+        yield [_decodeLine(line, encoding) for line in lines]
+    # A final line without a newline still counts, an empty piece after the last newline doesn't
+    if pending:
+        yield [_decodeLine(pending, encoding)]
+
+
+def _decodeLine(line, encoding):
+    line = line.decode(encoding, 'replace')
+    if line.endswith('\r'):
+        line = line[:-1]
+    return line
+
+
+def iterMatches(source, plan, encoding, parallelFilter):
+    """
+    Yield (index, line) for every matching line of a file or stdin, index counts from 0.
+
+    :param source: str - path of the file, or - for stdin
+    :param plan: LogParser_FilterPlan - the filters
+    :param encoding: str - encoding used to decode lines
+    :param parallelFilter: LogParser_ParallelFilter - worker pool for uncompressed files, or None
+    """
+    if source == '-':
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+        numLines = 0
+        # A line without a timestamp takes the one of the lines before it, which may be in the previous block, so
+        # the last LOOKBACK lines of that block are filtered along with the next one without being yielded again
+        context = []
+        for lines in iterStdinBlocks(stdin, encoding):
+            for index, line in plan.iterMatches(context + lines, len(context)):
+                yield numLines + index - len(context), line
+            numLines += len(lines)
+            if plan.hasTimeFilters:
+                context = (context + lines)[-LogParser_TimestampLookup.LOOKBACK:]
+        return
+
+    store = openLineStore(source, encoding)
+    try:
+        # A trailing newline ends the last line rather than starting an empty one, as in grep
+        stop = len(store)
+        if store.offsets[-1] == store.size:
+            stop -= 1
+
+        if parallelFilter is not None and store.memoryMapped:
+            for _, matches in parallelFilter.iterChunkMatches(store, plan, 0, stop):
+                for index in matches:
+                    yield index, store[index]
+        else:
+            # Only the lines the time index can't rule out are read
+            for rangeStart, rangeStop, inside in iterRangeSegments(0, stop, store.timeRanges(plan)):
+                if inside:
+                    for index, line in plan.iterMatches(store, rangeStart, rangeStop):
+                        yield index, line
+    finally:
+        store.close()
+
+
+def iterSourceMatches(source, plan, encoding, parallelFilter):
+    """
+    Yield (source, index, line) for every matching line of a file or stdin, like iterMergedMatches() does.
+    """
+    for index, line in iterMatches(source, plan, encoding, parallelFilter):
+        yield source, index, line
+
+
+def iterMergedMatches(sources, plan, encoding, parallelFilter):
+    """
+    Yield (source, index, line) for every matching line of several files, merged in timestamp order.
+
+    :param sources: list - paths of the files
+    :param plan: LogParser_FilterPlan - the filters
+    :param encoding: str - encoding used to decode lines
+    :param parallelFilter: LogParser_ParallelFilter - worker pool for uncompressed files, or None
+    """
+    stores = []
+    try:
+        for source in sources:
+            stores.append(openLineStore(source, encoding))
+        session = LogParser_Session(stores, plan.timestampParser)
+
+        # A trailing newline ends the last line rather than starting an empty one, as in grep
+        finalLines = [len(store) - 1 if store.offsets[-1] == store.size else None for store in stores]
+        for _, fileIndex, index in session.iterMergedMatches(plan, parallelFilter):
+            if index != finalLines[fileIndex]:
+                yield sources[fileIndex], index, stores[fileIndex][index]
+    finally:
+        for store in stores:
+            store.close()
+
+
+def main(argv=None):
+    """
+    :param argv: list - command line arguments, without the program name, defaults to sys.argv[1:]
+    :return: int - exit status
+    """
+    parser = buildParser()
+    args = parser.parse_args(argv)
+    try:
+        timestampParser = LogParser_TimestampParser(args.time_formats)
+        fieldFormat = None
+        if args.fields:
+            fieldFormat = LogParser_FieldFormat(args.fields)
+        baseGroups = None
+        if args.filter_set is not None:
+            filterSets = LogParser_FilterSets(os.environ.get('LOGPARSER_FILTER_SETS', DEFAULT_FILTER_SETS_FILE))
+            filterSets.load()
+            baseGroups = filterSets.get(args.filter_set)
+            if baseGroups is None:
+                parser.error('There is no filter set named {}, the saved filter sets are: {}'.format(
+                    args.filter_set, ', '.join(filterSets.names()) or 'none'))
+    except ValueError as e:
+        parser.error(str(e))
+    plan = compileFilterPlan(parser, args.filters or [], args.skip_empty, timestampParser, fieldFormat, baseGroups)
+
+    parallelFilter = None
+    if args.parallel:
+        parallelFilter = LogParser_ParallelFilter()
+
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    sources = args.files or ['-']
+    prefixNames = len(sources) > 1
+
+    # Every stream yields (source, index, line) for its matches, a merged stream covers all sources
+    if args.merge and len(sources) > 1:
+        if '-' in sources:
+            parser.error('--merge only works on files, not stdin')
+        streams = [(', '.join(sources), iterMergedMatches(sources, plan, args.encoding, parallelFilter))]
+    else:
+        streams = [(source, iterSourceMatches(source, plan, args.encoding, parallelFilter)) for source in sources]
+
+    counts = dict((source, 0) for source in sources)
+    status = 1
+    try:
+        for streamName, stream in streams:
+            try:
+                block = []
+                for source, index, line in stream:
+                    counts[source] += 1
+                    if args.count:
+                        continue
+                    prefix = ''
+                    if prefixNames:
+                        prefix = source + ':'
+                    if args.line_number:
+                        line = '{}{}:{}'.format(prefix, index + 1, line)
+                    else:
+                        line = prefix + line
+                    block.append(line)
+                    # Write in blocks, a write per line would dominate the run time
+                    if len(block) >= BLOCK_LINES:
+                        stdout.write(('\n'.join(block) + '\n').encode(args.encoding, 'replace'))
+                        block = []
+                if block:
+                    stdout.write(('\n'.join(block) + '\n').encode(args.encoding, 'replace'))
+            except (IOError, OSError, ValueError) as e:
+                if getattr(e, 'errno', None) == errno.EPIPE:
+                    raise
+                sys.stderr.write('logparser.py: {}: {}\n'.format(streamName, e))
+                status = 2
+
+        if args.count:
+            for source in sources:
+                prefix = ''
+                if prefixNames:
+                    prefix = source + ':'
+                stdout.write('{}{}\n'.format(prefix, counts[source]).encode(args.encoding))
+        stdout.flush()
+    except (IOError, OSError) as e:
+        # The reader went away (e.g. piped into head), which isn't an error
+        if e.errno != errno.EPIPE:
+            raise
+        return 0
+    finally:
+        if parallelFilter is not None:
+            parallelFilter.close()
+
+    if status == 2:
+        return status
+    return 0 if sum(counts.values()) > 0 else 1
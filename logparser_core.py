@@ -0,0 +1,3565 @@
+""" logparser_core.py - Qt-free building blocks used by logparser.py
+
+Everything in this module works on plain Python objects so that it can be used from worker threads and worker
+processes without touching any PyQt widgets.
+
+Line stores:
+    LogParser_LineStore memory-maps a log file and keeps a compact index of line start offsets (8 bytes per line).
+    Lines are only decoded when they are requested, so opening a multi-GB log costs one pass over the file and
+    roughly 8 bytes of RAM per line instead of a full copy of the text.
+
+    A store opened with deferIndex=True is usable right away and indexChunks() builds its index a chunk of the file at
+    a time, e.g. in a background thread.  Until it is done only the first numCompleteLines() lines may be read.
+
+    refresh() picks up data appended to a file that is still being written by indexing only the new bytes, and reports
+    when the file has been truncated or replaced (e.g. by log rotation) and has to be opened again.
+
+Compressed files:
+    openLineStore() recognizes gzip, bzip2, xz and zstd files by their first bytes and opens them as a
+    LogParser_CompressedLineStore, which decompresses the file once to index its lines and afterwards decompresses the
+    segments that are read on demand, keeping a few recent segments in memory.  For gzip a copy of the decompressor's
+    state is saved at the start of every segment (like zlib's zran example), so reading from the middle of the file only
+    decompresses that segment.  The other formats can't save their state, reading them goes forward from the furthest
+    segment decompressed so far or starts over from the beginning.  xz needs the lzma module and zstd the zstandard
+    package, both are optional.
+
+Filter patterns:
+    Filters are substrings by default, /regex/ is a regular expression, /regex/i a case-insensitive one and ~text a
+    case-insensitive substring.  A backslash in front of a filter that would otherwise be special (e.g. \\/usr/ or
+    \\~foo) makes it a plain substring again.  LogParser_Pattern compiles each filter once, through a bounded LRU
+    cache shared by the whole process, so neither filter jobs nor worker processes compile a pattern again.  A regular
+    expression that is plain text is lowered to a substring test, and one that contains a run of plain text only runs
+    the regex engine on lines that contain that text, which keeps most regex filters close to the speed of substring
+    filters.
+
+Field filters:
+    Given a LogParser_FieldFormat (fields separated by a delimiter, the named groups of a regex or the keys of JSON
+    lines), a filter such as level=ERROR or host!=db7 compares one field of the line instead of searching the whole
+    line.  LogParser_FieldColumns parses the lines of a line store once and keeps every field as an array of 16-bit
+    codes into a dictionary of the field's distinct values, so a field filter is a vectorized comparison of integer
+    codes.  Fields with too many distinct values to be worth encoding (e.g. the message) are dropped from the columns
+    and their filters parse the lines instead.
+
+Sidecar index:
+    LogParser_SidecarIndex persists a file's line offsets, plus a trigram index, in a cache directory so that reopening
+    an unchanged file doesn't scan it again.  The file is identified by its path and validated by its size, mtime and
+    a hash of its first and last bytes.  The trigram index records which blocks of BLOCK_LINES lines contain each
+    3-byte sequence.  A filter can only match in blocks that contain all of its trigrams, so the filter thread only
+    tests the lines of those candidate blocks.  The trigram index is built in the filter thread's idle time, like the
+    bitmaps, picking up where the previous idle period left off, and saved once complete.  The directory keeps the
+    most recently used MAX_FILES indexes.
+
+Result cache:
+    LogParser_ResultCache saves the matches a plan has found in a file next to the sidecar indexes, keyed by the file
+    (validated like its sidecar index) and the plan's digest(), which covers the filter groups and every option that
+    changes what they match.  Reopening a known file with known filters shows the saved matches right away and only
+    the lines after them are filtered.  The cache keeps the most recently saved MAX_FILES results.
+
+Filter sets:
+    LogParser_FilterSets keeps named filter groups in a JSON file, so a set of filters used every day can be restored
+    in one go instead of being typed in again.
+
+Filter plans:
+    LogParser_FilterPlan is an immutable snapshot of the GUI's filter groups reduced to plain strings.  A line is
+    displayed when it contains none of the red (omit) filters, at least one green parent filter (if any exist) and, for
+    every group with green children, at least one of those children.  This is the same red/green/AND logic that used to
+    be evaluated on the Qt filter items for every line.
+
+    Small filter sets are checked with plain substring tests.  Once there are many distinct filters the plan switches
+    to a LogParser_AhoCorasick automaton which finds every filter in a line in a single pass, so the cost per line no
+    longer grows with the number of filters.  Both only test decoded lines, line stores are scanned with numpy instead
+    when it is installed, so the automaton mostly serves plans with useNumpy off and lines read from stdin.
+
+Incremental filtering:
+    LogParser_MatchSet remembers which lines matched in the part of the file that has already been filtered.  When the
+    filters change it compares the old and new plans: a plan that can only match fewer lines (e.g. a red filter was
+    added) re-tests just the current matches, a plan that can only match more lines (e.g. a red filter was removed)
+    re-tests just the lines that were excluded.  Only changes that go both ways fall back to filtering from the start.
+
+Sessions:
+    LogParser_Session presents several line stores (e.g. rotated or sharded logs) as one.  LogParser_MergedMatchSet
+    filters every file of a session with its own lazy iterator and merges the matches with a heap on the timestamp that
+    LogParser_TimestampParser finds at the start of each line, so matches are produced in time order as they are needed
+    and no file is ever concatenated in memory.  Lines without a timestamp (e.g. stack traces) take the timestamp of the
+    line they follow.
+
+Time ranges:
+    A filter such as @14:02..14:07 is a time range instead of a text.  LogParser_FilterPlan tests it against the line's
+    timestamp, which is only looked up for lines whose text already passed.  LogParser_TimeIndex samples the timestamp
+    of one line in every SAMPLE_LINES, and when those samples are in order a green time range is binary searched to the
+    lines that can be in it, the rest of the file is never read.
+
+Bitmap cache:
+    LogParser_BitmapCache stores, for each (file, filter string), a zlib-compressed bitmap of the lines that match the
+    filter.  Once every filter of a plan has a bitmap the whole file is filtered with bitwise AND/OR/AND NOT operations
+    instead of substring searches, so toggling filters back and forth doesn't repeat work.  The cache has a memory
+    budget and evicts the least recently used bitmaps.
+
+Filter statistics:
+    LogParser_FilterStats counts, in the pass that finds the matches of a plan, how many lines each filter occurs in
+    and how many lines match in each block of the file.  The blocks' filter hits are combined as bitmaps, so gathering
+    the statistics doesn't take a second scan or a per-line evaluation of the plan.
+
+Metrics:
+    LogParser_Metrics adds up the time spent loading, filtering, displaying and painting, with the lines, bytes and
+    matches each stage handled and how many batches the filter thread sent to the display.  Stages record once per
+    batch or job, never per line, so the metrics are always on.  They can be exported as JSON, together with rates and
+    the peak resident set size, and profileCall() optionally runs each job under cProfile and saves its profile.
+
+NumPy scanning:
+    When numpy is installed, filter plans scan line stores as raw byte chunks instead of decoded lines.  Newlines are
+    found with numpy, every substring filter is searched for with bytes.find over the whole chunk (skipping to the next
+    line after each hit, or with vectorized byte comparisons once it turns out to be frequent), the hits are mapped to
+    line numbers with searchsorted and the red/green/AND logic is applied as boolean operations on per-line arrays.
+    Only the matching lines, and the candidate lines of regular expression and case-insensitive filters, are ever
+    decoded.
+
+Export:
+    exportMatches() streams every matching line of a file, or session, to a (optionally gzip-compressed) file a block
+    at a time with buffered writes, so its memory use doesn't grow with the size of the output.
+
+Parallel filtering:
+    LogParser_ParallelFilter splits a line store into byte-range chunks that start and end on line boundaries and
+    filters them in a pool of worker processes.  Each worker maps the file itself and only sends back the indexes of
+    matching lines, which are handed out strictly in file order as soon as the earliest outstanding chunk is done.
+"""
+import binascii
+import cProfile
+import bisect
+import calendar
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from collections import deque
+
+# Parser of regular expression syntax, used to find the literal text a regular expression requires
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# Decompressors for the optional compressed formats
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Peak memory use of the process, not available on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Optional engine that filters raw bytes with vectorized operations
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Exceptions the decompressors raise for corrupt data
+DECOMPRESSION_ERRORS = (zlib.error, EOFError, IOError, OSError)
+if lzma is not None:
+    DECOMPRESSION_ERRORS += (lzma.LZMAError,)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+# Typecode used for line offset arrays, unsigned 64-bit where the platform supports it
+try:
+    array('Q')
+    OFFSET_TYPECODE = 'Q'
+except ValueError:
+    OFFSET_TYPECODE = 'L'
+
+# Typecode used for arrays of block numbers, unsigned 32-bit
+BLOCK_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+# First bytes of the compressed formats that can be opened, and their names
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bzip2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+# Size of the buffered writes of exported matches, and the gzip level of compressed exports (favouring speed)
+EXPORT_WRITE_BYTES = 1024 * 1024
+EXPORT_COMPRESS_LEVEL = 6
+
+# Where sidecar indexes are kept unless another directory is configured
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'logparser')
+
+# Where named filter sets are saved unless another file is configured
+DEFAULT_FILTER_SETS_FILE = os.path.join(os.path.expanduser('~'), '.config', 'logparser', 'filtersets.json')
+
+
+class LogParser_LineStore(object):
+    """
+    Read-only, memory-mapped view of a log file that can be indexed like the list returned by split('\\n').
+
+    Line i spans the bytes [offsets[i], offsets[i + 1] - 1), the last line ends at the end of the file.  A file that
+    ends with a newline therefore has a trailing empty line, exactly like str.split('\\n').
+    """
+    # Number of lines decoded per block when iterating sequentially
+    BLOCK_LINES = 4096
+
+    # Number of bytes indexed at a time by indexChunks()
+    INDEX_CHUNK_BYTES = 16 * 1024 * 1024
+
+    # Number of bytes at the start of the file whose hash tells refresh() an appended file from a rewritten one
+    HEAD_BYTES = 4096
+
+    # Worker processes can map the file themselves and filter byte ranges of it
+    memoryMapped = True
+
+    # Results of refresh()
+    REFRESH_UNCHANGED, REFRESH_APPENDED, REFRESH_REPLACED = range(3)
+
+    def __init__(self, fname, encoding='utf-8', indexDir=None, deferIndex=False):
+        """
+        Open and index a log file.
+
+        :param fname: str - path of the file to open
+        :param encoding: str - encoding used to decode lines, undecodable bytes are replaced
+        :param indexDir: str - directory of sidecar indexes, None to always index the file from scratch
+        :param deferIndex: bool - leave indexing the lines to indexChunks(), unless a sidecar index has them
+        """
+        self.fname = fname
+        self.encoding = encoding
+        self._file = open(fname, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        # Identifies this version of the file in caches, a modified file gets a new identity
+        self.identity = (os.path.abspath(fname), stat.st_size, stat.st_mtime)
+
+        # Zero length files can't be mapped, they simply contain one empty line
+        self._map = None
+        if self.size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._setHead(self._map)
+
+        # Sparse index of the line timestamps, built the first time a time range is filtered
+        self._timeIndex = None
+        # Dictionary-encoded fields of the lines, built as field filters need them
+        self._fieldColumns = None
+
+        # Start offset of every line in the file, read from the sidecar index if an up to date one exists
+        self.sidecar = None
+        if indexDir:
+            self.sidecar = LogParser_SidecarIndex(self, indexDir)
+        self.offsets = None
+        if self.sidecar is not None:
+            self.offsets = self.sidecar.load()
+        # Bytes of the file that have been searched for line starts, all of them once indexed is True
+        self.indexedBytes = self.size
+        self.indexed = True
+        if self.offsets is None:
+            self.offsets = array(OFFSET_TYPECODE, [0])
+            if deferIndex and self.size > 0:
+                self.indexedBytes = 0
+                self.indexed = False
+            else:
+                self._buildIndex(0)
+                if self.sidecar is not None:
+                    self.sidecar.save()
+
+    def _setHead(self, fileMap):
+        """
+        Remember the hash of the start of the file, so refresh() notices when it no longer has the same start.
+
+        :param fileMap: mmap - the mapped file, None if it is empty
+        """
+        head = fileMap[:self.HEAD_BYTES] if fileMap is not None else b''
+        self._headBytes = len(head)
+        self._headDigest = hashlib.sha1(head).digest()
+
+    def _buildIndex(self, start, stop=None):
+        """
+        Record the start offset of every line that starts after a newline in [start, stop), in a single pass over the
+        mapped file.
+
+        :param start: int - byte offset to start searching for newlines from
+        :param stop: int - byte offset to stop searching at, defaults to the end of the file
+        """
+        if self._map is None:
+            return
+        if stop is None:
+            stop = self.size
+
+        find = self._map.find
+        append = self.offsets.append
+        position = find(b'\n', start, stop)
+        while position != -1:
+            append(position + 1)
+            position = find(b'\n', position + 1, stop)
+
+    def indexChunks(self, chunkBytes=None):
+        """
+        Index the lines of a store opened with deferIndex, a chunk of the file at a time.
+
+        This may run in a background thread while other threads read the lines indexed so far: offsets are only ever
+        appended to, and the first numCompleteLines() lines don't change once indexed.  Stopping the iteration early
+        leaves the rest of the file unindexed.
+
+        :param chunkBytes: int - number of bytes indexed per step, defaults to INDEX_CHUNK_BYTES
+        :return: generator - yields the number of bytes indexed so far after every chunk
+        """
+        if chunkBytes is None:
+            chunkBytes = self.INDEX_CHUNK_BYTES
+        while not self.indexed:
+            stop = min(self.indexedBytes + chunkBytes, self.size)
+            self._buildIndex(self.indexedBytes, stop)
+            self.indexedBytes = stop
+            if stop == self.size:
+                self.indexed = True
+                if self.sidecar is not None:
+                    self.sidecar.save()
+            yield stop
+
+    def numCompleteLines(self):
+        """
+        :return: int - number of lines whose end is known, i.e. every line once the file is indexed.  While it is
+                       still being indexed the last line found so far may continue past the indexed bytes.
+        """
+        if self.indexed:
+            return len(self.offsets)
+        return len(self.offsets) - 1
+
+    def refresh(self):
+        """
+        Check the file on disk for changes since it was opened or last refreshed.
+
+        Appended data is mapped and indexed without reading the existing part of the file again.  A file that shrank,
+        whose path now refers to a different file or whose start has changed (it was truncated and written again in
+        place, e.g. by logrotate's copytruncate, and has since grown past its old size) can't be extended and has to be
+        opened again.
+
+        :return: int - REFRESH_UNCHANGED, REFRESH_APPENDED or REFRESH_REPLACED
+        """
+        try:
+            pathStat = os.stat(self.fname)
+        except OSError:
+            # Rotated away and not recreated yet, keep showing what we have
+            return self.REFRESH_UNCHANGED
+
+        stat = os.fstat(self._file.fileno())
+        if (pathStat.st_dev, pathStat.st_ino) != (stat.st_dev, stat.st_ino) or stat.st_size < self.size:
+            return self.REFRESH_REPLACED
+        # Appended data is picked up once indexChunks() has caught up with the size the file was opened with
+        if stat.st_size == self.size or not self.indexed:
+            return self.REFRESH_UNCHANGED
+
+        fileMap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hashlib.sha1(fileMap[:self._headBytes]).digest() != self._headDigest:
+            fileMap.close()
+            return self.REFRESH_REPLACED
+
+        # The previous map is left for the garbage collector, readers may still hold a reference to it
+        oldSize = self.size
+        # The sidecar index only describes the file as it was opened
+        self.sidecar = None
+        self._map = fileMap
+        # A file that was shorter than HEAD_BYTES has more of a start to compare now
+        self._setHead(fileMap)
+        self.size = stat.st_size
+        self.indexedBytes = stat.st_size
+        self.identity = (os.path.abspath(self.fname), stat.st_size, stat.st_mtime)
+        # The last line may have been continued, its fields are parsed again
+        if self._fieldColumns is not None:
+            self._fieldColumns.truncate(len(self.offsets) - 1)
+        self._buildIndex(oldSize)
+        return self.REFRESH_APPENDED
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        numLines = len(self.offsets)
+        if index < 0:
+            index += numLines
+        if index < 0 or index >= numLines:
+            raise IndexError('line index out of range')
+
+        return self._decode(self._lineBytes(index))
+
+    def _lineBytes(self, index):
+        if self._map is None:
+            return b''
+
+        start = self.offsets[index]
+        if index + 1 < len(self.offsets):
+            end = self.offsets[index + 1] - 1
+        else:
+            end = self.size
+        data = self._map[start:end]
+
+        # Drop the carriage return of Windows line endings, text mode reads did the same
+        if data.endswith(b'\r'):
+            data = data[:-1]
+        return data
+
+    def _decode(self, data):
+        return data.decode(self.encoding, 'replace')
+
+    def rawLines(self, start, stop):
+        """
+        :param start: int - first line
+        :param stop: int - one past the last line
+        :return: bytes - the lines as they are in the file, without decoding them, each ending with its newline
+        """
+        if self._map is None or start >= stop:
+            return b''
+        if stop < len(self.offsets):
+            return self._map[self.offsets[start]:self.offsets[stop]]
+        # The final line of the file has no newline of its own
+        return self._map[self.offsets[start]:self.size] + b'\n'
+
+    def iterLines(self, start=0, stop=None):
+        """
+        Yield (index, line) pairs for a range of lines.
+
+        Lines are decoded a block at a time which is considerably cheaper than indexing line by line.
+
+        :param start: int - first line to yield
+        :param stop: int - one past the last line to yield, defaults to the end of the file
+        """
+        numLines = len(self.offsets)
+        if stop is None or stop > numLines:
+            stop = numLines
+
+        while start < stop:
+            blockStop = min(start + self.BLOCK_LINES, stop)
+
+            # The final line of the file has no trailing newline to strip
+            if blockStop < numLines:
+                end = self.offsets[blockStop] - 1
+            else:
+                end = self.size
+
+            if self._map is None:
+                block = ''
+            else:
+                block = self._decode(self._map[self.offsets[start]:end])
+
+            for line in block.split('\n'):
+                if line.endswith('\r'):
+                    line = line[:-1]
+                yield start, line
+                start += 1
+
+    def chunkRanges(self, start=0, stop=None, chunkBytes=4 * 1024 * 1024):
+        """
+        Split a range of lines into chunks of roughly chunkBytes that start and end on line boundaries.
+
+        :param start: int - first line of the range
+        :param stop: int - one past the last line of the range, defaults to the end of the file
+        :param chunkBytes: int - target size of each chunk
+        :return: list - (firstLine, stopLine, startByte, endByte) tuples, endByte excludes the final newline
+        """
+        numLines = len(self.offsets)
+        if stop is None or stop > numLines:
+            stop = numLines
+
+        chunks = []
+        while start < stop:
+            # First line that starts at least chunkBytes past this chunk's start, always at least one line
+            chunkStop = bisect.bisect_left(self.offsets, self.offsets[start] + chunkBytes, start + 1, stop)
+            if chunkStop < numLines:
+                endByte = self.offsets[chunkStop] - 1
+            else:
+                endByte = self.size
+            chunks.append((start, chunkStop, self.offsets[start], endByte))
+            start = chunkStop
+        return chunks
+
+    def lineHits(self, text, start, stop):
+        """
+        Find the lines that contain a string with searches over the raw bytes of the file.
+
+        :param text: str - non-empty string to search for
+        :param start: int - first line to search
+        :param stop: int - one past the last line to search
+        :return: list - indexes of the lines that contain text
+        """
+        hits = []
+        if self._map is None or start >= stop:
+            return hits
+
+        needle = text.encode(self.encoding)
+        offsets = self.offsets
+        if stop < len(offsets):
+            endByte = offsets[stop] - 1
+        else:
+            endByte = self.size
+
+        find = self._map.find
+        position = find(needle, offsets[start], endByte)
+        while position != -1:
+            index = bisect.bisect_right(offsets, position, start, stop) - 1
+            hits.append(index)
+            # Skip the rest of the line, it only needs to be found once
+            if index + 1 >= stop:
+                break
+            position = find(needle, offsets[index + 1], endByte)
+        return hits
+
+    def patternHits(self, pattern, start, stop):
+        """
+        Find the lines that match a pattern.  Substrings are searched for in the raw bytes, see lineHits(), other
+        patterns are tested line by line.
+
+        :param pattern: LogParser_Pattern - the pattern to search for
+        :param start: int - first line to search
+        :param stop: int - one past the last line to search
+        :return: list - indexes of the lines that match pattern
+        """
+        if pattern.kind == LogParser_Pattern.KIND_LITERAL:
+            return self.lineHits(pattern.literal, start, stop)
+        if pattern.kind == LogParser_Pattern.KIND_FIELD:
+            columns = self.fieldColumns(pattern.fieldFormat)
+            columns.extend(self, stop)
+            hits = columns.hits(pattern.fieldIndex, pattern.value, pattern.negated, start, stop)
+            if hits is not None:
+                return hits
+        search = pattern.search
+        return [index for index, line in self.iterLines(start, stop) if search(line)]
+
+    def fieldColumns(self, fieldFormat):
+        """
+        :param fieldFormat: LogParser_FieldFormat - how the lines are split into fields
+        :return: LogParser_FieldColumns - the encoded fields of the lines parsed so far, extend() them as needed
+        """
+        columns = self._fieldColumns
+        if columns is None or columns.fieldFormat.spec != fieldFormat.spec:
+            columns = LogParser_FieldColumns(fieldFormat)
+            self._fieldColumns = columns
+        return columns
+
+    def iterFieldMatches(self, plan, start=0, stop=None):
+        """
+        Filter a range of lines a block at a time by combining the hits of each filter as bitmaps, like
+        LogParser_FilterStats does, so field filters are answered from the field columns instead of parsing every
+        line.  Time ranges are ignored.
+
+        :param plan: LogParser_FilterPlan - the filters
+        :param start: int - first line to test
+        :param stop: int - one past the last line to test, defaults to the end of the file
+        :return: generator - indexes of the matching lines
+        """
+        numLines = len(self.offsets)
+        if stop is None or stop > numLines:
+            stop = numLines
+
+        while start < stop:
+            blockStop = min(start + self.BLOCK_LINES, stop)
+            blockLines = blockStop - start
+            bitmaps = {}
+            for text, pattern in zip(plan.filterTexts, plan.patterns):
+                bitmaps[text] = _bitmapFromIndexes(self.patternHits(pattern, start, blockStop), start, blockLines)
+            if plan.skipEmptyLines:
+                bitmaps[LogParser_BitmapCache.EMPTY_LINES] = _bitmapFromIndexes(
+                    self.emptyLineHits(start, blockStop), start, blockLines)
+            for index in bitmapIndexes(evaluateBitmaps(plan, blockLines, bitmaps.get)):
+                yield start + index
+            start = blockStop
+
+    def emptyLineHits(self, start, stop):
+        """
+        :param start: int - first line to check
+        :param stop: int - one past the last line to check
+        :return: list - indexes of the empty lines (a lone carriage return counts as empty)
+        """
+        offsets = self.offsets
+        numLines = len(offsets)
+        hits = []
+        for index in range(start, stop):
+            if index + 1 < numLines:
+                length = offsets[index + 1] - 1 - offsets[index]
+            else:
+                length = self.size - offsets[index]
+            if length == 0 or (length == 1 and self._map[offsets[index]:offsets[index] + 1] == b'\r'):
+                hits.append(index)
+        return hits
+
+    def iterScanMatches(self, plan, start=0, stop=None):
+        """
+        Filter a range of lines a chunk of raw bytes at a time with LogParser_FilterPlan.scanBytes().  Time ranges are
+        ignored.
+
+        :param plan: LogParser_FilterPlan - the filters
+        :param start: int - first line to filter
+        :param stop: int - one past the last line to filter, defaults to the end of the file
+        :return: generator - indexes of the matching lines, in order
+        """
+        for firstLine, stopLine, startByte, endByte in self.chunkRanges(start, stop):
+            data = b''
+            if self._map is not None:
+                data = self._map[startByte:endByte]
+            for index in plan.scanBytes(data, self.encoding).tolist():
+                yield firstLine + index
+
+    def timeRanges(self, plan):
+        """
+        Find the lines that can match the green time range filters of a plan, using the time index.
+
+        :param plan: LogParser_FilterPlan - the filters
+        :return: list - sorted (start, stop) line ranges outside of which no line matches, None for all lines
+        """
+        # The time index samples the whole file, a file that is still being indexed is filtered line by line
+        if not plan.includeTimes or not self.indexed:
+            return None
+
+        # The index is built again once the file has grown or the timestamp formats changed
+        timeIndex = self._timeIndex
+        if timeIndex is None or timeIndex.numLines != len(self) or \
+                timeIndex.timestampParser.formats != plan.timestampParser.formats:
+            timeIndex = LogParser_TimeIndex(self, plan.timestampParser)
+            self._timeIndex = timeIndex
+        return timeIndex.lineRanges(plan.includeTimes)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class LogParser_CompressedFile(object):
+    """
+    Random access to the decompressed contents of a compressed file.  Supports the parts of the mmap interface that
+    LogParser_LineStore uses: slicing and find().
+
+    The decompressed data is split into segments of at least SEGMENT_BYTES while the file is scanned.  Segments are
+    decompressed on demand and the most recently used ones are kept.  All access is serialized with a lock, since the
+    GUI and the filter thread read lines at the same time.
+    """
+    # Decompressed size of a segment, the unit of random access
+    SEGMENT_BYTES = 8 * 1024 * 1024
+
+    # Amount of compressed data fed to the decompressor at a time
+    READ_BYTES = 256 * 1024
+
+    # Number of decompressed segments kept in memory
+    CACHED_SEGMENTS = 8
+
+    def __init__(self, fname, compression):
+        """
+        :param fname: str - path of the compressed file
+        :param compression: str - one of the names in COMPRESSION_MAGIC
+        """
+        self.compression = compression
+        # Fails early if the module for this format isn't installed
+        _newDecompressor(compression)
+        self._file = open(fname, 'rb')
+        self._lock = threading.Lock()
+        self.size = 0
+        # Decompressed offset of each segment, and the compressed offset and saved decompressor (gzip only) it starts at
+        self._starts = [0]
+        self._checkpoints = [(0, None)]
+        # Recently used segments, least recently used first
+        self._segments = OrderedDict()
+        # (segment, decompressor, compressed offset) to continue from for formats without checkpoints
+        self._stream = None
+
+    def scan(self):
+        """
+        Decompress the whole file once, recording where each segment starts.
+
+        :return: generator - (offset, data) for consecutive pieces of the decompressed contents
+        """
+        decompressor = _newDecompressor(self.compression)
+        canCopy = self.compression == 'gzip'
+        self._starts = [0]
+        self._checkpoints = [(0, decompressor.copy() if canCopy else None)]
+        self._file.seek(0)
+        compressedPosition = 0
+        position = 0
+        while True:
+            chunk = self._file.read(self.READ_BYTES)
+            if not chunk:
+                break
+            decompressor, data = self._feed(decompressor, chunk)
+            compressedPosition += len(chunk)
+            if data:
+                yield position, data
+                position += len(data)
+
+            # Segments start between reads, where the decompressor has consumed all input fed to it
+            if position - self._starts[-1] >= self.SEGMENT_BYTES:
+                self._starts.append(position)
+                self._checkpoints.append((compressedPosition, decompressor.copy() if canCopy else None))
+        self.size = position
+
+    def _feed(self, decompressor, data):
+        """
+        :return: tuple - (decompressor to feed the following data to, decompressed data)
+        """
+        output = []
+        while data:
+            try:
+                output.append(decompressor.decompress(data))
+            except DECOMPRESSION_ERRORS as e:
+                raise IOError('Invalid {} data: {}'.format(self.compression, e))
+            data = getattr(decompressor, 'unused_data', b'')
+            # Concatenated streams (e.g. gzip members appended to each other) each need a fresh decompressor
+            if data or getattr(decompressor, 'eof', False):
+                decompressor = _newDecompressor(self.compression)
+        return decompressor, b''.join(output)
+
+    def _decompressSegment(self, index):
+        compressedStart, checkpoint = self._checkpoints[index]
+        if checkpoint is not None:
+            current, decompressor, compressedPosition = index, checkpoint.copy(), compressedStart
+        elif self._stream is not None and self._stream[0] <= index:
+            current, decompressor, compressedPosition = self._stream
+        else:
+            current, decompressor, compressedPosition = 0, _newDecompressor(self.compression), 0
+
+        # Without a checkpoint every segment before the requested one has to be decompressed again
+        self._file.seek(compressedPosition)
+        while True:
+            compressedStop = None
+            if current + 1 < len(self._checkpoints):
+                compressedStop = self._checkpoints[current + 1][0]
+            output = []
+            while compressedStop is None or compressedPosition < compressedStop:
+                readBytes = self.READ_BYTES
+                if compressedStop is not None:
+                    readBytes = min(readBytes, compressedStop - compressedPosition)
+                chunk = self._file.read(readBytes)
+                if not chunk:
+                    break
+                decompressor, data = self._feed(decompressor, chunk)
+                output.append(data)
+                compressedPosition += len(chunk)
+            current += 1
+            if current > index:
+                break
+
+        self._stream = (current, decompressor, compressedPosition)
+        return b''.join(output)
+
+    def _segment(self, index):
+        with self._lock:
+            data = self._segments.pop(index, None)
+            if data is None:
+                data = self._decompressSegment(index)
+            self._segments[index] = data
+            while len(self._segments) > self.CACHED_SEGMENTS:
+                self._segments.popitem(last=False)
+            return data
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        start, stop, _ = key.indices(self.size)
+        parts = []
+        while start < stop:
+            index = bisect.bisect_right(self._starts, start) - 1
+            segmentStart = self._starts[index]
+            segment = self._segment(index)
+            parts.append(segment[start - segmentStart:stop - segmentStart])
+            start = segmentStart + len(segment)
+        return b''.join(parts)
+
+    def find(self, sub, start=0, end=None):
+        """
+        :return: int - lowest offset in [start, end) where sub is found, or -1
+        """
+        if end is None or end > self.size:
+            end = self.size
+        position = start
+        while position < end:
+            index = bisect.bisect_right(self._starts, position) - 1
+            segmentStart = self._starts[index]
+            segment = self._segment(index)
+            segmentEnd = segmentStart + len(segment)
+            found = segment.find(sub, position - segmentStart, min(end, segmentEnd) - segmentStart)
+            if found != -1:
+                return segmentStart + found
+            if segmentEnd >= end:
+                break
+
+            # A match may straddle the end of this segment
+            overlapStart = max(position, segmentEnd - len(sub) + 1)
+            found = self[overlapStart:min(end, segmentEnd + len(sub) - 1)].find(sub)
+            if found != -1:
+                return overlapStart + found
+            position = segmentEnd
+        return -1
+
+    def close(self):
+        self._segments.clear()
+        self._checkpoints = []
+        self._stream = None
+        self._file.close()
+
+
+class LogParser_CompressedLineStore(LogParser_LineStore):
+    """
+    LogParser_LineStore for a compressed file, read through a LogParser_CompressedFile instead of a memory map.
+    """
+    # Worker processes can't map a compressed file, parallel filter jobs filter it in the filter thread instead
+    memoryMapped = False
+
+    def __init__(self, fname, encoding='utf-8', indexDir=None):
+        """
+        Open and index a compressed log file, this decompresses it once.
+
+        :param fname: str - path of the file to open
+        :param encoding: str - encoding used to decode lines, undecodable bytes are replaced
+        :param indexDir: str - ignored, sidecar indexes are only kept for uncompressed files
+        """
+        self.fname = fname
+        self.encoding = encoding
+        self._file = open(fname, 'rb')
+        stat = os.fstat(self._file.fileno())
+        # The identity covers the compressed file, it changes whenever the contents do
+        self.identity = (os.path.abspath(fname), stat.st_size, stat.st_mtime)
+        self.sidecar = None
+        self._timeIndex = None
+        self._fieldColumns = None
+
+        self._map = LogParser_CompressedFile(fname, compressionFormat(fname))
+        self.offsets = array(OFFSET_TYPECODE, [0])
+        append = self.offsets.append
+        for position, data in self._map.scan():
+            found = data.find(b'\n')
+            while found != -1:
+                append(position + found + 1)
+                found = data.find(b'\n', found + 1)
+        self.size = self._map.size
+        self.indexedBytes = self.size
+        self.indexed = True
+
+        # Like an empty uncompressed file, nothing needs to be read
+        if self.size == 0:
+            self._map.close()
+            self._map = None
+
+    def refresh(self):
+        """
+        A compressed file can't be extended, any change means it has to be opened again.
+
+        :return: int - REFRESH_UNCHANGED or REFRESH_REPLACED
+        """
+        try:
+            pathStat = os.stat(self.fname)
+        except OSError:
+            return self.REFRESH_UNCHANGED
+
+        stat = os.fstat(self._file.fileno())
+        if (pathStat.st_dev, pathStat.st_ino) != (stat.st_dev, stat.st_ino) or \
+                (stat.st_size, stat.st_mtime) != self.identity[1:]:
+            return self.REFRESH_REPLACED
+        return self.REFRESH_UNCHANGED
+
+
+def compressionFormat(fname):
+    """
+    :param fname: str - path of a file
+    :return: str - name of the file's compressed format (see COMPRESSION_MAGIC), or None if it isn't compressed
+    """
+    with open(fname, 'rb') as f:
+        head = f.read(8)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def openLineStore(fname, encoding='utf-8', indexDir=None, deferIndex=False):
+    """
+    Open a log file with the line store that suits it.
+
+    :param fname: str - path of the file to open
+    :param encoding: str - encoding used to decode lines
+    :param indexDir: str - directory of sidecar indexes, None to always index the file from scratch
+    :param deferIndex: bool - leave indexing an uncompressed file to its indexChunks(), compressed files are always
+                              indexed while they are opened
+    :return: LogParser_LineStore - a LogParser_CompressedLineStore for compressed files
+    """
+    if compressionFormat(fname) is None:
+        return LogParser_LineStore(fname, encoding, indexDir, deferIndex)
+    return LogParser_CompressedLineStore(fname, encoding, indexDir)
+
+
+def _newDecompressor(compression):
+    """
+    :param compression: str - one of the names in COMPRESSION_MAGIC
+    :return: object - a streaming decompressor with decompress() and unused_data
+    """
+    if compression == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == 'bzip2' and bz2 is not None:
+        return bz2.BZ2Decompressor()
+    if compression == 'xz' and lzma is not None:
+        return lzma.LZMADecompressor()
+    if compression == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError('Opening {} compressed files requires the {} module'.format(
+        compression, {'bzip2': 'bz2', 'xz': 'lzma', 'zstd': 'zstandard'}.get(compression, compression)))
+
+
+class LogParser_SidecarIndex(object):
+    """
+    Line offsets and trigram index of a line store, saved to and loaded from a file in a cache directory.
+
+    The index file holds a magic line, a JSON header line, the raw line offsets and the zlib-compressed trigram
+    postings.  Arrays are stored little-endian.  A file that can't be read or written is simply ignored, the index only
+    makes things faster.
+    """
+    MAGIC = b'LOGPARSER-INDEX 1\n'
+
+    # Number of bytes at the start and end of the file that are hashed to validate the index
+    SAMPLE_BYTES = 64 * 1024
+
+    # Trigrams found in more than this fraction of the blocks hardly narrow down a search, they aren't stored
+    COMMON_FRACTION = 0.5
+
+    # Number of index files kept, the least recently used ones are removed first
+    MAX_FILES = 256
+
+    def __init__(self, store, indexDir):
+        """
+        :param store: LogParser_LineStore - the file to index, its offsets are loaded or built after this
+        :param indexDir: str - directory the index file is kept in
+        """
+        self.store = store
+        name = hashlib.sha1(os.path.abspath(store.fname).encode('utf-8')).hexdigest()
+        self.path = os.path.join(indexDir, name + '.idx')
+        self.signature = self._signature()
+        # Trigram -> array of the blocks that contain it, None until built or loaded
+        self.postings = None
+        # Trigrams that are in too many blocks to be worth storing
+        self.common = frozenset()
+        # (postings, next block, number of lines) of an interrupted build(), which the next build() continues
+        self._partial = None
+
+    def _signature(self):
+        store = self.store
+        digest = hashlib.sha1()
+        if store._map is not None:
+            digest.update(store._map[:self.SAMPLE_BYTES])
+            digest.update(store._map[max(0, store.size - self.SAMPLE_BYTES):])
+        return [store.size, store.identity[2], digest.hexdigest()]
+
+    def load(self):
+        """
+        Read the index file if it describes the current contents of the file.
+
+        :return: array - the line offsets, or None if there is no valid index
+        """
+        try:
+            with open(self.path, 'rb') as indexFile:
+                if indexFile.readline() != self.MAGIC:
+                    return None
+                header = json.loads(indexFile.readline().decode('utf-8'))
+                if header['signature'] != self.signature or header['offsetSize'] != array(OFFSET_TYPECODE).itemsize:
+                    return None
+                offsetBytes = indexFile.read(header['offsetBytes'])
+                if not offsetBytes or len(offsetBytes) != header['offsetBytes']:
+                    return None
+                offsets = _arrayFromBytes(OFFSET_TYPECODE, offsetBytes)
+                postingBytes = indexFile.read(header['postingBytes'])
+                if header['blockLines'] == self.store.BLOCK_LINES and postingBytes:
+                    self.postings = _unpackPostings(zlib.decompress(postingBytes))
+                    self.common = frozenset(header['common'])
+        except (IOError, OSError, ValueError, KeyError, struct.error, zlib.error):
+            self.postings = None
+            return None
+
+        # Mark the index file as recently used so pruning the index directory keeps it
+        try:
+            os.utime(self.path, None)
+        except OSError:
+            pass
+        return offsets
+
+    def save(self):
+        """
+        Write the line offsets and, once built, the trigram index to the index file.
+        """
+        offsetBytes = _arrayToBytes(self.store.offsets)
+        postingBytes = b''
+        if self.postings is not None:
+            postingBytes = zlib.compress(_packPostings(self.postings), 1)
+        header = {
+            'signature': self.signature,
+            'blockLines': self.store.BLOCK_LINES,
+            'offsetSize': self.store.offsets.itemsize,
+            'offsetBytes': len(offsetBytes),
+            'postingBytes': len(postingBytes),
+            'common': sorted(self.common),
+        }
+
+        # Write to a temporary file first so a crash never leaves a truncated index behind
+        temporaryPath = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with open(temporaryPath, 'wb') as indexFile:
+                indexFile.write(self.MAGIC)
+                indexFile.write(json.dumps(header).encode('utf-8') + b'\n')
+                indexFile.write(offsetBytes)
+                indexFile.write(postingBytes)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(temporaryPath, self.path)
+            _pruneCacheDir(os.path.dirname(self.path), '.idx', self.MAX_FILES)
+        except (IOError, OSError):
+            pass
+
+    def build(self):
+        """
+        Build the trigram index and save it.
+
+        This is a generator that yields after each block so the caller can interrupt it.  The blocks indexed so far are
+        kept, so building a large file's index can take several idle periods.
+        """
+        store = self.store
+        offsets = store.offsets
+        numLines = len(store)
+        blockLines = store.BLOCK_LINES
+        numBlocks = (numLines + blockLines - 1) // blockLines
+
+        if self._partial is None or self._partial[2] != numLines:
+            self._partial = ({}, 0, numLines)
+        postings, nextBlock, _ = self._partial
+        for block in range(nextBlock, numBlocks):
+            first = block * blockLines
+            stop = min(first + blockLines, numLines)
+            if store._map is not None:
+                startByte = offsets[first]
+                endByte = offsets[stop] if stop < numLines else store.size
+                for trigram in self._blockTrigrams(startByte, endByte):
+                    blocks = postings.get(trigram)
+                    if blocks is None:
+                        blocks = postings[trigram] = array(BLOCK_TYPECODE)
+                    blocks.append(block)
+            self._partial = (postings, block + 1, numLines)
+            yield
+
+        self._partial = None
+        limit = numBlocks * self.COMMON_FRACTION
+        self.common = frozenset(trigram for trigram, blocks in postings.items() if len(blocks) > limit)
+        for trigram in self.common:
+            del postings[trigram]
+        self.postings = postings
+        self.save()
+
+    def _blockTrigrams(self, startByte, endByte):
+        """
+        :return: iterable - the distinct trigrams in a byte range of the mapped file, as a << 16 | b << 8 | c
+        """
+        if numpy is not None:
+            data = numpy.frombuffer(self.store._map, dtype=numpy.uint8, count=endByte - startByte, offset=startByte)
+            data = data.astype(numpy.uint32)
+            return numpy.unique(data[:-2] << 16 | data[1:-1] << 8 | data[2:]).tolist()
+        data = bytearray(self.store._map[startByte:endByte])
+        return [a << 16 | b << 8 | c for a, b, c in set(zip(data, data[1:], data[2:]))]
+
+    def _textBlocks(self, text):
+        """
+        :param text: str - the substring a filter requires (LogParser_Pattern.literal), or None
+        :return: set - the blocks that may contain text, or None if it could be in any block
+        """
+        if not text:
+            return None
+        # Decoding replaces invalid bytes with U+FFFD, so such a filter may match lines that don't contain its bytes
+        if u'\ufffd' in text:
+            return None
+        try:
+            data = bytearray(text.encode(self.store.encoding))
+        except UnicodeError:
+            return None
+
+        candidates = None
+        for a, b, c in set(zip(data, data[1:], data[2:])):
+            trigram = a << 16 | b << 8 | c
+            if trigram in self.common:
+                continue
+            blocks = set(self.postings.get(trigram, ()))
+            if candidates is None:
+                candidates = blocks
+            else:
+                candidates &= blocks
+        return candidates
+
+    def candidateBlocks(self, plan):
+        """
+        Find the blocks that can contain lines matched by a plan.
+
+        :param plan: LogParser_FilterPlan - the filters
+        :return: set - block numbers, a line's block is its index // BLOCK_LINES, or None if any block could match
+        """
+        if self.postings is None:
+            return None
+
+        # Only the substring a pattern requires can be looked up
+        literals = dict((text, pattern.literal) for text, pattern in zip(plan.filterTexts, plan.patterns))
+        candidates = None
+        for texts in plan.requiredSets:
+            # A matching line contains at least one text of every required set
+            setBlocks = set()
+            for text in texts:
+                blocks = self._textBlocks(literals[text])
+                if blocks is None:
+                    setBlocks = None
+                    break
+                setBlocks |= blocks
+            if setBlocks is None:
+                continue
+            if candidates is None:
+                candidates = setBlocks
+            else:
+                candidates &= setBlocks
+        return candidates
+
+
+class LogParser_ResultCache(object):
+    """
+    Matches of filter plans in line stores, saved to files in a cache directory.
+
+    A result file holds a magic line, a JSON header line and the zlib-compressed indexes of the matching lines among
+    the first cursor lines of the file.  Like sidecar indexes, result files that can't be read or written are simply
+    ignored.
+    """
+    MAGIC = b'LOGPARSER-RESULTS 1\n'
+
+    # Number of result files kept, the least recently saved ones are removed first
+    MAX_FILES = 256
+
+    def __init__(self, cacheDir):
+        """
+        :param cacheDir: str - directory the result files are kept in
+        """
+        self.cacheDir = cacheDir
+        # Cursor of the results saved in, or loaded from, each result file, so results aren't saved again unless they
+        # cover more of the file
+        self._cursors = {}
+
+    def _path(self, store, plan):
+        key = json.dumps([os.path.abspath(store.fname), plan.digest()])
+        return os.path.join(self.cacheDir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.res')
+
+    def load(self, store, plan):
+        """
+        Read the saved matches of a plan in a store, if they were saved for the current contents of the file.
+
+        :param store: LogParser_LineStore - the file, only stores with a sidecar index have results
+        :param plan: LogParser_FilterPlan - the filters
+        :return: tuple - (cursor, matches), matches is an array of the matching lines among the first cursor lines, or
+                         None if there are no saved results
+        """
+        if store.sidecar is None:
+            return None
+        path = self._path(store, plan)
+        try:
+            with open(path, 'rb') as resultFile:
+                if resultFile.readline() != self.MAGIC:
+                    return None
+                header = json.loads(resultFile.readline().decode('utf-8'))
+                if header['signature'] != store.sidecar.signature or header['cursor'] > len(store) or \
+                        header['offsetSize'] != array(OFFSET_TYPECODE).itemsize:
+                    return None
+                matches = _arrayFromBytes(OFFSET_TYPECODE, zlib.decompress(resultFile.read()))
+        except (IOError, OSError, ValueError, KeyError, zlib.error):
+            return None
+        if len(matches) != header['numMatches']:
+            return None
+        self._cursors[path] = header['cursor']
+        return header['cursor'], matches
+
+    def save(self, store, plan, cursor, matches):
+        """
+        Save the matches of a plan in a store.  Once results have been saved they are only replaced by results that
+        cover the whole file, so following the filtering of a large file page by page doesn't save it again and again.
+
+        :param store: LogParser_LineStore - the file, only stores with a sidecar index have results
+        :param plan: LogParser_FilterPlan - the filters
+        :param cursor: int - number of lines the matches cover
+        :param matches: array - indexes of the matching lines among the first cursor lines
+        """
+        if store.sidecar is None:
+            return
+        path = self._path(store, plan)
+        savedCursor = self._cursors.get(path)
+        if savedCursor is not None and (savedCursor >= cursor or cursor < len(store)):
+            return
+        header = {
+            'signature': store.sidecar.signature,
+            'cursor': cursor,
+            'numMatches': len(matches),
+            'offsetSize': array(OFFSET_TYPECODE).itemsize,
+        }
+
+        # Write to a temporary file first so a crash never leaves a truncated result file behind
+        temporaryPath = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            if not os.path.isdir(self.cacheDir):
+                os.makedirs(self.cacheDir)
+            with open(temporaryPath, 'wb') as resultFile:
+                resultFile.write(self.MAGIC)
+                resultFile.write(json.dumps(header).encode('utf-8') + b'\n')
+                resultFile.write(zlib.compress(_arrayToBytes(array(OFFSET_TYPECODE, matches)), 1))
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temporaryPath, path)
+            self._cursors[path] = cursor
+            for removedPath in _pruneCacheDir(self.cacheDir, '.res', self.MAX_FILES):
+                self._cursors.pop(removedPath, None)
+        except (IOError, OSError):
+            pass
+
+
+def _pruneCacheDir(cacheDir, suffix, maxFiles):
+    """
+    Remove the oldest files of a cache directory, by modification time, so that at most maxFiles are left.
+
+    :param cacheDir: str - the directory
+    :param suffix: str - only files whose name ends in this are counted and removed
+    :param maxFiles: int - number of files to keep
+    :return: list - paths of the removed files
+    """
+    names = [name for name in os.listdir(cacheDir) if name.endswith(suffix)]
+    if len(names) <= maxFiles:
+        return []
+    paths = sorted((os.path.join(cacheDir, name) for name in names), key=os.path.getmtime)
+    removed = paths[:len(paths) - maxFiles]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+class LogParser_Pattern(object):
+    """
+    A filter string compiled for matching lines, get these from compilePattern() so each one is only compiled once.
+
+    Filter strings are substrings to search for, except for /regex/ (a regular expression), /regex/i (the same,
+    ignoring case), ~text (a substring, ignoring case) and, with a field format, NAME=VALUE and NAME!=VALUE (a field of
+    the line is, or isn't, VALUE).  A backslash in front of any of these, or of a time range, searches for the rest of
+    the filter string as a plain substring.
+    """
+    # Kinds of patterns
+    KIND_LITERAL, KIND_IGNORE_CASE, KIND_REGEX, KIND_FIELD = range(4)
+
+    # First characters of filter strings that aren't plain substrings, which a backslash in front of them escapes
+    SPECIAL_PREFIXES = '/~@'
+
+    def __init__(self, text, fieldFormat=None):
+        """
+        :param text: str - the filter string
+        :param fieldFormat: LogParser_FieldFormat - how lines are split into fields, None if field filters aren't used
+        """
+        self.text = text
+        self.fieldFormat = fieldFormat
+        self.kind = self.KIND_LITERAL
+        # Substring that every matching line contains, searched for directly in the raw bytes when the pattern is
+        # literal.  None if there is no such substring.
+        self.literal = text
+        self.regex = None
+
+        # An escaped filter is the plain substring after the backslash, e.g. \/usr/ searches for /usr/
+        if len(text) > 1 and text.startswith('\\') and (text[1] in self.SPECIAL_PREFIXES or (
+                fieldFormat is not None and fieldFormat.parseFilter(text[1:]) is not None)):
+            self.literal = text[1:]
+            return
+
+        fieldFilter = None
+        if fieldFormat is not None:
+            fieldFilter = fieldFormat.parseFilter(text)
+        if fieldFilter is not None:
+            self.kind = self.KIND_FIELD
+            self.field, self.value, self.negated = fieldFilter
+            self.fieldIndex = fieldFormat.names.index(self.field)
+            # A line whose field has the value contains it, unless the format escapes it
+            self.literal = None
+            if not self.negated and fieldFormat.containsValue(self.value):
+                self.literal = self.value
+            return
+
+        if len(text) > 1 and text.startswith('~'):
+            self.kind = self.KIND_IGNORE_CASE
+            self.literal = None
+            self._lowered = text[1:].lower()
+            return
+
+        regexText = None
+        flags = 0
+        if len(text) > 2 and text.startswith('/') and text.endswith('/'):
+            regexText = text[1:-1]
+        elif len(text) > 3 and text.startswith('/') and text.endswith('/i'):
+            regexText = text[1:-2]
+            flags = re.IGNORECASE
+        if regexText is None:
+            return
+
+        try:
+            self.regex = re.compile(regexText, flags)
+        except re.error as e:
+            raise ValueError('Invalid regular expression {}: {}'.format(text, e))
+
+        literal, isPlainText = _requiredLiteral(self.regex)
+        if isPlainText:
+            # Nothing but plain text, which is a substring search
+            self.regex = None
+            self.literal = literal
+        else:
+            self.kind = self.KIND_REGEX
+            self.literal = literal or None
+
+    def __reduce__(self):
+        # Worker processes compile the pattern through their own cache instead of unpickling the compiled form
+        return compilePattern, (self.text, self.fieldFormat)
+
+    def search(self, line):
+        """
+        :param line: str - a single line of the file, without its newline
+        :return: bool - True if the pattern occurs in the line
+        """
+        if self.kind == self.KIND_LITERAL:
+            return self.literal in line
+        if self.kind == self.KIND_IGNORE_CASE:
+            return self._lowered in line.lower()
+        if self.kind == self.KIND_FIELD:
+            # Parsing the line is much slower than a substring search as well
+            if self.literal is not None and self.literal not in line:
+                return False
+            return (self.fieldFormat.fieldValue(line, self.fieldIndex) == self.value) != self.negated
+        # The regex engine is much slower than a substring search, which rules out most lines first
+        if self.literal is not None and self.literal not in line:
+            return False
+        return self.regex.search(line) is not None
+
+
+class LogParser_PatternCache(object):
+    """
+    Bounded cache of compiled filter patterns, the least recently used ones are dropped first.
+    """
+    def __init__(self, maxPatterns):
+        """
+        :param maxPatterns: int - number of patterns to keep
+        """
+        self.maxPatterns = maxPatterns
+        self._patterns = OrderedDict()
+        # Patterns are compiled by the GUI thread and the filter thread
+        self._lock = threading.Lock()
+
+    def get(self, text, fieldFormat=None):
+        """
+        :param text: str - a filter string
+        :param fieldFormat: LogParser_FieldFormat - how lines are split into fields, None if field filters aren't used
+        :return: LogParser_Pattern - the compiled pattern, raises ValueError for an invalid regular expression
+        """
+        key = (text, fieldFormat.spec if fieldFormat is not None else None)
+        with self._lock:
+            pattern = self._patterns.pop(key, None)
+            if pattern is None:
+                pattern = LogParser_Pattern(text, fieldFormat)
+            self._patterns[key] = pattern
+            while len(self._patterns) > self.maxPatterns:
+                self._patterns.popitem(last=False)
+        return pattern
+
+
+# Compiled filter patterns shared by everything in this process
+PATTERN_CACHE = LogParser_PatternCache(256)
+
+
+def compilePattern(text, fieldFormat=None):
+    """
+    :param text: str - a filter string
+    :param fieldFormat: LogParser_FieldFormat - how lines are split into fields, None if field filters aren't used
+    :return: LogParser_Pattern - the compiled pattern, raises ValueError for an invalid regular expression
+    """
+    return PATTERN_CACHE.get(text, fieldFormat)
+
+
+def _requiredLiteral(regex):
+    """
+    Find the longest run of plain characters that every match of a regular expression contains.
+
+    :param regex: regular expression object - a compiled, case-sensitive or case-insensitive regular expression
+    :return: tuple - (literal, isPlainText), literal is '' if there is none and isPlainText is True if the regular
+                     expression only matches the literal
+    """
+    if regex.flags & re.IGNORECASE:
+        return '', False
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return '', False
+
+    # Only the top level of the pattern is required, anything inside a group, repeat or branch may not be
+    longest = ''
+    run = []
+    isPlainText = True
+    for op, argument in parsed:
+        if op == sre_parse.LITERAL:
+            run.append(chr(argument))
+            continue
+        isPlainText = False
+        if len(run) > len(longest):
+            longest = ''.join(run)
+        run = []
+    if len(run) > len(longest):
+        longest = ''.join(run)
+    return longest, isPlainText and len(parsed) > 0
+
+
+class LogParser_FieldFormat(object):
+    """
+    Splits lines into named fields for field filters, described by a spec string:
+
+        split:SEP:NAME,...  fields separated by SEP (runs of whitespace if SEP is empty, \\t is a tab), the last field
+                            gets the rest of the line
+        regex:PATTERN       the named groups of a regular expression matched at the start of the line
+        json:NAME,...       keys of JSON objects, one per line.  Values that aren't strings are compared as JSON text
+                            (e.g. status=500 or ok=true).
+
+    Lines that don't have a field (e.g. the lines of a stack trace) have None as its value.
+    """
+    # A field filter is NAME=VALUE or NAME!=VALUE for one of the format's field names
+    FILTER_PATTERN = re.compile(r'^([A-Za-z_][\w.-]*)(!?=)(.*)$', re.DOTALL)
+
+    def __init__(self, spec):
+        """
+        :param spec: str - the format, see above.  Raises ValueError if it is invalid.
+        """
+        self.spec = spec
+        self.kind, _, rest = spec.partition(':')
+        self._separator = None
+        self._regex = None
+        if self.kind == 'split':
+            separator, _, names = rest.rpartition(':')
+            self._separator = separator.replace('\\t', '\t') or None
+            self.names = tuple(name.strip() for name in names.split(',') if name.strip())
+        elif self.kind == 'regex':
+            try:
+                self._regex = re.compile(rest)
+            except re.error as e:
+                raise ValueError('Invalid field regular expression {}: {}'.format(rest, e))
+            groups = self._regex.groupindex
+            self.names = tuple(sorted(groups, key=groups.get))
+        elif self.kind == 'json':
+            self.names = tuple(name.strip() for name in rest.split(',') if name.strip())
+        else:
+            raise ValueError('Unknown field format {}, expected split:SEP:NAMES, regex:PATTERN or json:NAMES'.format(
+                spec))
+
+        if not self.names:
+            raise ValueError('Field format {} has no field names'.format(spec))
+        for name in self.names:
+            if self.FILTER_PATTERN.match(name + '=') is None:
+                raise ValueError('Invalid field name {} in field format {}'.format(name, spec))
+
+    def parse(self, line):
+        """
+        :param line: str - a single line of the file, without its newline
+        :return: list - the value of every field in names, None if the line doesn't have any fields
+        """
+        if self.kind == 'split':
+            values = line.split(self._separator, len(self.names) - 1)
+            if len(values) < len(self.names):
+                values.extend([None] * (len(self.names) - len(values)))
+            return values
+
+        if self.kind == 'regex':
+            match = self._regex.match(line)
+            if match is None:
+                return None
+            return [match.group(name) for name in self.names]
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+        return [_jsonFieldValue(record.get(name)) for name in self.names]
+
+    def fieldValue(self, line, fieldIndex):
+        """
+        :param line: str - a single line of the file, without its newline
+        :param fieldIndex: int - index of the field in names
+        :return: str - the field's value, None if the line doesn't have the field
+        """
+        values = self.parse(line)
+        if values is None:
+            return None
+        return values[fieldIndex]
+
+    def parseFilter(self, text):
+        """
+        :param text: str - a filter string
+        :return: tuple - (name, value, negated) if text is a filter on one of the fields, else None
+        """
+        match = self.FILTER_PATTERN.match(text)
+        if match is None or match.group(1) not in self.names:
+            return None
+        return match.group(1), match.group(3), match.group(2) == '!='
+
+    def containsValue(self, value):
+        """
+        :param value: str - a field value
+        :return: bool - True if every line whose field has this value contains the value as it is
+        """
+        if not value:
+            return False
+        if self.kind != 'json':
+            return True
+        # JSON writers may escape quotes, backslashes, slashes, control and non-ASCII characters
+        return all(u' ' <= character <= u'~' and character not in u'"\\/' for character in value)
+
+
+def _jsonFieldValue(value):
+    if value is None or isinstance(value, type(u'')) or isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True)
+
+
+class LogParser_FieldColumns(object):
+    """
+    The fields of a line store's lines, dictionary-encoded: for every field an array with a 16-bit code per line, and
+    the field's distinct values numbered in the order they first occur (code 0 is a missing field).
+
+    Lines are parsed once, as far as filters have needed them so far, after which a field filter compares codes instead
+    of parsing lines, with numpy when it is installed.  A field with more than MAX_CODES distinct values (e.g. the
+    message or the timestamp) isn't worth encoding, its column is dropped and filters on it parse the lines instead.
+    """
+    MAX_CODES = 65535
+
+    def __init__(self, fieldFormat):
+        """
+        :param fieldFormat: LogParser_FieldFormat - how the lines are split into fields
+        """
+        self.fieldFormat = fieldFormat
+        # Lines encoded so far
+        self.numLines = 0
+        numFields = len(fieldFormat.names)
+        # Per field the codes of the lines, None once the column has been dropped...
+        self.codes = [array('H') for _ in range(numFields)]
+        # ...the values by code
+        self.values = [[None] for _ in range(numFields)]
+        # ...and the codes by value
+        self._codeOf = [{None: 0} for _ in range(numFields)]
+
+    def extend(self, store, stopLine):
+        """
+        Parse and encode the lines from numLines up to stopLine.
+
+        :param store: LogParser_LineStore - the file the columns belong to
+        :param stopLine: int - one past the last line to encode
+        """
+        if stopLine <= self.numLines:
+            return
+
+        missing = [None] * len(self.codes)
+        parse = self.fieldFormat.parse
+        columns = [(fieldIndex, self.codes[fieldIndex], self._codeOf[fieldIndex], self.values[fieldIndex])
+                   for fieldIndex in range(len(self.codes)) if self.codes[fieldIndex] is not None]
+        for _, line in store.iterLines(self.numLines, stopLine):
+            values = parse(line) or missing
+            for fieldIndex, codes, codeOf, fieldValues in columns:
+                value = values[fieldIndex]
+                code = codeOf.get(value)
+                if code is None:
+                    code = len(fieldValues)
+                    if code > self.MAX_CODES:
+                        self._drop(fieldIndex)
+                        columns = [column for column in columns if column[0] != fieldIndex]
+                        continue
+                    codeOf[value] = code
+                    fieldValues.append(value)
+                codes.append(code)
+        self.numLines = stopLine
+
+    def _drop(self, fieldIndex):
+        self.codes[fieldIndex] = None
+        self.values[fieldIndex] = None
+        self._codeOf[fieldIndex] = None
+
+    def truncate(self, numLines):
+        """
+        Forget the codes of the lines from numLines on, e.g. because the last line of the file was continued.
+        """
+        if numLines >= self.numLines:
+            return
+        for codes in self.codes:
+            if codes is not None:
+                del codes[numLines:]
+        self.numLines = numLines
+
+    def hits(self, fieldIndex, value, negated, start, stop):
+        """
+        :param fieldIndex: int - index of the field in the format's names
+        :param value: str - the value to compare with
+        :param negated: bool - find the lines where the field isn't value (or is missing) instead
+        :param start: int - first line to check
+        :param stop: int - one past the last line to check, up to numLines
+        :return: list - indexes of the lines that match, None if the field's column has been dropped
+        """
+        codes = self.codes[fieldIndex]
+        if codes is None:
+            return None
+
+        code = self._codeOf[fieldIndex].get(value)
+        if code is None:
+            # No line has this value
+            return list(range(start, stop)) if negated else []
+
+        block = codes[start:stop]
+        if numpy is not None:
+            equal = numpy.frombuffer(block, dtype=numpy.uint16) == code
+            if negated:
+                equal = ~equal
+            return (numpy.flatnonzero(equal) + start).tolist()
+        if negated:
+            return [start + offset for offset, blockCode in enumerate(block) if blockCode != code]
+        return [start + offset for offset, blockCode in enumerate(block) if blockCode == code]
+
+
+class LogParser_FilterPlan(object):
+    """
+    Immutable, precompiled form of the filter groups that the filter thread can evaluate without any Qt calls.
+
+    The Aho-Corasick automaton is only used when lines are tested one at a time, i.e. when useNumpy is off or the
+    lines aren't a LogParser_LineStore.  Line stores are otherwise filtered by the numpy byte scanner or the field
+    columns, which don't use it.
+    """
+    # Number of distinct filters at which a single Aho-Corasick pass beats one substring test per filter
+    AHO_CORASICK_MIN_FILTERS = 100
+
+    def __init__(self, groups, skipEmptyLines=False, useAhoCorasick=None, timestampParser=None, useNumpy=None,
+                 fieldFormat=None):
+        """
+        Compile a snapshot of the filter groups.
+
+        Filters that are time ranges (see parseTimeRange()) test the line's timestamp instead of its text.  Green time
+        ranges, wherever they are in the groups, are ORed together and the line's timestamp has to be in one of them.
+        Red time ranges omit the lines in them.
+
+        :param groups: list - one (parentText, parentIncludes, children) tuple per group, where children is a list of
+                              (childText, childIncludes) tuples
+        :param skipEmptyLines: bool - omit lines that are empty
+        :param useAhoCorasick: bool - force the multi-pattern matcher on or off, None picks based on the filter count
+        :param timestampParser: LogParser_TimestampParser - finds the timestamps time ranges are tested against
+        :param useNumpy: bool - force scanning line stores with numpy on or off, None uses it if numpy is installed
+        :param fieldFormat: LogParser_FieldFormat - how lines are split into fields, filters on its fields (see
+                                                    LogParser_Pattern) test a field instead of the whole line
+        """
+        self.groups = tuple((parentText, parentIncludes, tuple(children))
+                            for parentText, parentIncludes, children in groups)
+        self.skipEmptyLines = skipEmptyLines
+
+        # Red parents and red children both omit a line outright, so they collapse into one list
+        omitTexts = []
+        # Green parents are ORed together, as are the green children of each group.  Every one of these sets has to
+        # have at least one filter in the line.
+        requiredSets = []
+        # Time range filters are pulled out of the groups
+        includeTimes = []
+        omitTimes = []
+
+        def addFilter(text, includes, includeTexts):
+            timeRange = parseTimeRange(text)
+            if timeRange is not None:
+                (includeTimes if includes else omitTimes).append(timeRange)
+            elif includes:
+                includeTexts.append(text)
+            else:
+                omitTexts.append(text)
+
+        parentIncludeTexts = []
+        for parentText, parentIncludes, children in self.groups:
+            addFilter(parentText, parentIncludes, parentIncludeTexts)
+        if parentIncludeTexts:
+            requiredSets.append(tuple(parentIncludeTexts))
+
+        for parentText, parentIncludes, children in self.groups:
+            childIncludeTexts = []
+            for childText, childIncludes in children:
+                addFilter(childText, childIncludes, childIncludeTexts)
+            if childIncludeTexts:
+                requiredSets.append(tuple(childIncludeTexts))
+
+        self.includeTimes = tuple(_unique(includeTimes))
+        self.omitTimes = tuple(_unique(omitTimes))
+        self.hasTimeFilters = bool(self.includeTimes or self.omitTimes)
+        self.timestampParser = None
+        if self.hasTimeFilters:
+            self.timestampParser = timestampParser or LogParser_TimestampParser()
+
+        self.omitTexts = tuple(_unique(omitTexts))
+        self.requiredSets = tuple(tuple(_unique(texts)) for texts in requiredSets)
+
+        # Every distinct filter string gets an ID, which is its index in filterTexts
+        filterTexts = list(self.omitTexts) + [text for texts in self.requiredSets for text in texts]
+        self.filterTexts = tuple(_unique(filterTexts))
+        filterIds = dict((text, filterId) for filterId, text in enumerate(self.filterTexts))
+        self.omitIds = frozenset(filterIds[text] for text in self.omitTexts)
+        self.requiredIdSets = tuple(frozenset(filterIds[text] for text in texts) for texts in self.requiredSets)
+
+        # Substring filters are tested with the in operator, the other patterns with their search method
+        self.fieldFormat = fieldFormat
+        self.patterns = tuple(compilePattern(text, fieldFormat) for text in self.filterTexts)
+        self.hasFieldFilters = any(pattern.kind == LogParser_Pattern.KIND_FIELD for pattern in self.patterns)
+        patterns = dict(zip(self.filterTexts, self.patterns))
+
+        def splitTests(texts):
+            literals = tuple(patterns[text].literal for text in texts
+                             if patterns[text].kind == LogParser_Pattern.KIND_LITERAL)
+            searches = tuple(patterns[text].search for text in texts
+                             if patterns[text].kind != LogParser_Pattern.KIND_LITERAL)
+            return literals, searches
+
+        self._omitLiterals, self._omitSearches = splitTests(self.omitTexts)
+        self._requiredTests = tuple(splitTests(texts) for texts in self.requiredSets)
+
+        if useAhoCorasick is None:
+            useAhoCorasick = len(self.filterTexts) >= self.AHO_CORASICK_MIN_FILTERS
+        # The automaton only finds substrings, the IDs of the other patterns are added by searching for them
+        literalIds = [filterId for filterId, pattern in enumerate(self.patterns)
+                      if pattern.kind == LogParser_Pattern.KIND_LITERAL]
+        self._patternSearches = tuple((filterId, pattern.search) for filterId, pattern in enumerate(self.patterns)
+                                      if pattern.kind != LogParser_Pattern.KIND_LITERAL)
+        self._automatonIds = None
+        if len(literalIds) < len(self.patterns):
+            self._automatonIds = tuple(literalIds)
+        self.automaton = None
+        if useAhoCorasick and self.filterTexts:
+            self.automaton = LogParser_AhoCorasick([self.patterns[filterId].literal for filterId in literalIds])
+
+        if useNumpy is None:
+            useNumpy = True
+        self.useNumpy = bool(useNumpy) and numpy is not None
+
+    def digest(self):
+        """
+        :return: str - hash of the filter groups and of the options that change which lines they match, equal for plans
+                       that match the same lines
+        """
+        key = [self.groups, self.skipEmptyLines, self.fieldFormat.spec if self.fieldFormat is not None else None,
+               self.timestampParser.formats if self.timestampParser is not None else None]
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+    def matchIds(self, line):
+        """
+        :param line: str - a single line of the file, without its newline
+        :return: set - IDs (indexes into filterTexts) of every filter contained in the line
+        """
+        if self.automaton is not None:
+            return self._automatonMatchIds(line)
+
+        return set(filterId for filterId, pattern in enumerate(self.patterns) if pattern.search(line))
+
+    def _automatonMatchIds(self, line):
+        hits = self.automaton.matchIds(line)
+        if self._automatonIds is not None:
+            automatonIds = self._automatonIds
+            hits = set(automatonIds[patternId] for patternId in hits)
+            for filterId, search in self._patternSearches:
+                if search(line):
+                    hits.add(filterId)
+        return hits
+
+    def _matchesAutomaton(self, line):
+        if self.skipEmptyLines and line == '':
+            return False
+
+        hits = self._automatonMatchIds(line)
+        if not hits.isdisjoint(self.omitIds):
+            return False
+
+        for filterIds in self.requiredIdSets:
+            if hits.isdisjoint(filterIds):
+                return False
+
+        return True
+
+    def matches(self, line):
+        """
+        :param line: str - a single line of the file, without its newline
+        :return: bool - True if the line should be displayed
+        """
+        if self.automaton is not None:
+            return self._matchesAutomaton(line)
+        return self._matchesLiteral(line)
+
+    def _matchesLiteral(self, line):
+        if self.skipEmptyLines and line == '':
+            return False
+
+        for text in self._omitLiterals:
+            if text in line:
+                return False
+        for search in self._omitSearches:
+            if search(line):
+                return False
+
+        for literals, searches in self._requiredTests:
+            for text in literals:
+                if text in line:
+                    break
+            else:
+                for search in searches:
+                    if search(line):
+                        break
+                else:
+                    return False
+
+        return True
+
+    def scanBytes(self, data, encoding):
+        """
+        Filter lines given as raw bytes with numpy, see "NumPy scanning" above.  Time ranges are ignored.
+
+        :param data: bytes - lines separated by newlines, split like str.split('\\n')
+        :param encoding: str - encoding of the lines
+        :return: numpy array - indexes of the matching lines within data
+        """
+        buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+        newlines = numpy.flatnonzero(buffer == 10)
+        numLines = len(newlines) + 1
+        starts = numpy.empty(numLines, dtype=numpy.int64)
+        starts[0] = 0
+        starts[1:] = newlines + 1
+        ends = numpy.empty(numLines, dtype=numpy.int64)
+        ends[:-1] = newlines
+        ends[-1] = len(buffer)
+
+        mask = numpy.ones(numLines, dtype=bool)
+        if self.skipEmptyLines:
+            lengths = ends - starts
+            empty = lengths == 0
+            # A lone carriage return counts as empty
+            oneByte = numpy.flatnonzero(lengths == 1)
+            empty[oneByte] = buffer[starts[oneByte]] == 13
+            mask &= ~empty
+
+        patterns = dict(zip(self.filterTexts, self.patterns))
+        decoded = []
+
+        def hits(text):
+            pattern = patterns[text]
+            needle = _encodeNeedle(pattern.literal, encoding)
+            if pattern.kind == LogParser_Pattern.KIND_LITERAL and needle is not None:
+                return _lineHitMask(data, buffer, starts, needle)
+
+            # Other patterns are only tested on lines that can still match and contain the pattern's required text.
+            # The mask only ever loses lines, so lines it has already lost don't need an answer.
+            candidates = mask.copy()
+            if needle is not None:
+                candidates &= _lineHitMask(data, buffer, starts, needle)
+            if not decoded:
+                decoded.append(data.decode(encoding, 'replace').split('\n'))
+            lines = decoded[0]
+            result = numpy.zeros(numLines, dtype=bool)
+            search = pattern.search
+            for index in numpy.flatnonzero(candidates):
+                line = lines[index]
+                if line.endswith('\r'):
+                    line = line[:-1]
+                if search(line):
+                    result[index] = True
+            return result
+
+        for text in self.omitTexts:
+            mask &= ~hits(text)
+        for texts in self.requiredSets:
+            required = numpy.zeros(numLines, dtype=bool)
+            for text in texts:
+                required |= hits(text)
+            mask &= required
+        return numpy.flatnonzero(mask)
+
+    def matchesTime(self, timestamp):
+        """
+        :param timestamp: float - timestamp of a line, as returned by LogParser_TimestampLookup.at()
+        :return: bool - True if the time range filters let the line through
+        """
+        for timeRange in self.omitTimes:
+            if inTimeRange(timestamp, timeRange):
+                return False
+        if self.includeTimes:
+            return any(inTimeRange(timestamp, timeRange) for timeRange in self.includeTimes)
+        return True
+
+    def narrows(self, other):
+        """
+        Conservative check of whether every line matched by this plan is also matched by another plan.
+
+        This holds when this plan omits at least the lines the other plan omits and each set of green filters in the
+        other plan contains one of this plan's sets of green filters.
+
+        :param other: LogParser_FilterPlan - the plan to compare with
+        :return: bool - True if this plan can't match a line that other doesn't
+        """
+        if other.skipEmptyLines and not self.skipEmptyLines:
+            return False
+
+        # Time ranges aren't compared, only plans with the same ones are known to be related
+        if (self.includeTimes, self.omitTimes) != (other.includeTimes, other.omitTimes) or \
+                (self.hasTimeFilters and self.timestampParser.formats != other.timestampParser.formats):
+            return False
+
+        # The same text can be a field filter in one format and something else in another
+        if self.fieldFormat is not other.fieldFormat and (self.fieldFormat is None or other.fieldFormat is None or
+                                                          self.fieldFormat.spec != other.fieldFormat.spec):
+            return False
+
+        if not set(other.omitTexts).issubset(self.omitTexts):
+            return False
+
+        requiredSets = [set(texts) for texts in self.requiredSets]
+        for texts in other.requiredSets:
+            if not any(required.issubset(texts) for required in requiredSets):
+                return False
+
+        return True
+
+    def iterMatches(self, lines, start=0, stop=None):
+        """
+        Yield (index, line) for every matching line in a range of a line store.
+
+        :param lines: LogParser_LineStore or list - the lines to filter
+        :param start: int - first line to test
+        :param stop: int - one past the last line to test, defaults to the end of lines
+        """
+        if (self.useNumpy or self.hasFieldFilters) and isinstance(lines, LogParser_LineStore):
+            # Only the matching lines are decoded
+            timestamps = None
+            if self.hasTimeFilters:
+                timestamps = LogParser_TimestampLookup(lines, self.timestampParser)
+            if self.hasFieldFilters:
+                # Field filters are answered from the store's field columns
+                indexes = lines.iterFieldMatches(self, start, stop)
+            else:
+                indexes = lines.iterScanMatches(self, start, stop)
+            for index in indexes:
+                line = lines[index]
+                if timestamps is None or self.matchesTime(timestamps.at(index, line)):
+                    yield index, line
+            return
+
+        if hasattr(lines, 'iterLines'):
+            numberedLines = lines.iterLines(start, stop)
+        else:
+            numberedLines = enumerate(lines[start:stop], start)
+
+        if self.automaton is not None:
+            matches = self._matchesAutomaton
+        else:
+            matches = self._matchesLiteral
+
+        if self.hasTimeFilters:
+            # The text is cheaper to test, so the timestamp is only looked up for lines that pass it
+            timestamps = LogParser_TimestampLookup(lines, self.timestampParser)
+            for index, line in numberedLines:
+                if matches(line) and self.matchesTime(timestamps.at(index, line)):
+                    yield index, line
+            return
+
+        for index, line in numberedLines:
+            if matches(line):
+                yield index, line
+
+    def iterMatchIndexes(self, lines, start=0, stop=None):
+        """
+        Yield the index of every matching line in a range of a line store, like iterMatches() but without decoding the
+        lines that a byte scan or the field columns have already matched.
+
+        :param lines: LogParser_LineStore or list - the lines to filter
+        :param start: int - first line to test
+        :param stop: int - one past the last line to test, defaults to the end of lines
+        """
+        if (self.useNumpy or self.hasFieldFilters) and isinstance(lines, LogParser_LineStore) and \
+                not self.hasTimeFilters:
+            if self.hasFieldFilters:
+                return lines.iterFieldMatches(self, start, stop)
+            return lines.iterScanMatches(self, start, stop)
+        return (index for index, line in self.iterMatches(lines, start, stop))
+
+
+class LogParser_FilterSets(object):
+    """
+    Named filter groups, saved to a JSON file.
+
+    Groups are stored the way LogParser_FilterPlan takes them: one (parentText, parentIncludes, children) tuple per
+    group, where children is a list of (childText, childIncludes) tuples.
+    """
+    def __init__(self, fname):
+        """
+        :param fname: str - path of the JSON file, load() reads the filter sets saved in it
+        """
+        self.fname = fname
+        # Groups of every filter set, keyed by name
+        self.sets = {}
+
+    def load(self):
+        """
+        Read the filter sets saved in the file, there are none if it doesn't exist yet.
+
+        Raises ValueError if the file can't be read or isn't a filter sets file.
+        """
+        self.sets = {}
+        if not os.path.exists(self.fname):
+            return
+        try:
+            with open(self.fname, 'rb') as setsFile:
+                sets = json.loads(setsFile.read().decode('utf-8'))['sets']
+            for name, groups in sets.items():
+                self.sets[name] = _normalizeGroups(groups)
+        except (IOError, OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError('Could not read the filter sets in {}: {}'.format(self.fname, e))
+
+    def names(self):
+        """
+        :return: list - names of the filter sets, sorted
+        """
+        return sorted(self.sets)
+
+    def get(self, name):
+        """
+        :param name: str - name of a filter set
+        :return: list - the groups of the filter set, None if there is no such set
+        """
+        return self.sets.get(name)
+
+    def put(self, name, groups):
+        """
+        Save a filter set, replacing a set of the same name.
+
+        Raises IOError or OSError if the file can't be written.
+
+        :param name: str - name of the filter set
+        :param groups: list - the groups of the filter set
+        """
+        self.sets[name] = _normalizeGroups(groups)
+        self.save()
+
+    def remove(self, name):
+        """
+        Delete a filter set.
+
+        Raises IOError or OSError if the file can't be written.
+
+        :param name: str - name of the filter set
+        """
+        if self.sets.pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        """
+        Write all filter sets to the file.
+        """
+        directory = os.path.dirname(os.path.abspath(self.fname))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Write to a temporary file first so a crash never loses the saved sets
+        temporaryPath = '{}.{}.tmp'.format(self.fname, os.getpid())
+        with open(temporaryPath, 'wb') as setsFile:
+            setsFile.write(json.dumps({'sets': self.sets}, indent=2, sort_keys=True).encode('utf-8'))
+        if os.path.exists(self.fname):
+            os.remove(self.fname)
+        os.rename(temporaryPath, self.fname)
+
+
+def _normalizeGroups(groups):
+    """
+    :param groups: list - filter groups, e.g. as read from JSON with lists instead of tuples
+    :return: list - one (parentText, parentIncludes, children) tuple per group, children as (childText, childIncludes)
+    """
+    return [(parentText, bool(parentIncludes),
+             [(childText, bool(childIncludes)) for childText, childIncludes in children])
+            for parentText, parentIncludes, children in groups]
+
+
+class LogParser_MatchSet(object):
+    """
+    Sorted indexes of the matching lines among the first cursor lines of a file, plus the plan they were matched with.
+    """
+    def __init__(self, lines):
+        """
+        :param lines: LogParser_LineStore or list - the lines being filtered
+        """
+        self.lines = lines
+        self.reset(None)
+
+    def reset(self, plan):
+        """
+        Forget all results, the next lines to filter start at the beginning of the file.
+
+        :param plan: LogParser_FilterPlan - the plan future results will be matched with
+        """
+        self.plan = plan
+        self.matches = array(OFFSET_TYPECODE)
+        self.cursor = 0
+        # (cursor, iterator) when the plan was evaluated for the whole file from cached bitmaps, the iterator yields the
+        # matches from that cursor on so later pages of results don't combine the bitmaps again
+        self.evaluated = None
+
+    def __len__(self):
+        return len(self.matches)
+
+    def isComplete(self, stopLine=None):
+        """
+        :param stopLine: int - number of lines to consider, defaults to all lines
+        :return: bool - True if every line up to stopLine has been filtered
+        """
+        if stopLine is None:
+            stopLine = len(self.lines)
+        return self.cursor >= stopLine
+
+    def extend(self, stopLine, matches):
+        """
+        Record the results of filtering the lines from the cursor up to stopLine.
+
+        :param stopLine: int - one past the last line that was filtered
+        :param matches: list - indexes of the matching lines, in order
+        """
+        self.matches.extend(matches)
+        self.cursor = stopLine
+
+    def truncate(self, stopLine):
+        """
+        Forget the results for the lines from stopLine on, e.g. a partial last line that has since been completed.
+
+        :param stopLine: int - the new cursor, if it is before the current one
+        """
+        if self.cursor <= stopLine:
+            return
+        self.evaluated = None
+        # The match array may be displayed, which relies on it only being appended to, so it is replaced
+        self.matches = self.matches[:bisect.bisect_left(self.matches, stopLine)]
+        self.cursor = stopLine
+
+    def refine(self, plan):
+        """
+        Bring the existing results up to date with a new plan, touching as few lines as possible.
+
+        This is a generator that yields after each block of work so the caller can interrupt it.  If it is not run to
+        completion the results are discarded and filtering starts over from the beginning of the file.
+
+        :param plan: LogParser_FilterPlan - the new filters
+        """
+        oldPlan = self.plan
+        # Mark the results as unusable until the refinement completes
+        self.plan = None
+        self.evaluated = None
+
+        if oldPlan is None:
+            self.reset(plan)
+            return
+
+        if plan.narrows(oldPlan):
+            # Lines that didn't match before still can't match, so only the current matches need re-testing
+            if oldPlan.narrows(plan):
+                self.plan = plan
+                return
+
+            kept = array(OFFSET_TYPECODE)
+            matches = plan.matches
+            timestamps = None
+            if plan.hasTimeFilters:
+                timestamps = LogParser_TimestampLookup(self.lines, plan.timestampParser)
+            for blockStart in range(0, len(self.matches), LogParser_LineStore.BLOCK_LINES):
+                for index in self.matches[blockStart:blockStart + LogParser_LineStore.BLOCK_LINES]:
+                    line = self.lines[index]
+                    if matches(line) and (timestamps is None or plan.matchesTime(timestamps.at(index, line))):
+                        kept.append(index)
+                yield
+            self.matches = kept
+
+        elif oldPlan.narrows(plan):
+            # Current matches will still match, so only the lines between them can be added.  Testing every gap
+            # between matches on its own is slower than a full scan, so the lines up to the cursor are scanned again a
+            # block at a time, which finds the current matches as well; the results are kept until it completes
+            widened = array(OFFSET_TYPECODE)
+            for blockStart in range(0, self.cursor, LogParser_LineStore.BLOCK_LINES):
+                blockStop = min(blockStart + LogParser_LineStore.BLOCK_LINES, self.cursor)
+                widened.extend(plan.iterMatchIndexes(self.lines, blockStart, blockStop))
+                yield
+            self.matches = widened
+
+        else:
+            self.reset(plan)
+            return
+
+        self.plan = plan
+
+
+class LogParser_FilterInterrupted(Exception):
+    """
+    Raised inside a merge when the caller asked it to stop.
+    """
+
+
+class LogParser_TimestampParser(object):
+    """
+    Finds the timestamp at the start of a log line and converts it to seconds, so lines can be ordered and filtered by
+    time.
+
+    Formats use strptime's directives (%Y %y %m %b %d %H %M %S %f, plus %s for seconds since the epoch).  Spaces match
+    any run of spaces, leading spaces and an opening square bracket are skipped, and fractional seconds after %S (with
+    a dot or a comma) are picked up even if the format doesn't mention %f.  Timestamps without a year (e.g. syslog's)
+    are placed in 1970, so they only order correctly within a year.
+    """
+    DEFAULT_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%b %d %H:%M:%S')
+
+    DIRECTIVES = {
+        'Y': r'(?P<Y>\d{4})',
+        'y': r'(?P<y>\d\d)',
+        'm': r'(?P<m>\d{1,2})',
+        'b': r'(?P<b>[A-Z][a-z]{2})',
+        'd': r'(?P<d>\d{1,2})',
+        'H': r'(?P<H>\d{1,2})',
+        'M': r'(?P<M>\d\d)',
+        'S': r'(?P<S>\d\d)',
+        'f': r'(?P<f>\d+)',
+        's': r'(?P<s>\d{9,11})',
+        '%': '%',
+    }
+    MONTHS = dict((name, number) for number, name in enumerate(
+        ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1))
+
+    def __init__(self, formats=None):
+        """
+        :param formats: list - timestamp formats to try in order, defaults to DEFAULT_FORMATS
+        """
+        self.formats = tuple(formats or self.DEFAULT_FORMATS)
+        self.patterns = tuple(self._compile(timestampFormat) for timestampFormat in self.formats)
+        # Index of the pattern that matched last.  Plans share their parser between threads, so it is kept per thread
+        # and the patterns themselves are never reordered
+        self._lastMatch = threading.local()
+
+    def __reduce__(self):
+        # Thread locals don't pickle, worker processes compile the formats again
+        return LogParser_TimestampParser, (self.formats,)
+
+    def _compile(self, timestampFormat):
+        """
+        :param timestampFormat: str - a strptime style format
+        :return: regular expression object - matches the format at the start of a line
+        """
+        parts = [r'\s*\[?']
+        position = 0
+        while position < len(timestampFormat):
+            character = timestampFormat[position]
+            if character == '%' and position + 1 < len(timestampFormat):
+                directive = timestampFormat[position + 1]
+                if directive not in self.DIRECTIVES:
+                    raise ValueError('Unsupported timestamp directive %{} in {!r}'.format(directive, timestampFormat))
+                parts.append(self.DIRECTIVES[directive])
+                if directive == 'S' and '%f' not in timestampFormat:
+                    parts.append(r'(?:[.,](?P<f>\d+))?')
+                position += 2
+            elif character == ' ':
+                parts.append(' +')
+                position += 1
+            else:
+                parts.append(re.escape(character))
+                position += 1
+        return re.compile(''.join(parts))
+
+    def parse(self, line):
+        """
+        :param line: str - a log line
+        :return: float - seconds since the epoch, None if the line doesn't start with a timestamp
+        """
+        # Lines of a file almost always share one format, so the one that matched last is tried first
+        lastIndex = getattr(self._lastMatch, 'index', 0)
+        match = self.patterns[lastIndex].match(line)
+        if match is None:
+            for patternIndex, pattern in enumerate(self.patterns):
+                if patternIndex == lastIndex:
+                    continue
+                match = pattern.match(line)
+                if match is not None:
+                    self._lastMatch.index = patternIndex
+                    break
+            else:
+                return None
+
+        fields = match.groupdict()
+        fraction = 0.0
+        if fields.get('f'):
+            fraction = float('0.' + fields['f'])
+        if fields.get('s'):
+            return float(fields['s']) + fraction
+
+        if fields.get('Y'):
+            year = int(fields['Y'])
+        elif fields.get('y'):
+            year = 2000 + int(fields['y'])
+        else:
+            year = 1970
+        if fields.get('b'):
+            month = self.MONTHS.get(fields['b'])
+            if month is None:
+                return None
+        else:
+            month = int(fields.get('m') or 1)
+        return calendar.timegm((year, month, int(fields.get('d') or 1), int(fields.get('H') or 0),
+                                int(fields.get('M') or 0), int(fields.get('S') or 0))) + fraction
+
+
+class LogParser_TimestampLookup(object):
+    """
+    Timestamps of the lines of one file, where a line without a timestamp (e.g. part of a stack trace) takes the
+    timestamp of the closest line before it that has one.
+
+    Lookups are meant to go forward through the file, the previous answer is reused when searching backwards reaches
+    it.  Only the LOOKBACK lines before a line are searched, so every way of filtering a file agrees on the result.
+    """
+    # Number of lines searched backwards for a line that starts with a timestamp
+    LOOKBACK = 1000
+
+    def __init__(self, lines, timestampParser):
+        """
+        :param lines: LogParser_LineStore or list - the lines of the file
+        :param timestampParser: LogParser_TimestampParser - finds the timestamps
+        """
+        self.lines = lines
+        self.timestampParser = timestampParser
+        # Last line looked up, and its timestamp
+        self._lastIndex = -1
+        self._lastTimestamp = None
+
+    def at(self, index, line=None):
+        """
+        :param index: int - index of the line
+        :param line: str - the line's text, if the caller already has it
+        :return: float - the line's timestamp, -inf if no line up to this one has a timestamp
+        """
+        parse = self.timestampParser.parse
+        timestamp = None
+        if line is not None:
+            timestamp = parse(line)
+        if timestamp is None:
+            for lineIndex in range(index if line is None else index - 1, max(-1, index - self.LOOKBACK), -1):
+                if lineIndex == self._lastIndex:
+                    timestamp = self._lastTimestamp
+                    break
+                timestamp = parse(self.lines[lineIndex])
+                if timestamp is not None:
+                    break
+
+        if timestamp is None:
+            timestamp = float('-inf')
+        self._lastIndex = index
+        self._lastTimestamp = timestamp
+        return timestamp
+
+
+class LogParser_TimeIndex(object):
+    """
+    Sparse index of the timestamps of a file, one sample every SAMPLE_LINES lines, used to find the lines of a time
+    range with a binary search instead of a scan.  It only applies to files whose timestamps don't go backwards.
+    """
+    SAMPLE_LINES = 1024
+
+    # Number of lines at the start of each sampled block searched for a timestamp
+    SAMPLE_PROBE_LINES = 16
+
+    def __init__(self, store, timestampParser):
+        """
+        :param store: LogParser_LineStore - the file to index, this reads one line in every SAMPLE_LINES
+        :param timestampParser: LogParser_TimestampParser - finds the timestamps
+        """
+        self.timestampParser = timestampParser
+        self.numLines = len(store)
+        # (timestamp, index) of the first line with a timestamp near the start of each sampled block of lines
+        self.samples = []
+        for sampleStart in range(0, self.numLines, self.SAMPLE_LINES):
+            for index in range(sampleStart, min(sampleStart + self.SAMPLE_PROBE_LINES, self.numLines)):
+                timestamp = timestampParser.parse(store[index])
+                if timestamp is not None:
+                    self.samples.append((timestamp, index))
+                    break
+        self.timestamps = [timestamp for timestamp, index in self.samples]
+        self.ordered = all(a <= b for a, b in zip(self.timestamps, self.timestamps[1:]))
+
+    def lineRanges(self, timeRanges):
+        """
+        Find the lines that may have a timestamp in any of the time ranges.
+
+        :param timeRanges: list - time ranges as returned by parseTimeRange()
+        :return: list - sorted, non-overlapping (start, stop) line ranges, or None if the index can't tell
+        """
+        if not self.ordered or not self.samples:
+            return None
+
+        windows = []
+        for timeRange in timeRanges:
+            windows.extend(_timeWindows(timeRange, self.timestamps[0], self.timestamps[-1]))
+
+        ranges = []
+        for windowStart, windowStop in sorted(windows):
+            # The lines before the first sample at or after windowStart are older, back to the previous sample
+            sample = bisect.bisect_left(self.timestamps, windowStart)
+            start = self.samples[sample - 1][1] if sample > 0 else 0
+            # From the first sample at or after windowStop on every line is too new
+            sample = bisect.bisect_left(self.timestamps, windowStop)
+            stop = self.samples[sample][1] if sample < len(self.samples) else self.numLines
+            if start >= stop:
+                continue
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], stop))
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+
+# Kinds of time ranges: times of day (repeated every day) or absolute dates and times
+TIME_OF_DAY, TIME_ABSOLUTE = range(2)
+
+TIME_OF_DAY_PATTERN = re.compile(r'^(\d{1,2}):(\d\d)(?::(\d\d))?$')
+DATE_TIME_PATTERN = re.compile(r'^(\d{4})-(\d\d)-(\d\d)(?:[T ](\d{1,2}):(\d\d)(?::(\d\d))?)?$')
+
+
+def _parseTimePoint(text):
+    """
+    :return: tuple - (kind, seconds, resolution in seconds), or None if text isn't a time
+    """
+    match = TIME_OF_DAY_PATTERN.match(text)
+    if match is not None:
+        hour, minute, second = match.groups()
+        seconds = int(hour) * 3600 + int(minute) * 60 + int(second or 0)
+        return TIME_OF_DAY, seconds, 1 if second else 60
+
+    match = DATE_TIME_PATTERN.match(text)
+    if match is not None:
+        year, month, day, hour, minute, second = match.groups()
+        seconds = calendar.timegm((int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                                   int(second or 0)))
+        if hour is None:
+            return TIME_ABSOLUTE, seconds, 86400
+        return TIME_ABSOLUTE, seconds, 1 if second else 60
+    return None
+
+
+def parseTimeRange(text):
+    """
+    Parse a time range filter such as @14:02..14:07, @2024-01-31 23:50..2024-02-01 00:10 or @14:00.. (open ended).
+
+    The end is inclusive at the precision it is given in, @14:02..14:07 includes 14:07:59.  Times of day without a date
+    match on every day, a range that ends before it starts wraps around midnight.
+
+    :param text: str - a filter string
+    :return: tuple - (kind, start, stop) with stop exclusive and None for an open end, or None if text isn't a time
+                     range
+    """
+    if not text.startswith('@') or '..' not in text:
+        return None
+    startText, stopText = [part.strip() for part in text[1:].split('..', 1)]
+    start = _parseTimePoint(startText) if startText else None
+    stop = _parseTimePoint(stopText) if stopText else None
+    if (startText and start is None) or (stopText and stop is None) or (start is None and stop is None):
+        return None
+    if start is not None and stop is not None and start[0] != stop[0]:
+        return None
+
+    kind = (start or stop)[0]
+    return (kind, start[1] if start else None, stop[1] + stop[2] if stop else None)
+
+
+def inTimeRange(timestamp, timeRange):
+    """
+    :param timestamp: float - seconds since the epoch
+    :param timeRange: tuple - a time range as returned by parseTimeRange()
+    :return: bool - True if the timestamp is inside the range
+    """
+    kind, start, stop = timeRange
+    if timestamp == float('-inf'):
+        return False
+    if kind == TIME_OF_DAY:
+        timestamp %= 86400
+        if start is not None and stop is not None and start >= stop:
+            return timestamp >= start or timestamp < stop
+    return (start is None or timestamp >= start) and (stop is None or timestamp < stop)
+
+
+def iterRangeSegments(start, stop, ranges):
+    """
+    Split the lines from start to stop into the parts inside and outside of a list of line ranges.
+
+    :param ranges: list - sorted, non-overlapping (start, stop) line ranges, None for one range covering every line
+    :return: generator - (segmentStart, segmentStop, inside) for every part, in order
+    """
+    if ranges is None:
+        if start < stop:
+            yield start, stop, True
+        return
+
+    for rangeStart, rangeStop in ranges:
+        rangeStart = max(rangeStart, start)
+        rangeStop = min(rangeStop, stop)
+        if rangeStart >= rangeStop:
+            continue
+        if start < rangeStart:
+            yield start, rangeStart, False
+        yield rangeStart, rangeStop, True
+        start = rangeStop
+    if start < stop:
+        yield start, stop, False
+
+
+def iterMatchBlocks(lines, plan, parallelFilter=None, start=0, stop=None, useSidecar=True):
+    """
+    Yield (stopLine, matches) a block at a time, in file order, where matches are the indexes of the matching lines
+    between the previous block's stopLine and this one.
+
+    Lines are filtered a block at a time so a caller that stops consuming stops quickly even when nothing matches.
+    Blocks that the sidecar index rules out, and lines that the time index places outside of the plan's time ranges,
+    are skipped without reading them.  In parallel mode the blocks are the chunks filtered by the worker process pool.
+
+    :param lines: LogParser_LineStore or list - the lines to filter
+    :param plan: LogParser_FilterPlan - the filters
+    :param parallelFilter: LogParser_ParallelFilter - worker pool to filter memory-mapped files with, or None
+    :param start: int - first line to filter
+    :param stop: int - one past the last line to filter, defaults to the end of the file
+    :param useSidecar: bool - skip the blocks the sidecar index rules out, if its trigram index has been built
+    """
+    if stop is None:
+        stop = len(lines)
+    if parallelFilter is not None and getattr(lines, 'memoryMapped', False):
+        for stopLine, matches in parallelFilter.iterChunkMatches(lines, plan, start, stop):
+            yield stopLine, matches
+        return
+
+    candidates = None
+    sidecar = getattr(lines, 'sidecar', None)
+    if useSidecar and sidecar is not None:
+        candidates = sidecar.candidateBlocks(plan)
+
+    timeRanges = None
+    if isinstance(lines, LogParser_LineStore):
+        timeRanges = lines.timeRanges(plan)
+
+    # Blocks are aligned to the sidecar index's blocks
+    blockLines = LogParser_LineStore.BLOCK_LINES
+    for rangeStart, rangeStop, inside in iterRangeSegments(start, stop, timeRanges):
+        if not inside:
+            yield rangeStop, []
+            continue
+        blockStart = rangeStart
+        while blockStart < rangeStop:
+            blockStop = min((blockStart // blockLines + 1) * blockLines, rangeStop)
+            if candidates is not None and blockStart // blockLines not in candidates:
+                yield blockStop, []
+            else:
+                yield blockStop, list(plan.iterMatchIndexes(lines, blockStart, blockStop))
+            blockStart = blockStop
+
+
+def _timeWindows(timeRange, first, last):
+    """
+    :return: list - absolute (start, stop) windows covering a time range between the timestamps first and last
+    """
+    kind, start, stop = timeRange
+    if kind == TIME_ABSOLUTE:
+        return [(float('-inf') if start is None else start, float('inf') if stop is None else stop)]
+
+    # A time of day range applies to every day the file covers
+    start = 0 if start is None else start
+    stop = 86400 if stop is None else stop
+    if stop <= start:
+        stop += 86400
+    windows = []
+    day = (int(first) // 86400 - 1) * 86400
+    while day <= last:
+        windows.append((day + start, day + stop))
+        day += 86400
+    return windows
+
+
+class LogParser_Session(object):
+    """
+    Several line stores viewed as one.  Lines are addressed by a code that combines the file's position in the session
+    with the line's index in that file, and are displayed with the name of their file in front.
+    """
+    # Bits of a line code that hold the line index, the file's position is stored above them
+    FILE_SHIFT = 40
+
+    def __init__(self, stores, timestampParser=None):
+        """
+        :param stores: list - LogParser_LineStore for every file of the session
+        :param timestampParser: LogParser_TimestampParser - used to order lines across files
+        """
+        self.stores = list(stores)
+        self.timestampParser = timestampParser or LogParser_TimestampParser()
+        self.names = [os.path.basename(store.fname) for store in self.stores]
+        self.identity = tuple(store.identity for store in self.stores)
+        self._timestamps = [LogParser_TimestampLookup(store, self.timestampParser) for store in self.stores]
+
+    def __len__(self):
+        return sum(len(store) for store in self.stores)
+
+    def __getitem__(self, code):
+        fileIndex = code >> self.FILE_SHIFT
+        return '{}: {}'.format(self.names[fileIndex], self.stores[fileIndex][code & ((1 << self.FILE_SHIFT) - 1)])
+
+    def lineCode(self, fileIndex, index):
+        return fileIndex << self.FILE_SHIFT | index
+
+    def timestampAt(self, fileIndex, index):
+        """
+        Find the timestamp of a line, or of the closest line before it that has one.  Meant to be called with
+        increasing indexes for each file.
+
+        :return: float - the timestamp, -inf if no line up to this one has a timestamp
+        """
+        return self._timestamps[fileIndex].at(index)
+
+    def iterMergedMatches(self, plan, parallelFilter=None, shouldStop=None, progress=None):
+        """
+        Filter every file of the session lazily and merge their matches in time order.
+
+        Raises LogParser_FilterInterrupted, and can't be used any further, once shouldStop asks to stop.
+
+        :param plan: LogParser_FilterPlan - the filters
+        :param parallelFilter: LogParser_ParallelFilter - worker pool to filter memory-mapped files with, or None
+        :param shouldStop: callable - returns True when merging has to stop, checked after each block of lines
+        :param progress: list - if given, progress[fileIndex] is kept at the number of lines filtered in each file
+        :return: generator - (timestamp, fileIndex, index) for every matching line
+        """
+        return heapq.merge(*[self._iterFileMatches(fileIndex, plan, parallelFilter, shouldStop, progress)
+                             for fileIndex in range(len(self.stores))])
+
+    def _iterFileMatches(self, fileIndex, plan, parallelFilter, shouldStop, progress):
+        """
+        :return: generator - (timestamp, fileIndex, index) for every matching line of one file, in file order
+        """
+        for stopLine, matches in iterMatchBlocks(self.stores[fileIndex], plan, parallelFilter):
+            if shouldStop is not None and shouldStop():
+                raise LogParser_FilterInterrupted()
+            if progress is not None:
+                progress[fileIndex] = stopLine
+            for index in matches:
+                yield self.timestampAt(fileIndex, index), fileIndex, index
+
+    def refresh(self):
+        """
+        The files of a session aren't followed.
+
+        :return: int - always LogParser_LineStore.REFRESH_UNCHANGED
+        """
+        return LogParser_LineStore.REFRESH_UNCHANGED
+
+    def close(self):
+        for store in self.stores:
+            store.close()
+
+
+def exportMatches(fileData, plan, fname, compress=False, parallelFilter=None, shouldStop=None):
+    """
+    Write every matching line of a line store or session to a file.
+
+    Matches are found a block at a time and written in buffers of EXPORT_WRITE_BYTES, so memory use stays the same no
+    matter how large the file or the output is.  Lines of a line store are copied as the raw bytes of the file, a run
+    of consecutive matching lines as a single slice.  Lines of a session are written the way they are displayed,
+    prefixed with the name of their file, in time order.
+
+    The output is written to FNAME.part and renamed to fname once it is complete, so an export that fails or is
+    stopped (by closing the generator or through shouldStop) doesn't leave a truncated file behind.
+
+    :param fileData: LogParser_LineStore or LogParser_Session - the lines to filter, completely indexed
+    :param plan: LogParser_FilterPlan - the filters
+    :param fname: str - path of the output file
+    :param compress: bool - gzip the output
+    :param parallelFilter: LogParser_ParallelFilter - worker pool to filter memory-mapped files with, or None
+    :param shouldStop: callable - returns True when the export has to stop, checked after each block of lines.  The
+                                  export then raises LogParser_FilterInterrupted.
+    :return: generator - (linesFiltered, numLines, numMatches) after every block
+    """
+    partName = fname + '.part'
+    complete = False
+    try:
+        if compress:
+            output = gzip.GzipFile(partName, 'wb', EXPORT_COMPRESS_LEVEL)
+        else:
+            output = open(partName, 'wb')
+        with output:
+            buffered = []
+            bufferedBytes = 0
+            numMatches = 0
+            for linesFiltered, numLines, chunks, blockMatches in _iterExportChunks(fileData, plan, parallelFilter,
+                                                                                   shouldStop):
+                buffered.extend(chunks)
+                bufferedBytes += sum(len(chunk) for chunk in chunks)
+                if bufferedBytes >= EXPORT_WRITE_BYTES:
+                    output.write(b''.join(buffered))
+                    buffered = []
+                    bufferedBytes = 0
+                numMatches += blockMatches
+                yield linesFiltered, numLines, numMatches
+            output.write(b''.join(buffered))
+
+        # os.rename() can't replace an existing file on Windows
+        if os.path.exists(fname):
+            os.remove(fname)
+        os.rename(partName, fname)
+        complete = True
+    finally:
+        if not complete and os.path.exists(partName):
+            os.remove(partName)
+
+
+def _iterExportChunks(fileData, plan, parallelFilter, shouldStop):
+    """
+    :return: generator - (linesFiltered, numLines, chunks, numMatches) per block, chunks are the bytes to write for the
+                         block's numMatches matching lines
+    """
+    if isinstance(fileData, LogParser_Session):
+        stores = fileData.stores
+        numLines = len(fileData)
+        encoding = stores[0].encoding if stores else 'utf-8'
+        # A trailing newline ends the last line of a file rather than starting an empty one
+        finalLines = [len(store) - 1 if store.offsets[-1] == store.size else None for store in stores]
+        progress = [0] * len(stores)
+        lines = []
+        for _, fileIndex, index in fileData.iterMergedMatches(plan, parallelFilter, shouldStop, progress):
+            if index == finalLines[fileIndex]:
+                continue
+            lines.append(fileData[fileData.lineCode(fileIndex, index)])
+            if len(lines) >= LogParser_LineStore.BLOCK_LINES:
+                yield sum(progress), numLines, [('\n'.join(lines) + '\n').encode(encoding, 'replace')], len(lines)
+                lines = []
+        if lines:
+            yield numLines, numLines, [('\n'.join(lines) + '\n').encode(encoding, 'replace')], len(lines)
+        return
+
+    # A trailing newline ends the last line rather than starting an empty one
+    numLines = len(fileData)
+    if numLines > 0 and fileData.offsets[-1] == fileData.size:
+        numLines -= 1
+    for stopLine, matches in iterMatchBlocks(fileData, plan, parallelFilter, 0, numLines):
+        if shouldStop is not None and shouldStop():
+            raise LogParser_FilterInterrupted()
+        chunks = []
+        runStart = runStop = None
+        for index in matches:
+            if index != runStop:
+                if runStart is not None:
+                    chunks.append(fileData.rawLines(runStart, runStop))
+                runStart = index
+            runStop = index + 1
+        if runStart is not None:
+            chunks.append(fileData.rawLines(runStart, runStop))
+        yield stopLine, numLines, chunks, len(matches)
+
+
+class LogParser_MergedMatchSet(object):
+    """
+    Codes of the matching lines of a session in time order, produced on demand by a heap merge of one lazy match
+    iterator per file.
+    """
+    def __init__(self, session):
+        """
+        :param session: LogParser_Session - the files being filtered
+        """
+        self.lines = session
+        self.reset(None)
+
+    def reset(self, plan, parallelFilter=None, shouldStop=None):
+        """
+        Start merging the matches of a plan from the beginning of every file.
+
+        :param plan: LogParser_FilterPlan - the filters, None for an empty match set
+        :param parallelFilter: LogParser_ParallelFilter - worker pool to filter memory-mapped files with, or None
+        :param shouldStop: callable - returns True when merging has to stop, checked after each block of lines
+        """
+        self.plan = plan
+        self.matches = array(OFFSET_TYPECODE)
+        # Number of lines of each file that have been filtered
+        self.progress = [0] * len(self.lines.stores)
+        self.complete = plan is None
+        self._merged = None
+        if plan is not None:
+            self._merged = self.lines.iterMergedMatches(plan, parallelFilter, shouldStop, self.progress)
+
+    @property
+    def cursor(self):
+        return sum(self.progress)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def isComplete(self, stopLine=None):
+        return self.complete
+
+    def keep(self, plan):
+        """
+        :param plan: LogParser_FilterPlan - the new filters
+        :return: bool - True if the merge can continue with plan, i.e. it matches exactly the same lines
+        """
+        if self.plan is None or not (plan.narrows(self.plan) and self.plan.narrows(plan)):
+            return False
+        self.plan = plan
+        return True
+
+    def extend(self, count):
+        """
+        Merge up to count more matches.
+
+        Raises LogParser_FilterInterrupted if shouldStop asked to stop, after which the match set has to be reset.
+
+        :param count: int - number of matches to add
+        """
+        try:
+            numBefore = len(self.matches)
+            for _, fileIndex, index in itertools.islice(self._merged, count):
+                self.matches.append(self.lines.lineCode(fileIndex, index))
+            if len(self.matches) - numBefore < count:
+                self.complete = True
+        except LogParser_FilterInterrupted:
+            self.plan = None
+            raise
+
+
+class LogParser_BitmapCache(object):
+    """
+    Least recently used cache of per-filter line bitmaps.
+
+    A bitmap is a Python int with bit i set when line i contains the filter.  Python's big integer operations make
+    combining them cheap, and they are stored zlib-compressed because filter hits are usually sparse.
+    """
+    # Key used for the bitmap of empty lines
+    EMPTY_LINES = None
+
+    def __init__(self, maxBytes):
+        """
+        :param maxBytes: int - memory budget for the compressed bitmaps, 0 disables the cache
+        """
+        self.maxBytes = maxBytes
+        self.numBytes = 0
+        self._bitmaps = OrderedDict()
+
+    def _key(self, store, text, fieldFormat=None):
+        # A field filter's lines depend on the field format as well
+        if text is not self.EMPTY_LINES and fieldFormat is not None and \
+                compilePattern(text, fieldFormat).kind == LogParser_Pattern.KIND_FIELD:
+            return store.identity, text, fieldFormat.spec
+        return store.identity, text
+
+    def get(self, store, text, fieldFormat=None):
+        """
+        :param store: LogParser_LineStore - the file the bitmap belongs to
+        :param text: str - the filter string, or EMPTY_LINES
+        :param fieldFormat: LogParser_FieldFormat - field format of the plan the filter string is from
+        :return: int - the bitmap, or None if it isn't cached
+        """
+        key = self._key(store, text, fieldFormat)
+        data = self._bitmaps.pop(key, None)
+        if data is None:
+            return None
+
+        # Re-insert to mark the bitmap as the most recently used
+        self._bitmaps[key] = data
+        return _unpackBitmap(data)
+
+    def put(self, store, text, bitmap, fieldFormat=None):
+        key = self._key(store, text, fieldFormat)
+        data = _packBitmap(bitmap)
+        if len(data) > self.maxBytes:
+            return
+
+        if key in self._bitmaps:
+            self.numBytes -= len(self._bitmaps.pop(key))
+        self._bitmaps[key] = data
+        self.numBytes += len(data)
+
+        while self.numBytes > self.maxBytes:
+            _, evicted = self._bitmaps.popitem(last=False)
+            self.numBytes -= len(evicted)
+
+    def contains(self, store, text, fieldFormat=None):
+        return self._key(store, text, fieldFormat) in self._bitmaps
+
+    def missing(self, store, plan):
+        """
+        :return: list - the filter strings (or EMPTY_LINES) of the plan that don't have a cached bitmap
+        """
+        keys = list(plan.filterTexts)
+        if plan.skipEmptyLines:
+            keys.append(self.EMPTY_LINES)
+        return [key for key in keys if not self.contains(store, key, plan.fieldFormat)]
+
+    def build(self, store, text, fieldFormat=None):
+        """
+        Compute and cache the bitmap for one filter string.
+
+        This is a generator that yields after each chunk of the file so the caller can interrupt it, in which case
+        nothing is cached.  Nothing is cached either if the file grew while the bitmap was being built.
+
+        :param store: LogParser_LineStore - the file to search
+        :param text: str - the filter string, or EMPTY_LINES
+        :param fieldFormat: LogParser_FieldFormat - field format of the plan the filter string is from
+        """
+        identity = store.identity
+        numLines = len(store)
+        bits = bytearray((numLines + 7) // 8)
+        for firstLine, stopLine, startByte, endByte in store.chunkRanges(0, numLines):
+            if text is self.EMPTY_LINES:
+                hits = store.emptyLineHits(firstLine, stopLine)
+            else:
+                hits = store.patternHits(compilePattern(text, fieldFormat), firstLine, stopLine)
+            for index in hits:
+                bits[index >> 3] |= 1 << (index & 7)
+            yield
+
+        if store.identity == identity:
+            self.put(store, text, _bitmapFromBytes(bits), fieldFormat)
+
+    def evaluate(self, store, plan):
+        """
+        Filter a whole file using only cached bitmaps, missing(store, plan) has to be empty.
+
+        :return: int - bitmap of the lines matched by the plan
+        """
+        return evaluateBitmaps(plan, len(store), lambda key: self.get(store, key, plan.fieldFormat))
+
+
+def evaluateBitmaps(plan, numLines, getBitmap):
+    """
+    Apply the text filters of a plan to the bitmaps of the lines each filter matches.
+
+    :param plan: LogParser_FilterPlan - the filters, time ranges are ignored
+    :param numLines: int - number of lines the bitmaps cover
+    :param getBitmap: callable - returns the bitmap of a filter string, or of LogParser_BitmapCache.EMPTY_LINES
+    :return: int - bitmap of the lines matched by the plan
+    """
+    result = (1 << numLines) - 1
+
+    omitted = 0
+    for text in plan.omitTexts:
+        omitted |= getBitmap(text)
+    if plan.skipEmptyLines:
+        omitted |= getBitmap(LogParser_BitmapCache.EMPTY_LINES)
+    result &= ~omitted
+
+    for texts in plan.requiredSets:
+        required = 0
+        for text in texts:
+            required |= getBitmap(text)
+        result &= required
+
+    return result
+
+
+class LogParser_FilterStats(object):
+    """
+    Statistics of a plan over a whole file, gathered in the same pass that finds its matches: the number of lines each
+    filter occurs in, the number of matching lines and how many of them are in each block of BLOCK_LINES lines.
+
+    Each block is searched once per filter, and the hits are combined as bitmaps instead of evaluating the plan line by
+    line, so a pass costs about as much as building the bitmaps of the filters.
+    """
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, plan):
+        """
+        Forget all counts, the next pass starts at the beginning of the file.
+
+        :param plan: LogParser_FilterPlan - the filters to gather statistics for
+        """
+        self.plan = plan
+        self.filterHits = [0] * len(plan.filterTexts) if plan is not None else []
+        self.numMatches = 0
+        # Number of matching lines in every block counted so far
+        self.blockMatches = array(OFFSET_TYPECODE)
+        # Lines counted so far
+        self.cursor = 0
+        # Counts of the last block if it was cut short by the end of the file, it is counted again once the file grows
+        self._partial = None
+
+    def copy(self):
+        """
+        :return: LogParser_FilterStats - a snapshot that isn't changed by further counting
+        """
+        stats = LogParser_FilterStats()
+        stats.plan = self.plan
+        stats.filterHits = list(self.filterHits)
+        stats.numMatches = self.numMatches
+        stats.blockMatches = array(OFFSET_TYPECODE, self.blockMatches)
+        stats.cursor = self.cursor
+        return stats
+
+    def hitsByText(self):
+        """
+        :return: dict - number of lines each filter string occurs in
+        """
+        return dict(zip(self.plan.filterTexts, self.filterHits))
+
+    def iterBlocks(self, store, stopLine):
+        """
+        Count the lines from the cursor up to stopLine a block at a time.
+
+        This is a generator that yields after each block so the caller can interrupt it, the counts stay consistent
+        with the cursor.
+
+        :param store: LogParser_LineStore - the file being filtered
+        :param stopLine: int - one past the last line to count
+        :return: generator - (blockStop, matches) per block, matches lists the indexes of the block's matching lines
+        """
+        plan = self.plan
+        blockLines = LogParser_LineStore.BLOCK_LINES
+        if self._partial is not None and self.cursor < stopLine:
+            partialHits, partialMatches = self._partial
+            for filterId, hits in enumerate(partialHits):
+                self.filterHits[filterId] -= hits
+            self.numMatches -= partialMatches
+            self.blockMatches.pop()
+            self.cursor -= self.cursor % blockLines
+            self._partial = None
+
+        while self.cursor < stopLine:
+            blockStart = self.cursor
+            blockStop = min(blockStart + blockLines, stopLine)
+            numLines = blockStop - blockStart
+
+            bitmaps = {}
+            blockHits = []
+            for text, pattern in zip(plan.filterTexts, plan.patterns):
+                hits = store.patternHits(pattern, blockStart, blockStop)
+                blockHits.append(len(hits))
+                bitmaps[text] = _bitmapFromIndexes(hits, blockStart, numLines)
+
+            if plan.hasTimeFilters:
+                # Bitmaps don't know the timestamps, the block's lines are tested one by one
+                matches = [index for index, line in plan.iterMatches(store, blockStart, blockStop)]
+            else:
+                if plan.skipEmptyLines:
+                    bitmaps[LogParser_BitmapCache.EMPTY_LINES] = _bitmapFromIndexes(
+                        store.emptyLineHits(blockStart, blockStop), blockStart, numLines)
+                matches = [blockStart + index for index in
+                           bitmapIndexes(evaluateBitmaps(plan, numLines, bitmaps.get))]
+
+            for filterId, hits in enumerate(blockHits):
+                self.filterHits[filterId] += hits
+            self.numMatches += len(matches)
+            self.blockMatches.append(len(matches))
+            self.cursor = blockStop
+            if numLines < blockLines:
+                self._partial = (blockHits, len(matches))
+            yield blockStop, matches
+
+
+class LogParser_Metrics(object):
+    """
+    Timers and counters of the load, filter, display (model updates) and render (painting) stages, shared by the GUI
+    thread and the worker threads.
+
+    Every stage adds up the seconds spent in it, the longest single call and how many calls, lines, bytes, matches
+    and emits (batches of results sent to the display) it handled.  Callers record a whole batch or job at a time.
+    """
+    STAGES = ('load', 'filter', 'display', 'render')
+    COUNTERS = ('calls', 'lines', 'bytes', 'matches', 'emits')
+
+    def __init__(self, profileDir=None):
+        """
+        :param profileDir: str - directory that profileCall() saves a cProfile profile of every job to, None to not
+                                 profile
+        """
+        self.profileDir = profileDir
+        self._lock = threading.Lock()
+        # Number of profiles saved so far, keeps the names of the profiles of jobs with the same name apart
+        self._numProfiles = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Set every counter back to zero.
+        """
+        with self._lock:
+            self.startTime = time.time()
+            self.stages = OrderedDict()
+            for stage in self.STAGES:
+                counters = OrderedDict((name, 0) for name in self.COUNTERS)
+                counters['seconds'] = 0.0
+                counters['maxSeconds'] = 0.0
+                self.stages[stage] = counters
+
+    def record(self, stage, seconds, lines=0, numBytes=0, matches=0, emits=0):
+        """
+        Add one call of a stage.
+
+        :param stage: str - one of STAGES
+        :param seconds: float - time the call took
+        :param lines: int - lines scanned or displayed
+        :param numBytes: int - bytes read or indexed
+        :param matches: int - matching lines found or displayed
+        :param emits: int - batches of results sent to the display
+        """
+        with self._lock:
+            counters = self.stages[stage]
+            counters['calls'] += 1
+            counters['lines'] += lines
+            counters['bytes'] += numBytes
+            counters['matches'] += matches
+            counters['emits'] += emits
+            counters['seconds'] += seconds
+            counters['maxSeconds'] = max(counters['maxSeconds'], seconds)
+
+    def snapshot(self):
+        """
+        :return: dict - copy of the counters that can be saved as JSON, with the lines, bytes and matches per second of
+                        time spent in each stage and the peak resident set size of the process in bytes
+        """
+        with self._lock:
+            stages = OrderedDict()
+            for stage, counters in self.stages.items():
+                stageMetrics = OrderedDict(counters)
+                for name in ('lines', 'bytes', 'matches'):
+                    rate = 0.0
+                    if counters['seconds'] > 0:
+                        rate = counters[name] / counters['seconds']
+                    stageMetrics[name + 'PerSecond'] = rate
+                stages[stage] = stageMetrics
+            return OrderedDict([('elapsedSeconds', time.time() - self.startTime),
+                                ('peakRssBytes', peakRssBytes()),
+                                ('stages', stages)])
+
+    def summary(self):
+        """
+        :return: str - one line overview of the stages, e.g. for a status bar
+        """
+        metrics = self.snapshot()
+        load = metrics['stages']['load']
+        filtering = metrics['stages']['filter']
+        display = metrics['stages']['display']
+        render = metrics['stages']['render']
+        parts = ['Load {:,.1f} MB/s'.format(load['bytesPerSecond'] / 1e6),
+                 'Filter {:,.0f} lines/s, {:,.0f} matches/s, {:,} emits'.format(
+                     filtering['linesPerSecond'], filtering['matchesPerSecond'], filtering['emits']),
+                 'Display {:,} updates, {:.1f} ms max'.format(display['calls'], display['maxSeconds'] * 1000),
+                 'Render {:,} paints, {:.1f} ms max'.format(render['calls'], render['maxSeconds'] * 1000)]
+        if metrics['peakRssBytes'] is not None:
+            parts.append('Peak RSS {:,.0f} MB'.format(metrics['peakRssBytes'] / 1e6))
+        return ' | '.join(parts)
+
+    def save(self, fname):
+        """
+        Write snapshot() to a JSON file.
+
+        :param fname: str - path of the file
+        """
+        with open(fname, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+            f.write('\n')
+
+    def profileCall(self, name, function, *args):
+        """
+        Call function(*args), under cProfile if profileDir is set.  The profile is saved as NAME-N.prof in profileDir
+        and can be read with the pstats module or a viewer such as snakeviz.
+
+        cProfile only sees the thread it was started in, so this profiles exactly one job of a worker thread.
+
+        :param name: str - what the job is, e.g. filter or load
+        :param function: callable - the job
+        :return: what function returned
+        """
+        if not self.profileDir:
+            return function(*args)
+
+        with self._lock:
+            self._numProfiles += 1
+            fname = os.path.join(self.profileDir, '{}-{}.prof'.format(name, self._numProfiles))
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args)
+        finally:
+            if not os.path.isdir(self.profileDir):
+                os.makedirs(self.profileDir)
+            profiler.dump_stats(fname)
+
+
+def peakRssBytes():
+    """
+    :return: int - the largest resident set size of this process so far, None if it can't be measured
+    """
+    if resource is None:
+        return None
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        return maxRss
+    return maxRss * 1024
+
+
+class LogParser_AhoCorasick(object):
+    """
+    Aho-Corasick automaton that finds every one of a set of patterns in a line with a single left-to-right pass.
+
+    The failure links are folded into the transition tables when the automaton is built, so scanning a character is one
+    dictionary lookup regardless of how many patterns there are.
+    """
+    def __init__(self, patterns):
+        """
+        :param patterns: list - non-empty strings to search for, a pattern's ID is its index in this list
+        """
+        self.patterns = tuple(patterns)
+
+        # Build the trie of all patterns, state 0 is the root
+        trie = [{}]
+        outputs = [set()]
+        for patternId, pattern in enumerate(self.patterns):
+            state = 0
+            for character in pattern:
+                nextState = trie[state].get(character)
+                if nextState is None:
+                    trie.append({})
+                    outputs.append(set())
+                    nextState = len(trie) - 1
+                    trie[state][character] = nextState
+                state = nextState
+            outputs[state].add(patternId)
+
+        # Breadth first over the trie, resolving each state's failure link and full transition table from its parent's
+        failure = [0] * len(trie)
+        transitions = [None] * len(trie)
+        transitions[0] = dict(trie[0])
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = transitions[failure[state]]
+            for character, nextState in trie[state].items():
+                failure[nextState] = fallback.get(character, 0)
+                queue.append(nextState)
+            table = dict(fallback)
+            table.update(trie[state])
+            transitions[state] = table
+            outputs[state] |= outputs[failure[state]]
+
+        self._setTables(transitions, [frozenset(output) if output else None for output in outputs])
+
+    def _setTables(self, transitions, outputs):
+        self._tables = transitions
+        # Characters without a transition go back to the root
+        self._transitions = [table.get for table in transitions]
+        self._outputs = outputs
+
+    def __getstate__(self):
+        # Bound dict.get methods don't pickle, so plans are sent to worker processes with the plain tables
+        return self.patterns, self._tables, self._outputs
+
+    def __setstate__(self, state):
+        self.patterns = state[0]
+        self._setTables(state[1], state[2])
+
+    def matchIds(self, line):
+        """
+        :param line: str - text to search
+        :return: set - IDs of every pattern that occurs in line
+        """
+        transitions = self._transitions
+        outputs = self._outputs
+        hits = set()
+        state = 0
+        for character in line:
+            state = transitions[state](character, 0)
+            if outputs[state] is not None:
+                hits |= outputs[state]
+        return hits
+
+
+class LogParser_ParallelFilter(object):
+    """
+    Pool of worker processes that filters a line store chunk by chunk and merges the results back in file order.
+    """
+    # Approximate size of the byte range handed to a worker process at a time
+    CHUNK_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, processes=None):
+        """
+        :param processes: int - number of worker processes, defaults to the number of CPUs
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self._pool = None
+
+    def _getPool(self):
+        if self._pool is None:
+            # Forking a process that is running Qt threads isn't safe, so start fresh interpreters where possible
+            if hasattr(multiprocessing, 'get_context'):
+                context = multiprocessing.get_context('spawn')
+            else:
+                context = multiprocessing
+            self._pool = context.Pool(self.processes)
+        return self._pool
+
+    def iterChunkMatches(self, store, plan, start=0, stop=None):
+        """
+        Filter a range of lines in parallel.
+
+        A few chunks per process are kept in flight.  Results are yielded in file order, so the caller can stop
+        consuming at any point (e.g. the display is full or the job was cancelled) without waiting for the rest of the
+        file.  Lines the plan's time ranges rule out are skipped without being sent to a worker.
+
+        :param store: LogParser_LineStore - the file to filter
+        :param plan: LogParser_FilterPlan - the filters to apply
+        :param start: int - first line to filter
+        :param stop: int - one past the last line to filter, defaults to the end of the file
+        :return: generator - (stopLine, matches) per chunk, matches is an array of matching line indexes
+        """
+        pool = self._getPool()
+        if stop is None or stop > len(store):
+            stop = len(store)
+        chunks = deque()
+        for rangeStart, rangeStop, inside in iterRangeSegments(start, stop, store.timeRanges(plan)):
+            if inside:
+                chunks.extend(store.chunkRanges(rangeStart, rangeStop, self.CHUNK_BYTES))
+            else:
+                chunks.append((rangeStart, rangeStop, None, None))
+
+        pending = deque()
+        while chunks or pending:
+            while chunks and len(pending) < 2 * self.processes:
+                firstLine, stopLine, startByte, endByte = chunks.popleft()
+                if startByte is None:
+                    pending.append((stopLine, None))
+                    continue
+                # Lines without a timestamp take it from the lines before them, which may be in the previous chunk
+                contextLine = firstLine
+                if plan.hasTimeFilters:
+                    contextLine = max(0, firstLine - LogParser_TimestampLookup.LOOKBACK)
+                task = (store.fname, store.encoding, firstLine, startByte, endByte, plan,
+                        contextLine, store.offsets[contextLine])
+                pending.append((stopLine, pool.apply_async(_filterByteRange, (task,))))
+
+            stopLine, result = pending.popleft()
+            if result is None:
+                yield stopLine, array(OFFSET_TYPECODE)
+            else:
+                yield stopLine, result.get()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+def _filterByteRange(task):
+    """
+    Worker process entry point, filter the lines in one byte range of a file.
+
+    :param task: tuple - (fname, encoding, firstLine, startByte, endByte, plan, contextLine, contextByte), where the
+                         lines from contextLine (starting at contextByte) up to firstLine are only read for their
+                         timestamps
+    :return: array - indexes of the matching lines
+    """
+    fname, encoding, firstLine, startByte, endByte, plan, contextLine, contextByte = task
+
+    # Empty files and ranges can't be mapped, they hold a single empty line
+    data = b''
+    if endByte > contextByte:
+        with open(fname, 'rb') as f:
+            fileMap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                data = fileMap[contextByte:endByte]
+            finally:
+                fileMap.close()
+
+    # Without time ranges the raw bytes can be scanned without decoding them
+    if plan.useNumpy and not plan.hasTimeFilters:
+        matches = plan.scanBytes(data[startByte - contextByte:], encoding)
+        return array(OFFSET_TYPECODE, [firstLine + index for index in matches.tolist()])
+
+    block = data.decode(encoding, 'replace')
+    lines = [line[:-1] if line.endswith('\r') else line for line in block.split('\n')]
+    skipped = firstLine - contextLine
+    return array(OFFSET_TYPECODE, [contextLine + index for index, line in plan.iterMatches(lines, skipped)])
+
+
+def _bitmapFromBytes(bits):
+    """
+    Convert a little-endian bytearray bitset to an int bitmap.
+    """
+    if not bits:
+        return 0
+    return int(binascii.hexlify(bytes(bits[::-1])), 16)
+
+
+def _packBitmap(bitmap):
+    digits = '%x' % bitmap
+    if len(digits) % 2:
+        digits = '0' + digits
+    return zlib.compress(binascii.unhexlify(digits), 1)
+
+
+def _unpackBitmap(data):
+    return int(binascii.hexlify(zlib.decompress(data)), 16)
+
+
+def _encodeNeedle(text, encoding):
+    """
+    :param text: str - substring to search for in raw bytes, or None
+    :return: bytes - the encoded substring, None if it can't be searched for in the raw bytes
+    """
+    # Decoding replaces invalid bytes with U+FFFD, so such a filter may match lines that don't contain its bytes
+    if not text or u'\ufffd' in text or '\n' in text:
+        return None
+    try:
+        return text.encode(encoding)
+    except UnicodeError:
+        return None
+
+
+# Number of hits of a substring after which a chunk is searched with vectorized comparisons instead of bytes.find
+FIND_LOOP_MAX_HITS = 256
+
+
+def _lineHitMask(data, buffer, starts, needle):
+    """
+    :param data: bytes - lines separated by newlines
+    :param buffer: numpy array - data as unsigned bytes
+    :param starts: numpy array - offset of the start of every line in data
+    :param needle: bytes - substring to search for
+    :return: numpy array - True for every line that contains needle
+    """
+    positions = []
+    find = data.find
+    position = find(needle)
+    while position != -1:
+        positions.append(position)
+        if len(positions) > FIND_LOOP_MAX_HITS:
+            positions = _findAll(buffer, needle)
+            break
+        # The rest of the line doesn't need searching once the needle has been found in it
+        lineEnd = find(b'\n', position + len(needle))
+        if lineEnd == -1:
+            break
+        position = find(needle, lineEnd + 1)
+
+    mask = numpy.zeros(len(starts), dtype=bool)
+    if len(positions):
+        mask[numpy.searchsorted(starts, positions, side='right') - 1] = True
+    return mask
+
+
+def _findAll(buffer, needle):
+    """
+    Find a substring that occurs often with vectorized comparisons, which beats a bytes.find per hit.
+
+    :param buffer: numpy array - unsigned bytes to search
+    :param needle: bytes - substring to search for
+    :return: numpy array - start offset of every occurrence of needle
+    """
+    needle = bytearray(needle)
+    # Positions where the first byte matches, narrowed down by each following byte
+    positions = numpy.flatnonzero(buffer[:len(buffer) - len(needle) + 1] == needle[0])
+    for offset in range(1, len(needle)):
+        positions = positions[buffer[positions + offset] == needle[offset]]
+    return positions
+
+
+def _bitmapFromIndexes(indexes, start, numLines):
+    """
+    :param indexes: list - line indexes, from start up to start + numLines
+    :return: int - bitmap with the bits of those lines set, bit 0 is line start
+    """
+    bits = bytearray((numLines + 7) // 8)
+    for index in indexes:
+        index -= start
+        bits[index >> 3] |= 1 << (index & 7)
+    return _bitmapFromBytes(bits)
+
+
+def bitmapIndexes(bitmap, start=0):
+    """
+    Yield the positions of the set bits of a bitmap in increasing order.
+
+    :param bitmap: int - the bitmap
+    :param start: int - ignore bits below this position
+    """
+    # Convert a window of bits at a time to a string and search it for ones, which is much faster than testing bits
+    window = 1 << 20
+    mask = (1 << window) - 1
+    bitmap >>= start
+    base = start
+    while bitmap:
+        bits = bin(bitmap & mask)[:1:-1]
+        position = bits.find('1')
+        while position != -1:
+            yield base + position
+            position = bits.find('1', position + 1)
+        bitmap >>= window
+        base += window
+
+
+def _arrayToBytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    if hasattr(values, 'tobytes'):
+        return values.tobytes()
+    return values.tostring()
+
+
+def _arrayFromBytes(typecode, data):
+    values = array(typecode)
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _packPostings(postings):
+    # (trigram, number of blocks) followed by the block numbers, for every trigram
+    parts = []
+    for trigram in sorted(postings):
+        blocks = postings[trigram]
+        parts.append(struct.pack('<II', trigram, len(blocks)))
+        parts.append(_arrayToBytes(blocks))
+    return b''.join(parts)
+
+
+def _unpackPostings(data):
+    postings = {}
+    itemSize = array(BLOCK_TYPECODE).itemsize
+    position = 0
+    while position < len(data):
+        trigram, count = struct.unpack_from('<II', data, position)
+        position += 8
+        postings[trigram] = _arrayFromBytes(BLOCK_TYPECODE, data[position:position + count * itemSize])
+        position += count * itemSize
+    return postings
+
+
+def _unique(items):
+    """
+    Remove duplicates from a list while keeping the original order.
+    """
+    seen = set()
+    uniqueItems = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            uniqueItems.append(item)
+    return uniqueItems
@@ -0,0 +1,2008 @@
+#!/usr/bin/env python
+""" logparser_gui.py - PyQt graphical log parser, started by logparser.py
+
+This is an easy-to-use tool which combines the advantages of *less* and *grep* in a fashion which doesn't require the
+ user to understand regular expressions.
+
+Useage:
+    python logparser.py [filename.txt ...] [directory ...]
+
+    To load a file either pass the name in as an argument on the command line or drag and drop any file within the
+    bounds of the file output display.  Files are loaded in the background: the lines of a large file are indexed a
+    chunk at a time, with the progress shown in the status bar, and the filters are applied to the lines indexed so far
+    while the rest of the file loads.
+
+    Several files, or directories, can be passed on the command line or dropped at once.  They are filtered together
+    and the matching lines of all files are displayed merged in the order of the timestamps at the start of the lines,
+    each prefixed with the name of its file.
+
+    Compressed logs (gzip, bzip2, xz and zstd) are decompressed on the fly, there is no need to decompress them to disk
+    first.  xz needs Python's lzma module and zstd the zstandard package.
+
+    Below the file output display there is a spot to type strings to filter for.  The enter key will apply the filter.
+    All existing filters are displayed to the far right.
+
+Filters:
+    By default green filters include all lines that contain the filter string.
+    By default red filters will exclude any line that contains the filter string.
+
+    Multiple green filters are treated as ORs.  Both filters do not need to exist on the same line.
+
+    Red filters take priority over green filters.
+
+    A filter written as /regex/ is a regular expression and /regex/i one that ignores case.  A filter starting with ~
+    (e.g. ~timeout) is a plain string that ignores case.  To search for text that starts with /, ~ or @ put a
+    backslash in front of it, e.g. \\/usr/ finds the string /usr/.
+
+    Toggle filters from red to green or vice versa by double-clicking with the mouse or by selecting with mouse and
+    pressing <Space>.
+
+    Delete filters by selecting with mouse and pressing <Delete>.
+
+    To create an AND filter, click on an existing filter and then type in a new filter.  The ANDed filter should appear
+    indented under the filter that was clicked on.
+
+    A filter written as @START..END is a time range, shown in italics, that is matched against the timestamp at the
+    start of each line (lines without one, such as stack traces, use the timestamp of the line before them).  START
+    and END are times of day (@14:02..14:07, which includes 14:07:59, or @23:50..00:10 across midnight) or dates with
+    an optional time (@2024-01-31 23:50..2024-02-01 00:10), and either one may be left out.  Green time ranges are
+    ORed together and ANDed with the other filters, red time ranges exclude the lines in them.  In files whose
+    timestamps are in order only the part of the file in the range is read.
+
+    When LOGPARSER_FIELDS describes the fields of the lines, a filter written as FIELD=VALUE (e.g. level=ERROR) or
+    FIELD!=VALUE (e.g. host!=db7) compares that field of each line instead of searching the whole line.  The fields
+    are parsed once and kept as compact integer codes, so changing field filters doesn't parse the file again.
+
+Environment:
+    LOGPARSER_BITMAP_CACHE_MB sets the memory budget of the cache that remembers which lines contain each filter
+    (default 256, 0 disables it).  Once a filter has been searched for, toggling it is answered from this cache.
+
+    LOGPARSER_INDEX_DIR sets the directory where the line and trigram indexes of opened files are saved (default
+    ~/.cache/logparser, empty disables them).  Reopening an unchanged file reads its line index instead of scanning it,
+    and filters only search the parts of the file that contain all of their 3-character sequences.  The matches found
+    for each set of filters are saved there too, so reopening an unchanged file with the same filters shows them
+    right away.  Only the indexes and results of recently used files are kept.
+
+    LOGPARSER_TIMESTAMP_FORMATS sets the timestamp formats tried at the start of each line, separated by semicolons, in
+    strptime notation (default "%Y-%m-%d %H:%M:%S;%Y-%m-%dT%H:%M:%S;%b %d %H:%M:%S").  Invalid formats are reported in
+    the status bar and the defaults are used instead.
+
+    LOGPARSER_FIELDS sets the fields of the lines for field filters, as "split:SEP:NAME,..." (fields separated by SEP,
+    or by whitespace if SEP is empty, e.g. "split::date,time,level,host,component,message"), "regex:PATTERN" (the
+    named groups of a regular expression) or "json:NAME,..." (keys of JSON lines).  Unset by default, an invalid
+    value is reported in the status bar.
+
+    LOGPARSER_FILTER_SETS sets the file the named filter sets are saved in (default
+    ~/.config/logparser/filtersets.json).
+
+    LOGPARSER_PROFILE_DIR turns on profiling: every load and filter job is run under cProfile and its profile is saved
+    in this directory as load-N.prof or filter-N.prof, to be read with the pstats module.  Unset by default.
+
+Filter sets:
+    The Filter Sets menu saves the current filters under a name (Ctrl+Shift+A) and lists the saved filter sets.
+    Choosing one replaces the filters with it in one go, the filters are only applied once.  Filter sets can also be
+    used on the command line with --filter-set NAME.
+
+Saving:
+    File > Save Filtered Output (Ctrl+S) writes every line of the file that matches the filters, not just the ones
+    displayed so far, to a file.  A name ending in .gz saves it gzip-compressed.  The lines are filtered and written in
+    the background a block at a time, with the progress and a button to cancel shown in the status bar, and in parallel
+    mode the worker processes do the filtering.  A cancelled save leaves no partial file behind.
+
+Metrics:
+    The time spent loading, filtering, updating the display and painting it is always measured, along with the lines,
+    bytes and matches each of them handled.  The sixth button shows a summary in the status bar, with the peak memory
+    use, and File > Save Metrics writes all of it to a JSON file.
+
+Incomplete features:
+    There are currently six "invisible" buttons that don't have an icon, but do have mouse-over tooltips.  They are
+    all located just below the "File" menu.
+        - Left button exits the application
+        - Middle button toggles filtering out empty lines (e.g. lines with just a newline)
+        - Third button toggles parallel filtering, which splits the file into chunks filtered by one process per CPU
+        - Fourth button toggles follow mode, which filters lines as they are appended to the file (like tail -f) and
+          keeps the display scrolled to the bottom while it is at the bottom.  A rotated or truncated file is opened
+          again.
+        - Fifth button toggles statistics mode, which filters the whole file at once and shows the number of lines
+          each filter occurs in next to it, plus a minimap of where the matches are.  Clicking the minimap jumps to
+          the matches there.  Statistics are only gathered for single files, not for several files opened together.
+        - Sixth button toggles the metrics summary in the status bar
+"""
+import bisect
+import itertools
+import os
+import sys
+import threading
+import time
+from PyQt4 import QtGui
+from PyQt4 import QtCore
+
+from logparser_core import LogParser_BitmapCache
+from logparser_core import LogParser_FieldFormat
+from logparser_core import LogParser_FilterInterrupted
+from logparser_core import LogParser_FilterPlan
+from logparser_core import LogParser_FilterSets
+from logparser_core import LogParser_FilterStats
+from logparser_core import LogParser_LineStore
+from logparser_core import LogParser_MatchSet
+from logparser_core import LogParser_MergedMatchSet
+from logparser_core import LogParser_Metrics
+from logparser_core import LogParser_ParallelFilter
+from logparser_core import LogParser_Pattern
+from logparser_core import LogParser_ResultCache
+from logparser_core import LogParser_Session
+from logparser_core import LogParser_TimestampParser
+from logparser_core import DEFAULT_FILTER_SETS_FILE
+from logparser_core import DEFAULT_INDEX_DIR
+from logparser_core import bitmapIndexes
+from logparser_core import compilePattern
+from logparser_core import exportMatches
+from logparser_core import iterMatchBlocks
+from logparser_core import openLineStore
+from logparser_core import parseTimeRange
+
+
+class LogParser_FilterJob(object):
+    """
+    Everything the filter thread needs for one filter job.  Jobs are created on the GUI thread and are not changed
+    afterwards, so the filter thread never reads state that the GUI is modifying.
+    """
+    def __init__(self, generation, fileData, matchSet, plan, targetMatches, parallel, stopLine, useCaches, stats):
+        """
+        :param generation: int - ID of the filter settings this job displays, results of older generations are ignored
+        :param fileData: LogParser_LineStore or list - the lines to filter
+        :param matchSet: LogParser_MatchSet - results of previous jobs on fileData, updated by this job
+        :param plan: LogParser_FilterPlan - immutable snapshot of the filters
+        :param targetMatches: int - stop filtering once this many matches are available
+        :param parallel: bool - filter with the worker process pool
+        :param stopLine: int - only filter the lines before this one, fileData may grow while the job runs
+        :param useCaches: bool - answer the job from, and build, the bitmap cache and sidecar index
+        :param stats: LogParser_FilterStats - statistics of previous jobs on fileData, updated by this job, which then
+                                              filters the whole file.  None to only filter the requested page.
+        """
+        self.generation = generation
+        self.fileData = fileData
+        self.matchSet = matchSet
+        self.plan = plan
+        self.targetMatches = targetMatches
+        self.parallel = parallel
+        self.stopLine = stopLine
+        self.useCaches = useCaches
+        self.stats = stats
+
+
+class LogParser_ApplyFilterThread(QtCore.QThread):
+    # New matches are sent to the GUI in batches, whenever this many have been found...
+    BATCH_MATCHES = 5000
+    # ...or this many seconds have passed since the previous batch
+    BATCH_SECONDS = 0.05
+
+    def __init__(self, parent):
+        """
+        As filters are applied, update the text as results are required.
+        This is basically a worker thread to help make the GUI appear more responsive.
+
+        :param parent: LogParer -  the LogParser instance (i.e. the GUI application)
+        """
+        QtCore.QThread.__init__(self, parent)
+        self.parent = parent
+        # Create Lock
+        self._lock = threading.Lock()
+        # Custom signal / slot for displaying a message instead of results
+        self.signal = QtCore.SIGNAL('Update text')
+        # Custom signal / slot for updating the displayed matches as they are found
+        self.matchesSignal = QtCore.SIGNAL('Update matches')
+        # Custom signal / slot for reporting how far the current filter job has got
+        self.progressSignal = QtCore.SIGNAL('Update progress')
+        # Custom signal / slot for updating the filter statistics in statistics mode
+        self.statsSignal = QtCore.SIGNAL('Update statistics')
+        # Flag used to end the current filter search, set by the GUI thread before the thread is started
+        self.running = False
+        # Set while the thread is only building bitmaps after the current job's results are complete
+        self.idle = False
+        # LogParser_FilterJob to run, only replaced by the GUI thread while the thread isn't running
+        self.job = None
+        # What the GUI was last sent, and when
+        self._emittedMatches = None
+        self._emittedCount = 0
+        self._lastEmitTime = 0.0
+        # Where and when the current job started, for throughput
+        self._jobStartCursor = 0
+        self._jobStartMatches = 0
+        self._jobStartTime = 0.0
+        # Number of batches the current job has sent to the GUI
+        self._numEmits = 0
+
+    def emitResults(self, finished=False):
+        """
+        Send the matches found since the previous batch, and the job's progress, to the GUI.
+
+        Batches are throttled by count and time so a fast scan can't flood the GUI's event loop.  The match array is
+        append-only while the GUI displays it, so a batch is just the new match count and the GUI appends the rows
+        between the previous count and this one.
+
+        :param finished: bool - this is the last batch of the job, always send it
+        """
+        job = self.job
+        matchSet = job.matchSet
+        now = time.time()
+        numNew = len(matchSet) - self._emittedCount
+        if not finished and numNew < self.BATCH_MATCHES and now - self._lastEmitTime < self.BATCH_SECONDS:
+            return
+        self._numEmits += 1
+
+        if len(matchSet) > 0 and (matchSet.matches is not self._emittedMatches or numNew > 0):
+            self.emit(self.matchesSignal, job.generation, matchSet.matches, len(matchSet))
+            self._emittedMatches = matchSet.matches
+            self._emittedCount = len(matchSet)
+
+        elapsed = now - self._jobStartTime
+        linesPerSecond = 0.0
+        if elapsed > 0:
+            linesPerSecond = (matchSet.cursor - self._jobStartCursor) / elapsed
+        self.emit(self.progressSignal, job.generation, matchSet.cursor, job.stopLine, len(matchSet),
+                  linesPerSecond, finished)
+        if job.stats is not None and job.stats.plan is job.plan:
+            self.emit(self.statsSignal, job.generation, job.stats.copy())
+        self._lastEmitTime = now
+
+    def recordMetrics(self):
+        """
+        Add the time the current job has taken so far, and the lines and matches it has filtered, to the metrics.
+        """
+        matchSet = self.job.matchSet
+        self.parent.metrics.record('filter', time.time() - self._jobStartTime,
+                                   lines=max(0, matchSet.cursor - self._jobStartCursor),
+                                   matches=max(0, len(matchSet) - self._jobStartMatches), emits=self._numEmits)
+
+    def fileDisplayUI_ApplyFilters(self):
+        # The job was put together by the GUI thread, nothing in the loop below touches a Qt item or the GUI's state
+        job = self.job
+        plan = job.plan
+        fileData = job.fileData
+        matchSet = job.matchSet
+
+        self._jobStartCursor = matchSet.cursor
+        self._jobStartMatches = len(matchSet)
+        self._jobStartTime = time.time()
+        self._emittedMatches = None
+        self._emittedCount = 0
+        self._lastEmitTime = 0.0
+        self._numEmits = 0
+
+        if isinstance(fileData, LogParser_Session):
+            self.applyMergedFilters()
+            self.recordMetrics()
+            self.running = False
+            return
+
+        # Matches saved for these filters, e.g. in an earlier session, are displayed without filtering those lines again
+        resultCache = self.parent.resultCache
+        useResults = job.useCaches and resultCache is not None and isinstance(fileData, LogParser_LineStore) and \
+            len(plan.filterTexts) > 0
+        if useResults and matchSet.plan is not plan:
+            results = resultCache.load(fileData, plan)
+            if results is not None and results[0] >= matchSet.cursor:
+                matchSet.reset(plan)
+                matchSet.extend(*results)
+                self._jobStartCursor = matchSet.cursor
+                self._jobStartMatches = len(matchSet)
+
+        # Bitmaps are only kept for memory-mapped files
+        bitmapCache = self.parent.bitmapCache
+        useBitmaps = job.useCaches and bitmapCache.maxBytes > 0 and isinstance(fileData, LogParser_LineStore)
+
+        # Bitmaps only know which lines contain each string, time ranges have to be tested line by line
+        if useBitmaps and not plan.hasTimeFilters and not bitmapCache.missing(fileData, plan):
+            # Every filter has been searched for before, so the rest of the file is filtered with bitwise operations
+            if matchSet.plan is not plan:
+                matchSet.reset(plan)
+
+            # Only take the requested page, the cursor is left right after its last line
+            numNeeded = job.targetMatches - len(matchSet)
+            if numNeeded > 0:
+                # Combining the bitmaps costs as much as the whole file, so the next page continues where this one
+                # ended unless something else has moved the cursor since
+                if matchSet.evaluated is None or matchSet.evaluated[0] != matchSet.cursor:
+                    matchSet.evaluated = (matchSet.cursor,
+                                          bitmapIndexes(bitmapCache.evaluate(fileData, plan), matchSet.cursor))
+                matchIndexes = matchSet.evaluated[1]
+                page = list(itertools.islice(matchIndexes, numNeeded))
+                if len(page) < numNeeded:
+                    matchSet.extend(job.stopLine, page)
+                else:
+                    matchSet.extend(page[-1] + 1, page)
+                matchSet.evaluated = (matchSet.cursor, matchIndexes)
+        else:
+            # Update the results of the previous job instead of starting over, this only re-tests affected lines
+            for _ in matchSet.refine(plan):
+                # If this filter job is being interrupted, leave the refinement unfinished
+                if not self.running:
+                    break
+
+        # An interrupted refinement discards the previous results
+        if matchSet.plan is not plan:
+            matchSet.reset(plan)
+            self._jobStartCursor = 0
+            self._jobStartMatches = 0
+
+        # Lines past the job's stopLine, such as the partial last line of a followed file, are filtered again
+        matchSet.truncate(job.stopLine)
+        self._jobStartCursor = min(self._jobStartCursor, matchSet.cursor)
+        self._jobStartMatches = min(self._jobStartMatches, len(matchSet))
+
+        # The display model reads the first numMatches entries of the match array.  The array is only ever appended
+        # to after it has been handed over, refinements and resets create a new one.
+        self.emitResults()
+
+        # In statistics mode the statistics pass goes over the whole file and supplies the matches past the cursor
+        stats = job.stats
+        if not isinstance(fileData, LogParser_LineStore):
+            stats = None
+        if self.running and stats is not None:
+            # Counting has to start over for new filters, or if it got ahead of the matches
+            if stats.plan is not plan or stats.cursor > matchSet.cursor:
+                stats.reset(plan)
+            for stopLine, matchBlock in stats.iterBlocks(fileData, job.stopLine):
+                if stopLine > matchSet.cursor:
+                    matchSet.extend(stopLine, [index for index in matchBlock if index >= matchSet.cursor])
+                self.emitResults()
+
+                # If this filter job is being interrupted, then break out
+                if not self.running:
+                    break
+
+        # Resume filtering from the saved cursor until the requested page is full
+        elif self.running and len(matchSet) < job.targetMatches:
+            for stopLine, matchBlock in self.iterMatchBlocks(job, matchSet.cursor):
+                # If this filter job is being interrupted, then break out
+                if not self.running:
+                    break
+
+                # Only whole blocks are recorded so the match set stays consistent with its cursor
+                matchSet.extend(stopLine, matchBlock)
+
+                # Display our filtered output
+                self.emitResults()
+
+                # If the page is full, pause until the user scrolls further
+                if len(matchSet) >= job.targetMatches:
+                    break
+
+        if self.running:
+            self.emitResults(finished=True)
+
+        # If there is no output to display, display 'No Results' to avoid user confusion
+        # ...unless the rest of a file that is still loading may have some
+        if self.running and len(matchSet) == 0 and getattr(fileData, 'indexed', True):
+            self.emit(self.signal, job.generation, 'No Results!')
+        self.recordMetrics()
+
+        # With the display filled, save the matches so reopening the file with these filters shows them right away
+        self.idle = True
+        if useResults and self.running and matchSet.plan is plan:
+            resultCache.save(fileData, plan, matchSet.cursor, matchSet.matches)
+
+        # ...use the idle time to build bitmaps so toggling these filters later is instant
+        # ...and the trigram index, so the next time the file is opened its filters only search candidate blocks
+        if useBitmaps:
+            for text in bitmapCache.missing(fileData, plan):
+                for _ in bitmapCache.build(fileData, text, plan.fieldFormat):
+                    if not self.running:
+                        break
+                if not self.running:
+                    break
+        sidecar = getattr(fileData, 'sidecar', None)
+        if job.useCaches and sidecar is not None and sidecar.postings is None:
+            for _ in sidecar.build():
+                if not self.running:
+                    break
+        self.idle = False
+
+        self.running = False
+
+    def applyMergedFilters(self):
+        """
+        Merge the matches of the files of a session in time order until the requested page is full.
+        """
+        job = self.job
+        matchSet = job.matchSet
+
+        if not matchSet.keep(job.plan):
+            parallelFilter = self.parent.parallelFilter if job.parallel else None
+            matchSet.reset(job.plan, parallelFilter, lambda: not self.running)
+            self._jobStartCursor = 0
+            self._jobStartMatches = 0
+
+        try:
+            self.emitResults()
+            while self.running and not matchSet.isComplete() and len(matchSet) < job.targetMatches:
+                # Merge a batch at a time so the display is updated while the page fills
+                matchSet.extend(min(self.BATCH_MATCHES, job.targetMatches - len(matchSet)))
+                self.emitResults()
+        except LogParser_FilterInterrupted:
+            return
+
+        if self.running:
+            self.emitResults(finished=True)
+        if self.running and len(matchSet) == 0:
+            self.emit(self.signal, job.generation, 'No Results!')
+
+    def iterMatchBlocks(self, job, start=0):
+        """
+        Yield (stopLine, matches) a block at a time from start up to the job's stopLine, see iterMatchBlocks() in
+        logparser_core.
+        """
+        parallelFilter = None
+        if job.parallel:
+            parallelFilter = self.parent.parallelFilter
+        return iterMatchBlocks(job.fileData, job.plan, parallelFilter, start, job.stopLine, job.useCaches)
+
+    def run(self):
+        with self._lock:
+            self.parent.metrics.profileCall('filter', self.fileDisplayUI_ApplyFilters)
+
+
+class LogParser_LoadFileThread(QtCore.QThread):
+    def __init__(self, parent):
+        """
+        Opens files in the background so the GUI stays responsive while a large file is indexed.
+
+        A single uncompressed file is handed to the GUI as soon as it is mapped, its lines are indexed a chunk at a time
+        afterwards so the filter thread can filter the lines indexed so far.  Compressed files and sessions are handed
+        to the GUI once they are completely indexed.
+
+        :param parent: LogParser - the LogParser instance (i.e. the GUI application)
+        """
+        QtCore.QThread.__init__(self, parent)
+        self.parent = parent
+        # Custom signal / slot for handing an opened file or session to the GUI
+        self.loadedSignal = QtCore.SIGNAL('File loaded')
+        # Custom signal / slot for reporting how much of the file or session has been loaded
+        self.progressSignal = QtCore.SIGNAL('Load progress')
+        # Custom signal / slot for reporting a file that couldn't be opened
+        self.errorSignal = QtCore.SIGNAL('Load error')
+        # Flag used to stop loading, set by the GUI thread before the thread is started
+        self.running = False
+        # (generation, file names) to load, only replaced by the GUI thread while the thread isn't running
+        self.job = None
+        # Line store this thread is indexing, the GUI mustn't close it while the thread is running
+        self.fileData = None
+
+    def loadFile(self, generation, fname):
+        start = time.time()
+        try:
+            fileData = openLineStore(fname, indexDir=self.parent.indexDir, deferIndex=True)
+        except (IOError, OSError, ValueError) as e:
+            self.emit(self.errorSignal, generation, 'Could not open {}: {}'.format(fname, e))
+            return
+
+        # Compressed files are completely indexed when they are opened
+        metrics = self.parent.metrics
+        metrics.record('load', time.time() - start, lines=fileData.numCompleteLines(),
+                       numBytes=fileData.indexedBytes)
+
+        self.fileData = fileData
+        self.emit(self.loadedSignal, generation, fileData)
+        start = time.time()
+        numLines = fileData.numCompleteLines()
+        numBytes = fileData.indexedBytes
+        for indexedBytes in fileData.indexChunks():
+            metrics.record('load', time.time() - start, lines=fileData.numCompleteLines() - numLines,
+                           numBytes=indexedBytes - numBytes)
+            self.emit(self.progressSignal, generation, indexedBytes, fileData.size)
+            # A newer load replaces this file, leave the rest of it unindexed
+            if not self.running:
+                return
+            start = time.time()
+            numLines = fileData.numCompleteLines()
+            numBytes = indexedBytes
+        self.emit(self.progressSignal, generation, fileData.size, fileData.size)
+
+    def loadSession(self, generation, fnames):
+        stores = []
+        for fname in fnames:
+            if not self.running:
+                for store in stores:
+                    store.close()
+                return
+            start = time.time()
+            try:
+                store = openLineStore(fname, indexDir=self.parent.indexDir)
+                stores.append(store)
+                self.parent.metrics.record('load', time.time() - start, lines=len(store), numBytes=store.size)
+            except (IOError, OSError, ValueError) as e:
+                self.emit(self.errorSignal, generation, 'Could not open {}: {}'.format(fname, e))
+            self.emit(self.progressSignal, generation, len(stores), len(fnames))
+        if not stores:
+            return
+
+        self.emit(self.loadedSignal, generation, LogParser_Session(stores, self.parent.timestampParser))
+        self.emit(self.progressSignal, generation, len(fnames), len(fnames))
+
+    def run(self):
+        generation, fnames = self.job
+        self.fileData = None
+        # Shows the progress bar while a compressed file or the first file of a session is opened
+        self.emit(self.progressSignal, generation, 0, 1)
+        if len(fnames) == 1:
+            self.parent.metrics.profileCall('load', self.loadFile, generation, fnames[0])
+        else:
+            self.parent.metrics.profileCall('load', self.loadSession, generation, fnames)
+
+class LogParser_ExportThread(QtCore.QThread):
+    # Progress is sent to the GUI at most this often, in seconds
+    PROGRESS_SECONDS = 0.1
+
+    def __init__(self, parent):
+        """
+        Writes the matching lines of the whole file to another file in the background.
+
+        :param parent: LogParser - the LogParser instance (i.e. the GUI application)
+        """
+        QtCore.QThread.__init__(self, parent)
+        self.parent = parent
+        # Custom signal / slot for reporting how much of the file has been exported
+        self.progressSignal = QtCore.SIGNAL('Export progress')
+        # Custom signal / slot for reporting the outcome of the export
+        self.doneSignal = QtCore.SIGNAL('Export done')
+        # Flag used to cancel the export, set by the GUI thread before the thread is started
+        self.running = False
+        # (fileData, plan, fname, compress, parallel) to export, only replaced by the GUI thread while the thread isn't
+        # running
+        self.job = None
+
+    @property
+    def fileData(self):
+        """
+        Line store or session the thread is reading, the GUI mustn't close it while the thread is running.
+        """
+        if self.job is None:
+            return None
+        return self.job[0]
+
+    def run(self):
+        fileData, plan, fname, compress, parallel = self.job
+        parallelFilter = self.parent.parallelFilter if parallel else None
+        lastEmitTime = 0.0
+        numMatches = 0
+        export = exportMatches(fileData, plan, fname, compress, parallelFilter, lambda: not self.running)
+        try:
+            for linesFiltered, numLines, numMatches in export:
+                if not self.running:
+                    break
+                now = time.time()
+                if now - lastEmitTime >= self.PROGRESS_SECONDS:
+                    self.emit(self.progressSignal, linesFiltered, numLines)
+                    lastEmitTime = now
+        except LogParser_FilterInterrupted:
+            pass
+        except (IOError, OSError) as e:
+            self.emit(self.doneSignal, 'Could not save {}: {}'.format(fname, e))
+            return
+        finally:
+            # Removes the partial output of a cancelled export
+            export.close()
+
+        if self.running:
+            self.emit(self.doneSignal, 'Saved {:,} lines to {}'.format(numMatches, fname))
+        else:
+            self.emit(self.doneSignal, 'Saving {} cancelled'.format(fname))
+
+
+class LogParser_Filter(QtGui.QListWidgetItem):
+    """
+    This class will hold relevant information regarding filters (e.x. filter states, filter colors)
+    """
+    # Possible states for a filter
+    STATE_OMIT, STATE_INCLUDE = range(2)
+
+    # Default color for omition filters: RED
+    filterOmitColor = QtGui.QColor(255, 0, 0)
+
+    # Default color for inclusive filters: GREEN
+    filterIncludeColor = QtGui.QColor(0, 255, 0)
+
+    # Default state for a filter
+    filterState = STATE_OMIT
+
+    def __init__(self):
+        super(QtGui.QListWidgetItem, self).__init__()
+
+    # Set the of the filter to be either
+    def setState(self, state):
+
+        self.filterState = state
+
+        if self.filterState == self.STATE_INCLUDE:
+            self.setForeground(self.filterIncludeColor)
+        else:
+            self.setForeground(self.filterOmitColor)
+
+    # If more attributes are added to this class, the clone method will need to be updated
+    def clone(self):
+        clone = super(LogParser_Filter, self).clone()
+        clone.__class__ = self.__class__
+        clone.filterState = self.filterState
+        return clone
+
+    def getState(self):
+        return self.filterState
+
+class LogParser_FilterHitsDelegate(QtGui.QStyledItemDelegate):
+    """
+    Draws the filter items as usual, plus the number of lines each filter occurs in at the right in statistics mode.
+    """
+    # Color of the hit counts
+    hitsColor = QtGui.QColor(150, 150, 150)
+
+    def __init__(self, filterDisplay):
+        """
+        :param filterDisplay: QListWidget - the list of filters
+        """
+        super(LogParser_FilterHitsDelegate, self).__init__(filterDisplay)
+        self.filterDisplay = filterDisplay
+        # Number of lines each filter string occurs in, empty when there are no statistics to show
+        self.hits = {}
+
+    def paint(self, painter, option, index):
+        super(LogParser_FilterHitsDelegate, self).paint(painter, option, index)
+        item = self.filterDisplay.item(index.row())
+        if item is None:
+            return
+        # Child filters are displayed indented by three spaces
+        hits = self.hits.get(str(item.text()).strip())
+        if hits is None:
+            return
+        painter.save()
+        painter.setPen(self.hitsColor)
+        painter.drawText(option.rect.adjusted(0, 0, -4, 0), QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter,
+                         '{:,}'.format(hits))
+        painter.restore()
+
+
+class LogParser_Minimap(QtGui.QWidget):
+    """
+    Narrow strip that shows where in the file the matches are, brighter where there are more of them.  Clicking it
+    jumps to the matches at that position.
+    """
+    # Signal emitted with the clicked position, as a fraction of the file
+    clickedSignal = QtCore.SIGNAL('Minimap clicked')
+
+    backgroundColor = QtGui.QColor(39, 40, 34)
+    matchColor = QtGui.QColor(0, 255, 0)
+
+    def __init__(self):
+        super(LogParser_Minimap, self).__init__()
+        self.setFixedWidth(16)
+        self.setToolTip('Where the matches are in the file')
+        # Matching lines per block of LogParser_LineStore.BLOCK_LINES lines, and the number of lines the blocks cover
+        self.blockMatches = []
+        self.numLines = 0
+
+    def setCounts(self, blockMatches, numLines):
+        """
+        :param blockMatches: list - number of matching lines in each block of the file counted so far
+        :param numLines: int - number of lines in the file
+        """
+        self.blockMatches = blockMatches
+        self.numLines = numLines
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.backgroundColor)
+        height = self.height()
+        if not self.blockMatches or self.numLines <= 0 or height <= 0:
+            return
+
+        # Sum the blocks that fall on each pixel row, then draw each row as bright as its share of the busiest row
+        blockLines = LogParser_LineStore.BLOCK_LINES
+        numBlocks = (self.numLines + blockLines - 1) // blockLines
+        rows = [0] * height
+        for block, count in enumerate(self.blockMatches):
+            rows[min(block * height // numBlocks, height - 1)] += count
+        busiest = max(rows)
+        if busiest == 0:
+            return
+        for row, count in enumerate(rows):
+            if count:
+                color = QtGui.QColor(self.matchColor)
+                color.setAlpha(64 + 191 * count // busiest)
+                painter.fillRect(0, row, self.width(), 1, color)
+
+    def mousePressEvent(self, event):
+        if self.height() > 0:
+            self.emit(self.clickedSignal, float(event.pos().y()) / self.height())
+
+
+class LogParser_MatchModel(QtCore.QAbstractListModel):
+    """
+    Virtual list of the filtered lines used by the file display.
+
+    Only the indexes of the matching lines are kept.  The view asks for the rows it is about to paint and those lines
+    are read from the line store on demand, so the cost of a repaint doesn't depend on how many lines matched.
+    """
+    # Rows are read from the line store a page at a time
+    PAGE_ROWS = 256
+    # Number of pages kept, the ones furthest from the page being displayed are dropped first
+    MAX_PAGES = 16
+
+    def __init__(self, message=None):
+        super(LogParser_MatchModel, self).__init__()
+        # The lines that match indexes refer to
+        self.lines = []
+        # Indexes of the displayed lines, only the first numRows entries are valid
+        self.matches = []
+        self.numRows = 0
+        # Message shown as the only row when there are no results to show
+        self.message = message
+        # Text of recently displayed rows, keyed by page number
+        self._pages = {}
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.message is not None:
+            return 1
+        return self.numRows
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        if self.message is not None:
+            return self.message
+
+        pageNumber, pageRow = divmod(index.row(), self.PAGE_ROWS)
+        page = self._pages.get(pageNumber)
+        if page is None:
+            page = self._loadPage(pageNumber)
+        return page[pageRow]
+
+    def _loadPage(self, pageNumber):
+        start = pageNumber * self.PAGE_ROWS
+        stop = min(start + self.PAGE_ROWS, self.numRows)
+        page = [self.lines[index] for index in self.matches[start:stop]]
+        self._pages[pageNumber] = page
+
+        # Keep memory bounded no matter how far the user scrolls
+        while len(self._pages) > self.MAX_PAGES:
+            del self._pages[max(self._pages, key=lambda cachedPage: abs(cachedPage - pageNumber))]
+        return page
+
+    def setLines(self, lines):
+        self.beginResetModel()
+        self.lines = lines
+        self.matches = []
+        self.numRows = 0
+        self._pages = {}
+        self.endResetModel()
+
+    def setMessage(self, message):
+        self.beginResetModel()
+        self.message = message
+        self.matches = []
+        self.numRows = 0
+        self._pages = {}
+        self.endResetModel()
+
+    def setMatches(self, matches, numMatches):
+        """
+        Show the first numMatches line indexes of matches.
+
+        Growing the same array only inserts the new rows, so the view keeps its scroll position while results stream
+        in.  A different array replaces all rows.
+        """
+        if self.message is not None or matches is not self.matches or numMatches < self.numRows:
+            self.beginResetModel()
+            self.message = None
+            self.matches = matches
+            self.numRows = numMatches
+            self._pages = {}
+            self.endResetModel()
+        elif numMatches > self.numRows:
+            self.beginInsertRows(QtCore.QModelIndex(), self.numRows, numMatches - 1)
+            # The last page may have been cached while it was only partially filled
+            self._pages.pop(self.numRows // self.PAGE_ROWS, None)
+            self.numRows = numMatches
+            self.endInsertRows()
+
+    def rowsText(self, rows):
+        """
+        :param rows: list - row numbers
+        :return: str - the text of those rows, one per line
+        """
+        return '\n'.join(self.data(self.index(row)) for row in sorted(rows))
+
+
+class LogParser(QtGui.QMainWindow):
+    def __init__(self, fname=None, fnames=None):
+        """
+        Main LogParser class.
+
+        :param fname: str - filename to open at startup (optional)
+        :param fnames: list - files or directories to open together as a session at startup (optional)
+        """
+        super(LogParser, self).__init__()
+
+        # Init all UI components
+        self.initProgramVariables()
+        self.initCentralWidgetUI()
+        self.initGUIStructureUI()
+        self.initComponentsUI()
+
+        # Main window colors
+        p = self.palette()
+        p.setColor(QtGui.QPalette.Window, QtGui.QColor(65, 75, 65))
+        p.setColor(QtGui.QPalette.Button, QtGui.QColor(220, 220, 220))
+        p.setColor(QtGui.QPalette.ButtonText, QtGui.QColor(0, 0, 0))
+        self.setPalette(p)
+
+        # Main window attributes
+        self.setGeometry(300, 300, 1300, 500)
+        self.setWindowTitle('Log Parser')
+        self.show()
+
+        # If a filename was passed in
+        if fname is not None:
+            self.loadFile(fname)
+        elif fnames:
+            self.loadFiles(fnames)
+
+    def closeEvent(self, event):
+        # Stop the filter thread before shutting down the worker processes it may be reading from
+        self.filterDebounceTimer.stop()
+        self.followTimer.stop()
+        self.metricsTimer.stop()
+        self.pendingLoad = None
+        self.loadFileThread.running = False
+        self.loadFileThread.wait()
+        self.exportThread.running = False
+        self.exportThread.wait()
+        self.pendingJob = None
+        self.applyFiltersThread.running = False
+        self.applyFiltersThread.wait()
+        self.parallelFilter.close()
+        super(LogParser, self).closeEvent(event)
+
+    def eventFilter(self, source, event):
+        # Drag event for the file display UI, drag and drop events are delivered to the view's viewport
+        if event.type() in (QtCore.QEvent.DragEnter, QtCore.QEvent.DragMove) and \
+                source is self.fileDisplayUI.viewport():
+            event.accept()
+            return True
+        # Drop event for file display UI
+        elif event.type() == QtCore.QEvent.Drop and source is self.fileDisplayUI.viewport():
+            if event.mimeData().hasUrls:
+                droppaths = [str(url.toLocalFile()) for url in event.mimeData().urls()]
+                self.loadFiles(droppaths)
+            return True
+
+        # Copy the selected lines of the file display UI
+        elif event.type() == QtCore.QEvent.KeyPress and event.matches(QtGui.QKeySequence.Copy) and \
+                source is self.fileDisplayUI:
+            rows = [index.row() for index in self.fileDisplayUI.selectionModel().selectedRows()]
+            QtGui.QApplication.clipboard().setText(self.fileDisplayModel.rowsText(rows))
+            return True
+
+        elif event.type() == QtCore.QEvent.KeyPress and event.key() == QtCore.Qt.Key_Tab:
+            if not self.filterDisplayUI.hasFocus():
+                self.filterInputUI.setFocus()
+            return True
+
+        else:
+            return super(LogParser, self).eventFilter(source, event)
+
+    def loadFile(self, fname):
+        """
+        Replace the current file with a memory-mapped (or, for compressed files, decompressed on demand), line-indexed
+        view of fname and re-apply the filters.  The file is opened and indexed in the background.
+
+        :param fname: str - path of the file to open
+        """
+        self.loadFiles([fname])
+
+    def loadFiles(self, paths):
+        """
+        Open files and the files in directories together as a session, their matching lines are displayed merged in
+        time order.  A single file is loaded on its own.  The files are opened in the background.
+
+        :param paths: list - paths of files or directories
+        """
+        fnames = []
+        for path in paths:
+            if os.path.isdir(path):
+                fnames.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                              if not name.startswith('.') and os.path.isfile(os.path.join(path, name)))
+            else:
+                fnames.append(path)
+        if not fnames:
+            return
+
+        # A load that is still running is stopped, only the newest one is displayed
+        self.loadGeneration += 1
+        self.pendingLoad = (self.loadGeneration, fnames)
+        self.loadFileThread.running = False
+        self.fileDisplayUI_StartPendingLoad()
+
+    def fileDisplayUI_StartPendingLoad(self):
+        """
+        Start the pending load, if the load thread has stopped.  Called whenever the load thread finishes.
+        """
+        thread = self.loadFileThread
+        if self.pendingLoad is None or thread.isRunning():
+            return
+
+        thread.job = self.pendingLoad
+        self.pendingLoad = None
+        # Set before starting so a cancellation that arrives before the thread runs isn't lost
+        thread.running = True
+        thread.start()
+
+    def fileDisplayUI_FileLoaded(self, generation, fileData):
+        """
+        Custom event handler for displaying a file or session opened by the load thread.
+        """
+        # A newer load has been started since, the load thread may still be indexing this file
+        if generation != self.loadGeneration:
+            self.retiredFileData.append(fileData)
+            return
+
+        if isinstance(fileData, LogParser_Session):
+            self.setFileData(fileData, LogParser_MergedMatchSet(fileData))
+        else:
+            self.setFileData(fileData, LogParser_MatchSet(fileData))
+
+    def fileDisplayUI_LoadProgress(self, generation, loaded, total):
+        """
+        Custom event handler for showing how much of the file the load thread has indexed, and for filtering the lines
+        indexed since the current filter job was created.
+        """
+        if generation != self.loadGeneration:
+            return
+
+        self.loadProgressUI.setVisible(loaded < total)
+        if total > 0:
+            self.loadProgressUI.setValue(int(100.0 * loaded / total))
+        self.fileDisplayUI_FilterNewLines()
+
+    def fileDisplayUI_LoadError(self, generation, message):
+        """
+        Custom event handler for reporting a file the load thread couldn't open.
+        """
+        if generation != self.loadGeneration:
+            return
+        self.statusBar().showMessage(message)
+
+    def setFileData(self, fileData, matchSet):
+        """
+        Display a newly opened file or session and re-apply the filters.
+
+        :param fileData: LogParser_LineStore or LogParser_Session - the lines to filter
+        :param matchSet: LogParser_MatchSet or LogParser_MergedMatchSet - empty results for fileData
+        """
+        # The filter thread may still be reading from the current store, it's closed once the thread has stopped
+        self.applyFiltersThread.running = False
+        if isinstance(self.fileData, (LogParser_LineStore, LogParser_Session)):
+            self.retiredFileData.append(self.fileData)
+
+        self.fileData = fileData
+        self.matchSet = matchSet
+        self.filterStats = LogParser_FilterStats()
+        self.minimapUI.setCounts([], 0)
+        self.fileDisplayModel.setLines(self.fileData)
+        self.fileDisplayUI_ApplyFilters()
+
+    def fileDisplayUI_BufferScroll(self):
+        maximumValue = float(self.fileDisplayUI.verticalScrollBar().maximum())
+        currentValue = self.fileDisplayUI.verticalScrollBar().value()
+        percentScrolled = 0.0
+
+        if maximumValue > 0:
+            percentScrolled = currentValue / maximumValue
+
+        # If the user has scrolled above 75% of the available results, filter the next page in the background
+        if percentScrolled > .75:
+            self.fileDisplayUI_FetchMore()
+
+    def fileDisplayUI_FetchMore(self):
+        """
+        Continue filtering from where the last filter job stopped until another page of results is available.
+        """
+        job = self.currentJob
+        if job is None or self.pendingJob is not None:
+            return
+        if self.matchSet is not job.matchSet or self.matchSet.plan is not job.plan or \
+                self.matchSet.isComplete(self.filterStopLine()):
+            return
+
+        # Don't interrupt a job that is still filtering, only one that is building bitmaps in its idle time
+        thread = self.applyFiltersThread
+        if thread.isRunning() and not thread.idle:
+            return
+
+        # The continuation displays the same results, so it keeps the generation of the job it continues
+        self.pendingJob = self.createFilterJob(job.generation, job.plan, len(self.matchSet) + self.pageSize)
+        thread.running = False
+        self.fileDisplayUI_StartPendingJob()
+
+    def followFile(self):
+        """
+        Pick up lines appended to the file since it was last checked, called periodically in follow mode.
+
+        Appended lines are filtered by continuing the current filter job once the display is scrolled near the bottom
+        (or isn't full yet), a rotated or truncated file is loaded again from the start.
+        """
+        if not self.followMode or not isinstance(self.fileData, LogParser_LineStore):
+            return
+        # The store can't change under a running filter job, try again on the next tick
+        if self.pendingJob is not None or self.applyFiltersThread.isRunning():
+            return
+
+        result = self.fileData.refresh()
+        if result == LogParser_LineStore.REFRESH_REPLACED:
+            self.loadFile(self.fileData.fname)
+            return
+
+        self.fileDisplayUI_FilterNewLines()
+
+    def fileDisplayUI_FilterNewLines(self):
+        """
+        Continue the current filter job over lines added to the file since it was created, i.e. lines appended in
+        follow mode or indexed by the load thread.  Called for both, and whenever the filter thread finishes.
+
+        The job is only continued while the display is scrolled near the bottom or isn't full yet, or in statistics
+        mode, which always covers the whole file.
+        """
+        scrollBar = self.fileDisplayUI.verticalScrollBar()
+        if self.statsMode or scrollBar.maximum() == 0 or scrollBar.value() > .75 * scrollBar.maximum():
+            self.fileDisplayUI_FetchMore()
+
+    def filterDisplayUI_addNewFilter(self):
+
+        # Obtain the filter that was just typed from the UI
+        filterInput = self.filterInputUI.text()
+
+        # Set the filter input UI text back to being empty
+        self.filterInputUI.setText('')
+
+        # Disallow empty filters
+        if str(filterInput).strip() == '':
+            return
+
+        # Get all currently enabled filters from the UI
+        items = []
+        for index in range(self.filterDisplayUI.count()):
+            items.append(self.filterDisplayUI.item(index))
+        labels = [i.text() for i in items]
+
+        # Disallow repeated filters
+        if filterInput in labels:
+            return
+
+        # Disallow invalid regular expressions, leaving them in the input to be corrected
+        try:
+            pattern = compilePattern(str(filterInput), self.fieldFormat)
+        except ValueError as e:
+            self.filterInputUI.setText(filterInput)
+            self.statusBar().showMessage(str(e))
+            return
+
+        # Insert filters into sorted groups
+        items = []
+        group = []
+
+        # Convert the filter string to a LogParser_Filter (QListWidgetItem), and customize it
+        filterInputItem = self.createFilterItem(filterInput, pattern)
+
+        # Check if a filter is selected within the filter output display
+        for selectedItem in self.filterDisplayUI.selectedItems():
+            items.append(selectedItem)
+
+        # If a filter is selected, append the new filter as a child of the selection, right below its group.  Items are
+        # inserted in place, clearing and refilling the display would re-create every filter item on each addition.
+        if len(items) > 0:
+            selectedItem = items[0]
+            for group in self.filterGroups:
+                if selectedItem in group:
+                    filterInputItem.setText('   ' + filterInput)
+                    self.filterDisplayUI.insertItem(self.filterDisplayUI.row(group[-1]) + 1, filterInputItem)
+                    group.append(filterInputItem)
+            self.filterDisplayUI.clearSelection()
+        # If none were selected, the new filter will become a group parent
+        else:
+            group.append(filterInputItem)
+            self.filterGroups.append(group)
+            self.filterDisplayUI.addItem(filterInputItem)
+
+        # Apply the new set of filters to the input file
+        self.fileDisplayUI_ApplyFilters()
+
+    def createFilterItem(self, text, pattern, state=LogParser_Filter.STATE_OMIT):
+        """
+        :param text: str - the filter
+        :param pattern: LogParser_Pattern - the compiled filter
+        :param state: int - LogParser_Filter.STATE_OMIT (red) or STATE_INCLUDE (green)
+        :return: LogParser_Filter - a filter item to be displayed
+        """
+        filterItem = LogParser_Filter()
+        filterItem.setText(text)
+        filterItem.setState(state)
+
+        # Time range filters are matched against the timestamps of the lines instead of their text
+        if parseTimeRange(text) is not None:
+            font = filterItem.font()
+            font.setItalic(True)
+            filterItem.setFont(font)
+            filterItem.setToolTip('Time range, matched against the timestamp at the start of each line')
+
+        # Field filters only compare one field of the lines
+        elif pattern.kind == LogParser_Pattern.KIND_FIELD:
+            filterItem.setToolTip('Field filter, matched against the {} field of each line'.format(pattern.field))
+        return filterItem
+
+    def filterGroupsState(self):
+        """
+        :return: list - the current filters as (parentText, parentIncludes, children) tuples, where children is a list
+                        of (childText, childIncludes) tuples
+        """
+        groups = []
+        for group in self.filterGroups:
+            parent = group[0]
+            # Child filters are displayed indented by three spaces
+            children = [(str(item.text())[3:], item.getState() == LogParser_Filter.STATE_INCLUDE)
+                        for item in group[1:]]
+            groups.append((str(parent.text()), parent.getState() == LogParser_Filter.STATE_INCLUDE, children))
+        return groups
+
+    def setFilterGroups(self, groups):
+        """
+        Replace all filters at once, the filters are only applied once for the whole set.
+
+        :param groups: list - (parentText, parentIncludes, children) tuples like filterGroupsState() returns
+        :return: list - error messages of the filters that were left out because they are invalid
+        """
+        errors = []
+        filterGroups = []
+        for parentText, parentIncludes, children in groups:
+            group = []
+            for text, includes, prefix in [(parentText, parentIncludes, '')] + \
+                    [(childText, childIncludes, '   ') for childText, childIncludes in children]:
+                try:
+                    pattern = compilePattern(text, self.fieldFormat)
+                except ValueError as e:
+                    errors.append(str(e))
+                    continue
+                state = LogParser_Filter.STATE_INCLUDE if includes else LogParser_Filter.STATE_OMIT
+                # Without a valid parent, a group's children are left out too
+                if group or not prefix:
+                    group.append(self.createFilterItem(prefix + text, pattern, state))
+                if not group:
+                    break
+            if group:
+                filterGroups.append(group)
+
+        self.filterDisplayUI.clear()
+        self.filterGroups = filterGroups
+        for group in self.filterGroups:
+            for item in group:
+                self.filterDisplayUI.addItem(item)
+        self.fileDisplayUI_ApplyFilters()
+        return errors
+
+    def saveFilterSetDialog(self):
+        name, ok = QtGui.QInputDialog.getText(self, 'Save Filter Set', 'Name of the filter set:')
+        if ok and str(name).strip():
+            self.saveFilterSet(str(name).strip())
+
+    def saveFilterSet(self, name):
+        """
+        Save the current filters as a named filter set.
+
+        :param name: str - name of the filter set, a set of the same name is replaced
+        """
+        try:
+            self.filterSets.put(name, self.filterGroupsState())
+        except (IOError, OSError) as e:
+            self.statusBar().showMessage('Could not save the filter set: {}'.format(e))
+            return
+        self.updateFilterSetsMenu()
+        self.statusBar().showMessage('Saved filter set {}'.format(name))
+
+    def loadFilterSet(self, name):
+        """
+        Replace the current filters with a named filter set.
+
+        :param name: str - name of the filter set
+        """
+        groups = self.filterSets.get(name)
+        if groups is None:
+            return
+        errors = self.setFilterGroups(groups)
+        if errors:
+            self.statusBar().showMessage('Loaded filter set {} without invalid filters: {}'.format(name,
+                                                                                                 '; '.join(errors)))
+        else:
+            self.statusBar().showMessage('Loaded filter set {}'.format(name))
+
+    def deleteFilterSetDialog(self):
+        names = self.filterSets.names()
+        if not names:
+            self.statusBar().showMessage('There are no saved filter sets')
+            return
+        name, ok = QtGui.QInputDialog.getItem(self, 'Delete Filter Set', 'Filter set to delete:', names, 0, False)
+        if ok:
+            self.deleteFilterSet(str(name))
+
+    def deleteFilterSet(self, name):
+        """
+        :param name: str - name of the filter set to delete
+        """
+        try:
+            self.filterSets.remove(name)
+        except (IOError, OSError) as e:
+            self.statusBar().showMessage('Could not delete the filter set: {}'.format(e))
+            return
+        self.updateFilterSetsMenu()
+        self.statusBar().showMessage('Deleted filter set {}'.format(name))
+
+    def updateFilterSetsMenu(self):
+        """
+        List an action that loads each saved filter set below the fixed actions of the Filter Sets menu.
+        """
+        for action in self.filterSetActions:
+            self.filterSetsMenu.removeAction(action)
+        self.filterSetActions = []
+        for name in self.filterSets.names():
+            action = QtGui.QAction(name, self)
+            action.setStatusTip('Replace the filters with the {} filter set'.format(name))
+            action.triggered.connect(lambda checked=False, name=name: self.loadFilterSet(name))
+            self.filterSetsMenu.addAction(action)
+            self.filterSetActions.append(action)
+
+    def filterDisplayUI_toggleFilterMode(self):
+        for selectedItem in self.filterDisplayUI.selectedItems():
+            if selectedItem.getState() == LogParser_Filter.STATE_OMIT:
+                selectedItem.setState(LogParser_Filter.STATE_INCLUDE)
+            else:
+                selectedItem.setState(LogParser_Filter.STATE_OMIT)
+
+            self.filterDisplayUI.clearSelection()
+            self.fileDisplayUI_ApplyFilters()
+
+    def filterDisplayUI_mousePressedEvent(self, event):
+        """
+        Allow clicking to clear the filter selection
+        """
+        self.filterDisplayUI.clearSelection()
+        super(QtGui.QListWidget, self.filterDisplayUI).mousePressEvent(event)
+
+    def filterDisplayUI_mouseDoubleClickEvent(self, event):
+        """
+        Allow toggling of filters by double-clicking
+        """
+        self.filterDisplayUI_toggleFilterMode()
+        self.filterInputUI.setFocus()
+
+    def filterDisplayUI_keyPressEvent(self, event):
+        # Delete key
+        if event.matches(QtGui.QKeySequence.Delete):
+            # List to avoid concurrent modification
+            itemsToDelete = []
+
+            # If we're deleting a parent of a group, keep track of it
+            groupToDelete = None
+            selectedItem = None
+
+            # For each selected item, remove it from the UI
+            for selectedItem in self.filterDisplayUI.selectedItems():
+
+                # For each group in our list of groups
+                for group in self.filterGroups:
+                    # If the item to delete is among this group
+                    if selectedItem in group:
+                        # Check if it's a parent
+                        if group[0] == selectedItem:
+                            # Remove all children of the parent
+                            for item in group:
+                                itemsToDelete.append(item)
+                            # Delete the group
+                            groupToDelete = group
+                        # If the item to delete is a child
+                        else:
+                            itemsToDelete.append(selectedItem)
+
+            # For each item that we have flagged to delete
+            for item in itemsToDelete:
+                # Delete it from the GUI
+                itemToRemove = self.filterDisplayUI.takeItem(self.filterDisplayUI.row(item))
+                # Delete it from our list
+                for group in self.filterGroups:
+                    if itemToRemove in group:
+                        group.remove(itemToRemove)
+
+            # If we are deleting a parent group, remove the group
+            if groupToDelete is not None:
+                self.filterGroups.remove(groupToDelete)
+
+            if selectedItem is not None:
+                # De-select the selected item
+                self.filterDisplayUI.clearSelection()
+
+                # Update the file display with the new filter options
+                self.fileDisplayUI_ApplyFilters()
+
+        # Space key
+        if event.key() == QtCore.Qt.Key_Space:
+            self.filterDisplayUI_toggleFilterMode()
+
+
+        self.filterInputUI.setFocus()
+
+    def initComponentsUI(self):
+        # Wrapping options:
+        #QtGui.QTextEdit.NoWrap, WidgetWidth, FixedPixelWidth, FixedColumnWidth
+
+        # UI widget that will display the output of the input file.  It's a virtual list, only the visible rows are
+        # ever read from the file, and uniform row sizes keep the layout from having to measure every row.
+        self.fileDisplayModel = LogParser_MatchModel('Drop a file here or use the command line')
+        self.fileDisplayUI = QtGui.QListView()
+        self.fileDisplayUI.setModel(self.fileDisplayModel)
+        self.fileDisplayUI.setUniformItemSizes(True)
+        self.fileDisplayUI.setSelectionMode(QtGui.QAbstractItemView.ExtendedSelection)
+        self.fileDisplayUI.setTextElideMode(QtCore.Qt.ElideNone)
+        self.fileDisplayUI.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
+        self.fileDisplayUI.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
+        self.fileDisplayUI.setAcceptDrops(True)
+        p = self.fileDisplayUI.palette()
+        p.setColor(QtGui.QPalette.Base, QtGui.QColor(39, 40, 34))
+        p.setColor(QtGui.QPalette.Text, QtGui.QColor(255, 255, 255))
+        self.fileDisplayUI.setPalette(p)
+        self.fileDisplayUI.verticalScrollBar().valueChanged.connect(self.fileDisplayUI_BufferScroll)
+        self.fileDisplayUI.installEventFilter(self)
+        self.fileDisplayUI.viewport().installEventFilter(self)
+        self.fileDisplayUI.paintEvent = self.fileDisplayUI_paintEvent
+        self.upperSplitter.addWidget(self.fileDisplayUI)
+
+        # UI widget that shows where the matches are in the file, only visible in statistics mode
+        self.minimapUI = LogParser_Minimap()
+        self.connect(self.minimapUI, self.minimapUI.clickedSignal, self.minimapUI_Clicked)
+        self.minimapUI.setVisible(self.statsMode)
+        self.upperSplitter.addWidget(self.minimapUI)
+
+        # UI Widget that the user types filters into, the enter key adds the filter
+        self.filterInputUI = QtGui.QLineEdit()
+        self.filterInputUI.setFixedHeight(25)
+        self.filterInputUI.setPlaceholderText('Enter filters here')
+        p = self.filterInputUI.palette()
+        p.setColor(QtGui.QPalette.Base, QtGui.QColor(200, 200, 200))
+        p.setColor(QtGui.QPalette.Text, QtGui.QColor(0, 0, 0))
+        self.filterInputUI.setPalette(p)
+        self.filterInputUI.returnPressed.connect(self.filterDisplayUI_addNewFilter)
+        self.lowerSplitter.addWidget(self.filterInputUI)
+
+        # UI Widget that displays currently enabled filters
+        self.filterDisplayUI = QtGui.QListWidget()
+        self.filterDisplayUI.mousePressEvent = self.filterDisplayUI_mousePressedEvent
+        self.filterDisplayUI.mouseDoubleClickEvent = self.filterDisplayUI_mouseDoubleClickEvent
+        self.filterDisplayUI.keyPressEvent = self.filterDisplayUI_keyPressEvent
+        # self.filterDisplayUI.setFocusPolicy(QtCore.Qt.NoFocus)
+        p = self.filterDisplayUI.palette()
+        p.setColor(QtGui.QPalette.Base, QtGui.QColor(39, 40, 34))
+        p.setColor(QtGui.QPalette.Text, QtGui.QColor(255, 255, 255))
+        p.setColor(QtGui.QPalette.Highlight, QtGui.QColor(49, 50, 46))
+        self.filterDisplayUI.setPalette(p)
+        self.filterDisplayUI.installEventFilter(self)
+        # In statistics mode each filter shows the number of lines it occurs in
+        self.filterHitsDelegate = LogParser_FilterHitsDelegate(self.filterDisplayUI)
+        self.filterDisplayUI.setItemDelegate(self.filterHitsDelegate)
+        self.upperSplitter.addWidget(self.filterDisplayUI)
+
+        self.upperSplitter.setSizes([1000, 16, 100])
+
+    def initGUIStructureUI(self):
+        """
+        Generally, to add widgets to the GUI, use the splitter.addWidget() method.
+        This can differ depending on the desired effect from the GUI.
+
+        |-----------------------------------------------|
+        |componentContainer                             |
+        |  |-----------------------------------------|  |
+        |  |componentLayout                          |  |
+        |  |  |-----------------------------------|  |  |
+        |  |  |upperContainer                     |  |  |
+        |  |  |  |-----------------------------|  |  |  |
+        |  |  |  |upperLayout                  |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |upperSplitter  |  |  |  |
+        |  |  |  |                             |  |  |  |
+        |  |  |  |-----------------------------|  |  |  |
+        |  |  |                                   |  |  |
+        |  |  |-----------------------------------|  |  |
+        |  |                                         |  |
+        |  |         ---componentSplitter---         |  |
+        |  |                                         |  |
+        |  |  |-----------------------------------|  |  |
+        |  |  |lowerContainer                     |  |  |
+        |  |  |  |-----------------------------|  |  |  |
+        |  |  |  |lowerLayout                  |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |               |  |  |  |
+        |  |  |  |             |lowerSplitter  |  |  |  |
+        |  |  |  |                             |  |  |  |
+        |  |  |  |-----------------------------|  |  |  |
+        |  |  |                                   |  |  |
+        |  |  |-----------------------------------|  |  |
+        |  |                                         |  |
+        |  |-----------------------------------------|  |
+        |                                               |
+        |-----------------------------------------------|
+        """
+        componentContainer = QtGui.QWidget()
+        componentLayout = QtGui.QVBoxLayout()
+        componentSplitter = QtGui.QSplitter()
+        componentSplitter.setOrientation(QtCore.Qt.Vertical)
+        componentContainer.setLayout(componentLayout)
+        componentLayout.addWidget(componentSplitter)
+
+        upperContainer = QtGui.QWidget()
+        upperLayout = QtGui.QVBoxLayout()
+        self.upperSplitter = QtGui.QSplitter()
+        upperContainer.setLayout(upperLayout)
+        upperLayout.addWidget(self.upperSplitter)
+
+        lowerContainer = QtGui.QWidget()
+        lowerLayout = QtGui.QVBoxLayout()
+        self.lowerSplitter = QtGui.QSplitter()
+        lowerContainer.setLayout(lowerLayout)
+        lowerLayout.addWidget(self.lowerSplitter)
+
+        componentSplitter.addWidget(upperContainer)
+        componentSplitter.addWidget(lowerContainer)
+        componentSplitter.setSizes([1000, 100])
+
+        self.centralVBox.addWidget(componentContainer)
+
+    def toggleNewLineMode(self):
+        self.newLineMode = not self.newLineMode
+        self.fileDisplayUI_ApplyFilters()
+
+    def toggleFollowMode(self):
+        self.followMode = not self.followMode
+        if self.followMode:
+            self.followTimer.start()
+            self.statusBar().showMessage('Following appended lines')
+        else:
+            self.followTimer.stop()
+            self.statusBar().showMessage('Follow mode off')
+        self.fileDisplayUI_ApplyFilters()
+
+    def toggleStatsMode(self):
+        self.statsMode = not self.statsMode
+        self.minimapUI.setVisible(self.statsMode)
+        if self.statsMode:
+            self.statusBar().showMessage('Statistics mode, filtering whole files')
+        else:
+            self.statusBar().showMessage('Statistics mode off')
+            self.filterHitsDelegate.hits = {}
+            self.filterDisplayUI.viewport().update()
+        self.fileDisplayUI_ApplyFilters()
+
+    def toggleParallelMode(self):
+        self.parallelMode = not self.parallelMode
+        if self.parallelMode:
+            self.statusBar().showMessage('Parallel filtering on {} processes'.format(self.parallelFilter.processes))
+        else:
+            self.statusBar().showMessage('Parallel filtering off')
+        self.fileDisplayUI_ApplyFilters()
+
+    def saveFilteredOutputDialog(self):
+        fname = QtGui.QFileDialog.getSaveFileName(
+            self, 'Save Filtered Output', 'filtered.log',
+            'Log files (*.log *.txt);;Gzip-compressed files (*.gz);;All files (*)')
+        if fname:
+            self.saveFilteredOutput(str(fname))
+
+    def saveFilteredOutput(self, fname, compress=None):
+        """
+        Write every line of the current file or session that matches the current filters to a file, in the background.
+
+        :param fname: str - path of the file
+        :param compress: bool - gzip the output, defaults to whether fname ends in .gz
+        """
+        if not isinstance(self.fileData, (LogParser_LineStore, LogParser_Session)):
+            self.statusBar().showMessage('Open a file before saving the filtered output')
+            return
+        if not getattr(self.fileData, 'indexed', True):
+            self.statusBar().showMessage('Wait for the file to finish loading before saving the filtered output')
+            return
+        if self.exportThread.isRunning():
+            self.statusBar().showMessage('The filtered output is already being saved')
+            return
+        if compress is None:
+            compress = fname.endswith('.gz')
+
+        self.exportThread.job = (self.fileData, self.compileFilterPlan(), fname, compress, self.parallelMode)
+        self.exportProgressUI.setValue(0)
+        self.exportProgressUI.setVisible(True)
+        self.exportCancelUI.setVisible(True)
+        # Set before starting so a cancellation that arrives before the thread runs isn't lost
+        self.exportThread.running = True
+        self.exportThread.start()
+
+    def cancelExport(self):
+        self.exportThread.running = False
+
+    def fileDisplayUI_ExportProgress(self, linesFiltered, numLines):
+        """
+        Custom event handler for showing how much of the file the export thread has filtered.
+        """
+        if numLines > 0:
+            self.exportProgressUI.setValue(int(100.0 * linesFiltered / numLines))
+
+    def fileDisplayUI_ExportDone(self, message):
+        """
+        Custom event handler for reporting the outcome of the export thread.
+        """
+        self.exportProgressUI.setVisible(False)
+        self.exportCancelUI.setVisible(False)
+        self.statusBar().showMessage(message)
+
+    def toggleMetricsMode(self):
+        self.metricsMode = not self.metricsMode
+        self.metricsUI.setVisible(self.metricsMode)
+        if self.metricsMode:
+            self.fileDisplayUI_UpdateMetrics()
+            self.metricsTimer.start()
+        else:
+            self.metricsTimer.stop()
+
+    def fileDisplayUI_UpdateMetrics(self):
+        """
+        Show the current metrics in the status bar, called periodically in metrics mode.
+        """
+        self.metricsUI.setText(self.metrics.summary())
+
+    def saveMetricsDialog(self):
+        fname = QtGui.QFileDialog.getSaveFileName(self, 'Save Metrics', 'logparser-metrics.json',
+                                                  'JSON files (*.json)')
+        if fname:
+            self.saveMetrics(str(fname))
+
+    def saveMetrics(self, fname):
+        """
+        Write the load, filter and display metrics to a JSON file.
+
+        :param fname: str - path of the file
+        """
+        try:
+            self.metrics.save(fname)
+        except (IOError, OSError) as e:
+            self.statusBar().showMessage('Could not save metrics: {}'.format(e))
+            return
+        self.statusBar().showMessage('Saved metrics to {}'.format(fname))
+
+    def initCentralWidgetUI(self):
+        # Status bar that appears on the bottom of the window
+        self.statusBar().showMessage('Ready')
+        if self.startupErrors:
+            self.statusBar().showMessage('  '.join(self.startupErrors))
+        self.statusBar().setStyleSheet("color: rgb(180, 180, 180);")
+
+        # Progress of the current filter job, only visible while the filter thread is working
+        self.filterProgressUI = QtGui.QProgressBar()
+        self.filterProgressUI.setRange(0, 100)
+        self.filterProgressUI.setMaximumWidth(200)
+        self.filterProgressUI.setVisible(False)
+        self.statusBar().addPermanentWidget(self.filterProgressUI)
+
+        # Progress of the file being loaded, only visible while the load thread is working
+        self.loadProgressUI = QtGui.QProgressBar()
+        self.loadProgressUI.setRange(0, 100)
+        self.loadProgressUI.setFormat('Loading %p%')
+        self.loadProgressUI.setMaximumWidth(200)
+        self.loadProgressUI.setVisible(False)
+        self.statusBar().addPermanentWidget(self.loadProgressUI)
+
+        # Progress of saving the filtered output, with a button to cancel it, only visible while the export thread works
+        self.exportProgressUI = QtGui.QProgressBar()
+        self.exportProgressUI.setRange(0, 100)
+        self.exportProgressUI.setFormat('Saving %p%')
+        self.exportProgressUI.setMaximumWidth(200)
+        self.exportProgressUI.setVisible(False)
+        self.statusBar().addPermanentWidget(self.exportProgressUI)
+        self.exportCancelUI = QtGui.QPushButton('Cancel')
+        self.exportCancelUI.setVisible(False)
+        self.exportCancelUI.clicked.connect(self.cancelExport)
+        self.statusBar().addPermanentWidget(self.exportCancelUI)
+
+        # Summary of the metrics, only visible in metrics mode
+        self.metricsUI = QtGui.QLabel()
+        self.metricsUI.setVisible(self.metricsMode)
+        self.statusBar().addPermanentWidget(self.metricsUI)
+
+        # This action describes exiting the application
+        exitAction = QtGui.QAction(QtGui.QIcon('exit.png'), '&Exit', self)
+        exitAction.setShortcut('Ctrl+Q')
+        exitAction.setStatusTip('Exit application')
+        exitAction.triggered.connect(QtGui.qApp.quit)
+
+        # This action causes newlines to be ommitted from the filter output
+        newLineAction = QtGui.QAction(QtGui.QIcon('filter.png'), '&Toggle New Lines', self)
+        newLineAction.setShortcut('Ctrl+Shift+N')
+        newLineAction.setStatusTip('Toggle filtering new lines')
+        newLineAction.triggered.connect(self.toggleNewLineMode)
+
+        # This action spreads filtering across a pool of worker processes
+        parallelAction = QtGui.QAction(QtGui.QIcon('parallel.png'), '&Toggle Parallel Filtering', self)
+        parallelAction.setShortcut('Ctrl+Shift+P')
+        parallelAction.setStatusTip('Toggle filtering with one process per CPU')
+        parallelAction.triggered.connect(self.toggleParallelMode)
+
+        # This action keeps filtering lines as they are appended to the file
+        followAction = QtGui.QAction(QtGui.QIcon('follow.png'), '&Toggle Follow Mode', self)
+        followAction.setShortcut('Ctrl+Shift+F')
+        followAction.setStatusTip('Toggle following lines appended to the file')
+        followAction.triggered.connect(self.toggleFollowMode)
+
+        # This action shows per filter hit counts and a minimap of the matches, which needs whole files filtered
+        statsAction = QtGui.QAction(QtGui.QIcon('stats.png'), '&Toggle Statistics Mode', self)
+        statsAction.setShortcut('Ctrl+Shift+S')
+        statsAction.setStatusTip('Toggle counting the hits of every filter over the whole file')
+        statsAction.triggered.connect(self.toggleStatsMode)
+
+        # This action shows the time spent loading, filtering and displaying, and the peak memory use
+        metricsAction = QtGui.QAction(QtGui.QIcon('metrics.png'), '&Toggle Metrics', self)
+        metricsAction.setShortcut('Ctrl+Shift+M')
+        metricsAction.setStatusTip('Toggle showing load, filter and display metrics')
+        metricsAction.triggered.connect(self.toggleMetricsMode)
+
+        # This action writes every line matching the filters to a file
+        saveAction = QtGui.QAction(QtGui.QIcon('save.png'), '&Save Filtered Output...', self)
+        saveAction.setShortcut('Ctrl+S')
+        saveAction.setStatusTip('Save all lines of the file that match the filters, gzip-compressed if the name ends '
+                                'in .gz')
+        saveAction.triggered.connect(self.saveFilteredOutputDialog)
+
+        # This action writes the metrics to a JSON file
+        saveMetricsAction = QtGui.QAction(QtGui.QIcon('save.png'), 'Save &Metrics...', self)
+        saveMetricsAction.setStatusTip('Save load, filter and display metrics as JSON')
+        saveMetricsAction.triggered.connect(self.saveMetricsDialog)
+
+        # Adds a File dropdown menu
+        menubar = self.menuBar()
+        fileMenu = menubar.addMenu('&File')
+        fileMenu.addAction(saveAction)
+        fileMenu.addAction(saveMetricsAction)
+        fileMenu.addAction(exitAction)
+
+        # Adds a Filter Sets dropdown menu, with an action for every saved filter set after the separator
+        saveFilterSetAction = QtGui.QAction('&Save Filters As...', self)
+        saveFilterSetAction.setShortcut('Ctrl+Shift+A')
+        saveFilterSetAction.setStatusTip('Save the current filters as a named filter set')
+        saveFilterSetAction.triggered.connect(self.saveFilterSetDialog)
+        deleteFilterSetAction = QtGui.QAction('&Delete Filter Set...', self)
+        deleteFilterSetAction.setStatusTip('Delete a saved filter set')
+        deleteFilterSetAction.triggered.connect(self.deleteFilterSetDialog)
+        self.filterSetsMenu = menubar.addMenu('Filter &Sets')
+        self.filterSetsMenu.addAction(saveFilterSetAction)
+        self.filterSetsMenu.addAction(deleteFilterSetAction)
+        self.filterSetsMenu.addSeparator()
+        self.filterSetActions = []
+        self.updateFilterSetsMenu()
+
+        # A bar that is always in view with buttons
+        toolbar = self.addToolBar('Exit')
+        toolbar.addAction(exitAction)
+        toolbar.addAction(newLineAction)
+        toolbar.addAction(parallelAction)
+        toolbar.addAction(followAction)
+        toolbar.addAction(statsAction)
+        toolbar.addAction(metricsAction)
+
+        # Vertical box layout
+        self.centralVBox = QtGui.QVBoxLayout()
+
+        # Main container for all widgets
+        centralWidget = QtGui.QWidget()
+        centralWidget.setLayout(self.centralVBox)
+        self.setCentralWidget(centralWidget)
+
+    def fileDisplayUI_UpdateDisplay(self, generation, displayText):
+        """
+        Custom event handler for displaying a message from the thread that filters the file.
+        """
+        # Ignore anything a cancelled job managed to send before it stopped
+        if generation != self.filterGeneration:
+            return
+        start = time.time()
+        self.fileDisplayModel.setMessage(displayText)
+        self.metrics.record('display', time.time() - start)
+
+    def fileDisplayUI_UpdateMatches(self, generation, matches, numMatches):
+        """
+        Custom event handler for updating the GUI's display as filter results
+        are found from the thread that filters the file.
+
+        The filter thread emits the signal in batches, at most every BATCH_SECONDS unless BATCH_MATCHES new lines
+        were found sooner.
+        """
+        if generation != self.filterGeneration:
+            return
+
+        # In follow mode a display scrolled to the bottom stays at the bottom as new lines arrive
+        start = time.time()
+        scrollBar = self.fileDisplayUI.verticalScrollBar()
+        atBottom = scrollBar.value() == scrollBar.maximum()
+        numRows = self.fileDisplayModel.numRows
+        self.fileDisplayModel.setMatches(matches, numMatches)
+        if self.followMode and atBottom:
+            self.fileDisplayUI.scrollToBottom()
+        self.metrics.record('display', time.time() - start, matches=max(0, numMatches - numRows))
+
+    def fileDisplayUI_paintEvent(self, event):
+        """
+        Paint the visible rows of the file display, timed for the metrics.
+        """
+        start = time.time()
+        QtGui.QListView.paintEvent(self.fileDisplayUI, event)
+        self.metrics.record('render', time.time() - start)
+
+    def fileDisplayUI_UpdateProgress(self, generation, linesFiltered, numLines, numMatches, linesPerSecond, finished):
+        """
+        Custom event handler for showing the progress and throughput of the filter thread in the status bar.
+        """
+        if generation != self.filterGeneration:
+            return
+
+        if linesFiltered >= numLines:
+            message = 'Filtered {:,} lines, {:,} matches'.format(numLines, numMatches)
+        else:
+            message = 'Filtered {:,} of {:,} lines, {:,} matches'.format(linesFiltered, numLines, numMatches)
+        if linesPerSecond > 0:
+            message += ' ({:,.0f} lines/s)'.format(linesPerSecond)
+        self.statusBar().showMessage(message)
+
+        self.filterProgressUI.setVisible(not finished)
+        if numLines > 0:
+            self.filterProgressUI.setValue(int(100.0 * linesFiltered / numLines))
+
+    def fileDisplayUI_UpdateStats(self, generation, stats):
+        """
+        Custom event handler for showing the filter statistics sent by the filter thread in statistics mode.
+        """
+        if generation != self.filterGeneration or not self.statsMode:
+            return
+        self.filterHitsDelegate.hits = stats.hitsByText()
+        self.filterDisplayUI.viewport().update()
+        self.minimapUI.setCounts(stats.blockMatches, len(self.fileData))
+
+    def minimapUI_Clicked(self, fraction):
+        """
+        Scroll the display to the first match at or after the clicked position of the file.
+        """
+        model = self.fileDisplayModel
+        if model.message is not None or model.numRows == 0:
+            return
+        line = int(fraction * len(self.fileData))
+        row = min(bisect.bisect_left(model.matches, line, 0, model.numRows), model.numRows - 1)
+        self.fileDisplayUI.scrollTo(model.index(row), QtGui.QAbstractItemView.PositionAtTop)
+
+    def fileDisplayUI_ApplyFilters(self):
+        """
+        Schedule a filter job for the current file and filters.
+
+        This never waits for the filter thread.  A running job is asked to stop, and the new job starts once it has
+        stopped and no further filter changes have arrived for filterDebounceMs, so a burst of edits only runs the
+        newest job.
+        """
+        # Snapshot the filters now so the filter thread never reads the live filter items
+        self.filterGeneration += 1
+        self.pendingJob = self.createFilterJob(self.filterGeneration, self.compileFilterPlan(), self.pageSize)
+        self.applyFiltersThread.running = False
+
+        self.fileDisplayModel.setMessage('Filtering/Loading file...')
+        self.filterDebounceTimer.start()
+
+    def fileDisplayUI_StartPendingJob(self):
+        """
+        Start the pending filter job, if the filter thread has stopped and the debounce period is over.
+
+        Called when the debounce timer expires and whenever the filter thread finishes.
+        """
+        thread = self.applyFiltersThread
+        if self.pendingJob is None or thread.isRunning() or self.filterDebounceTimer.isActive():
+            return
+
+        # No job can be reading from files that have been replaced any more, but the load thread may still be indexing
+        # one of them and the export thread may still be saving the matches of one
+        inUse = [thread.fileData for thread in (self.loadFileThread, self.exportThread) if thread.isRunning()]
+        for fileData in self.retiredFileData:
+            if not any(fileData is usedFileData for usedFileData in inUse):
+                fileData.close()
+        self.retiredFileData = [fileData for fileData in self.retiredFileData
+                                if any(fileData is usedFileData for usedFileData in inUse)]
+
+        self.currentJob = self.pendingJob
+        self.pendingJob = None
+        thread.job = self.currentJob
+        # Set before starting so a cancellation that arrives before the thread runs isn't lost
+        thread.running = True
+        thread.start()
+
+    def filterStopLine(self):
+        """
+        :return: int - number of lines of the current file that filter jobs should filter
+        """
+        if isinstance(self.fileData, LogParser_LineStore):
+            # The last line of a file that is being written to is incomplete, it's filtered once its newline arrives
+            if self.followMode:
+                return len(self.fileData) - 1
+            # ...and only the lines indexed so far of a file that is still loading can be filtered
+            return self.fileData.numCompleteLines()
+        return len(self.fileData)
+
+    def createFilterJob(self, generation, plan, targetMatches):
+        """
+        :param generation: int - ID of the filter settings the job displays
+        :param plan: LogParser_FilterPlan - immutable snapshot of the filters
+        :param targetMatches: int - stop filtering once this many matches are available
+        :return: LogParser_FilterJob - a job for the current file, match set and modes
+        """
+        # Bitmaps and the sidecar index cover a fixed number of lines, so they aren't used for a file that keeps growing
+        # or is still being indexed
+        useCaches = not self.followMode and getattr(self.fileData, 'indexed', True)
+        stats = None
+        if self.statsMode:
+            stats = self.filterStats
+        return LogParser_FilterJob(generation, self.fileData, self.matchSet, plan, targetMatches, self.parallelMode,
+                                   self.filterStopLine(), useCaches, stats)
+
+    def compileFilterPlan(self):
+        """
+        Reduce the current filter groups to plain strings and flags for the filter thread.
+
+        :return: LogParser_FilterPlan - immutable snapshot of self.filterGroups
+        """
+        return LogParser_FilterPlan(self.filterGroupsState(), skipEmptyLines=not self.newLineMode,
+                                    timestampParser=self.timestampParser, fieldFormat=self.fieldFormat)
+
+    def initProgramVariables(self):
+        # Don't filter new lines by default
+        self.newLineMode = True
+        # Contains every line of the file we wish to filter, replaced by a LogParser_LineStore once a file is loaded
+        self.fileData = []
+        # Files that have been replaced but may still be in use by the filter thread
+        self.retiredFileData = []
+        # Results of filtering fileData, kept between filter jobs so that filter changes can be applied incrementally
+        self.matchSet = LogParser_MatchSet(self.fileData)
+        # Incremented for every change of the filters or file, results from older generations are ignored
+        self.filterGeneration = 0
+        # Newest filter job that hasn't been started yet, and the job that was started last
+        self.pendingJob = None
+        self.currentJob = None
+        # Filter changes within this many milliseconds of each other only run one filter job
+        self.filterDebounceMs = 100
+        self.filterDebounceTimer = QtCore.QTimer(self)
+        self.filterDebounceTimer.setSingleShot(True)
+        self.filterDebounceTimer.setInterval(self.filterDebounceMs)
+        self.filterDebounceTimer.timeout.connect(self.fileDisplayUI_StartPendingJob)
+        # Number of matching lines filtered ahead of the display, another page is filtered as the user scrolls down
+        self.pageSize = 1000
+        # Used for grouping filters, necessary for ANDing filters
+        self.filterGroups = []
+        # Filter with a pool of worker processes instead of the single filter thread
+        self.parallelMode = False
+        # Filter whole files and count how many lines each filter occurs in, and where the matches are
+        self.statsMode = False
+        self.filterStats = LogParser_FilterStats()
+        # Keep filtering lines as they are appended to the file, checking for new data every followIntervalMs
+        self.followMode = False
+        self.followIntervalMs = 500
+        self.followTimer = QtCore.QTimer(self)
+        self.followTimer.setInterval(self.followIntervalMs)
+        self.followTimer.timeout.connect(self.followFile)
+        # Time spent in, and lines handled by, loading, filtering and displaying.  Jobs are profiled if a directory
+        # for the profiles is set in the environment
+        self.metrics = LogParser_Metrics(os.environ.get('LOGPARSER_PROFILE_DIR') or None)
+        # Show a summary of the metrics in the status bar, updated every metricsIntervalMs
+        self.metricsMode = False
+        self.metricsIntervalMs = 1000
+        self.metricsTimer = QtCore.QTimer(self)
+        self.metricsTimer.setInterval(self.metricsIntervalMs)
+        self.metricsTimer.timeout.connect(self.fileDisplayUI_UpdateMetrics)
+        # Process pool used in parallel mode, the processes are only started when first needed
+        self.parallelFilter = LogParser_ParallelFilter()
+        # Cache of which lines contain each filter, the memory budget in MB can be set in the environment
+        self.bitmapCache = LogParser_BitmapCache(int(os.environ.get('LOGPARSER_BITMAP_CACHE_MB', '256')) * 1024 * 1024)
+        # Directory for the sidecar line and trigram indexes of opened files, empty to disable them
+        self.indexDir = os.environ.get('LOGPARSER_INDEX_DIR', DEFAULT_INDEX_DIR)
+        # Matches of filters in opened files, kept with the sidecar indexes
+        self.resultCache = None
+        if self.indexDir:
+            self.resultCache = LogParser_ResultCache(os.path.join(self.indexDir, 'results'))
+        # Problems with the settings, shown in the status bar once the window is up
+        self.startupErrors = []
+        # Named filter sets, a file that can't be read is reported and is replaced on saving
+        self.filterSets = LogParser_FilterSets(os.environ.get('LOGPARSER_FILTER_SETS', DEFAULT_FILTER_SETS_FILE))
+        try:
+            self.filterSets.load()
+        except ValueError as e:
+            self.startupErrors.append(str(e))
+        # Finds the timestamps that sessions are merged by and time range filters are tested against
+        timestampFormats = [timestampFormat for timestampFormat in
+                            os.environ.get('LOGPARSER_TIMESTAMP_FORMATS', '').split(';') if timestampFormat]
+        try:
+            self.timestampParser = LogParser_TimestampParser(timestampFormats)
+        except ValueError as e:
+            self.startupErrors.append('LOGPARSER_TIMESTAMP_FORMATS: {}, using the default formats'.format(e))
+            self.timestampParser = LogParser_TimestampParser()
+        # Splits lines into the fields that field filters (e.g. level=ERROR) compare, None if they aren't described
+        self.fieldFormat = None
+        if os.environ.get('LOGPARSER_FIELDS'):
+            try:
+                self.fieldFormat = LogParser_FieldFormat(os.environ['LOGPARSER_FIELDS'])
+            except ValueError as e:
+                self.startupErrors.append('LOGPARSER_FIELDS: {}, field filters are off'.format(e))
+        # Thread used to apply filters, prevents the GUI from locking up with large files
+        self.applyFiltersThread = LogParser_ApplyFilterThread(self)
+        # Custom event handler for the filtering thread to update the GUI text as resutls are found
+        self.connect(self.applyFiltersThread, self.applyFiltersThread.signal, self.fileDisplayUI_UpdateDisplay)
+        self.connect(self.applyFiltersThread, self.applyFiltersThread.matchesSignal, self.fileDisplayUI_UpdateMatches)
+        self.connect(self.applyFiltersThread, self.applyFiltersThread.progressSignal, self.fileDisplayUI_UpdateProgress)
+        self.connect(self.applyFiltersThread, self.applyFiltersThread.statsSignal, self.fileDisplayUI_UpdateStats)
+        # Start the newest pending job as soon as the previous one has stopped
+        self.applyFiltersThread.finished.connect(self.fileDisplayUI_StartPendingJob)
+        # ...and continue it over lines that were loaded while it ran
+        self.applyFiltersThread.finished.connect(self.fileDisplayUI_FilterNewLines)
+        # Incremented for every file or session that is opened, results of older loads are ignored
+        self.loadGeneration = 0
+        # Newest load that hasn't been started yet
+        self.pendingLoad = None
+        # Thread used to open and index files, prevents the GUI from locking up while a large file loads
+        self.loadFileThread = LogParser_LoadFileThread(self)
+        self.connect(self.loadFileThread, self.loadFileThread.loadedSignal, self.fileDisplayUI_FileLoaded)
+        self.connect(self.loadFileThread, self.loadFileThread.progressSignal, self.fileDisplayUI_LoadProgress)
+        self.connect(self.loadFileThread, self.loadFileThread.errorSignal, self.fileDisplayUI_LoadError)
+        self.loadFileThread.finished.connect(self.fileDisplayUI_StartPendingLoad)
+        # Thread used to save the filtered output, streams the matches of the whole file to disk
+        self.exportThread = LogParser_ExportThread(self)
+        self.connect(self.exportThread, self.exportThread.progressSignal, self.fileDisplayUI_ExportProgress)
+        self.connect(self.exportThread, self.exportThread.doneSignal, self.fileDisplayUI_ExportDone)
+
+
+def main():
+    # If a valid filename is passed in as an argument, then open that
+    filename = None
+    if len(sys.argv) == 2 and not os.path.isdir(sys.argv[1]):
+        fname = sys.argv[1]
+        # Make sure the file exists and is a regular file
+        if os.path.isfile(fname):
+            filename = fname
+        else:
+            print("ERROR: {} does not exist or is not a regular file!".format(fname))
+            sys.exit(1)
+
+    # Several files, or directories, are opened together as a session
+    filenames = None
+    if filename is None and len(sys.argv) > 1:
+        filenames = sys.argv[1:]
+        for fname in filenames:
+            if not os.path.exists(fname):
+                print("ERROR: {} does not exist!".format(fname))
+                sys.exit(1)
+
+    app = QtGui.QApplication(sys.argv)
+    log_parser = LogParser(filename, filenames)
+    sys.exit(app.exec_())
+
+
+if __name__ == '__main__':
+    main()